@@ -0,0 +1,63 @@
+"""Fixtures for the observations tests."""
+
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from django.core.cache import cache
+from django.utils import timezone
+
+from vespadb.observations.models import Municipality, Observation
+from vespadb.users.models import VespaUser
+
+
+def lambert_box(xmin: float, ymin: float, xmax: float, ymax: float) -> MultiPolygon:
+    """Return a longitude/latitude box as the Lambert 72 multipolygon the boundary models store."""
+    box = MultiPolygon(Polygon.from_bbox((xmin, ymin, xmax, ymax)), srid=4326)
+    box.transform(31370)
+    return box
+
+
+@pytest.fixture(autouse=True)
+def _local_cache(settings: Any) -> None:
+    """Keep the cache in process memory and start every test with an empty one."""
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    cache.clear()
+
+
+@pytest.fixture()
+def make_user(db: None) -> Callable[[str], VespaUser]:
+    """Return a factory for users."""
+
+    def make(username: str) -> VespaUser:
+        return VespaUser.objects.create_user(username=username, password="secret")  # noqa: S106
+
+    return make
+
+
+@pytest.fixture()
+def make_observation(db: None) -> Callable[..., Observation]:
+    """Return a factory for observations in Ghent, with the given field values and no spatial enrichment."""
+
+    def make(**fields: Any) -> Observation:
+        fields.setdefault("location", Point(3.7174, 51.0543, srid=4326))
+        # Observation.save falls back to a naive datetime.now().
+        fields.setdefault("created_datetime", timezone.now())
+        observation = Observation(**fields)
+        observation.save(enrich_location=False)
+        return observation
+
+    return make
+
+
+@pytest.fixture()
+def make_municipality(db: None) -> Callable[..., Municipality]:
+    """Return a factory for municipalities covering a longitude/latitude box, by default around Ghent."""
+
+    def make(
+        name: str, bbox: tuple[float, float, float, float] = (3.6, 51.0, 3.8, 51.1), **fields: Any
+    ) -> Municipality:
+        return Municipality.objects.create(name=name, nis_code=name, polygon=lambert_box(*bbox), **fields)
+
+    return make
@@ -0,0 +1,97 @@
+"""Tests for the bbox filter of dynamic-geojson."""
+
+import json
+from collections.abc import Callable
+
+import pytest
+from django.contrib.gis.geos import Point
+from django.http import QueryDict
+from rest_framework.test import APIRequestFactory
+
+from vespadb.observations.models import Observation
+from vespadb.observations.queries import build_observation_filters, normalize_filter_params
+from vespadb.observations.utils import get_geojson_cache_key, quantize_bbox
+from vespadb.observations.views import ObservationsViewSet
+
+geojson_view = ObservationsViewSet.as_view({"get": "geojson"})
+
+
+@pytest.mark.parametrize(
+    ("bbox", "quantum", "expected"),
+    [
+        ("3.71,51.01,3.79,51.09", 0.05, "3.7000,51.0000,3.8000,51.1000"),
+        ("3.72,51.02,3.78,51.08", 0.05, "3.7000,51.0000,3.8000,51.1000"),
+        ("-0.01,-0.01,0.01,0.01", 0.05, "-0.0500,-0.0500,0.0500,0.0500"),
+        ("3.71,51.01,3.79,51.09", 0.5, "3.5000,51.0000,4.0000,51.5000"),
+    ],
+)
+def test_quantize_bbox_snaps_outwards(bbox: str, quantum: float, expected: str) -> None:
+    """The box grows to the grid, so it always contains the requested viewport."""
+    assert quantize_bbox(bbox, quantum) == expected
+
+
+@pytest.mark.parametrize("bbox", ["3.7000,51.0000,3.8000,51.1000", "3.1500,50.8500,3.2000,50.9000"])
+def test_quantize_bbox_keeps_snapped_boxes(bbox: str) -> None:
+    """A box already on the grid snaps to itself, despite floating point division."""
+    assert quantize_bbox(bbox, 0.05) == bbox
+
+
+@pytest.mark.parametrize(
+    "bbox", ["3.7,51.0,3.8", "3.7,51.0,3.8,51.1,1", "a,b,c,d", "3.8,51.0,3.7,51.1", "nan,51,3.8,52"]
+)
+def test_quantize_bbox_rejects_malformed_boxes(bbox: str) -> None:
+    """Wrong arity, non-numbers, inverted boxes and non-finite values are rejected."""
+    with pytest.raises(ValueError, match="bbox|could not convert"):
+        quantize_bbox(bbox)
+
+
+def test_nearby_viewports_share_a_cache_key() -> None:
+    """Viewports within one grid cell normalize to the same bbox and cache key."""
+    first = normalize_filter_params(QueryDict("bbox=3.71,51.01,3.79,51.09"))
+    second = normalize_filter_params(QueryDict("bbox=3.72,51.02,3.78,51.08"))
+    elsewhere = normalize_filter_params(QueryDict("bbox=4.31,51.01,4.39,51.09"))
+
+    assert first["bbox"] == second["bbox"] == "3.7000,51.0000,3.8000,51.1000"
+    assert get_geojson_cache_key(first) == get_geojson_cache_key(second)
+    assert get_geojson_cache_key(first) != get_geojson_cache_key(elsewhere)
+
+
+def test_empty_bbox_is_ignored() -> None:
+    """An empty bbox parameter does not filter."""
+    assert "bbox" not in normalize_filter_params(QueryDict("bbox="))
+
+
+def test_bbox_filters_on_the_indexed_envelope() -> None:
+    """The snapped box is bound as an envelope that the location GiST index answers."""
+    filters, params = build_observation_filters(normalize_filter_params(QueryDict("bbox=3.71,51.01,3.79,51.09")))
+
+    assert (
+        "obs.location && ST_MakeEnvelope(%(bbox_xmin)s, %(bbox_ymin)s, %(bbox_xmax)s, %(bbox_ymax)s, 4326)" in filters
+    )
+    assert [params[f"bbox_{name}"] for name in ("xmin", "ymin", "xmax", "ymax")] == pytest.approx([
+        3.7,
+        51.0,
+        3.8,
+        51.1,
+    ])
+
+
+def test_geojson_rejects_a_malformed_bbox() -> None:
+    """A malformed bbox answers 400 instead of an unfiltered or failing query."""
+    response = geojson_view(APIRequestFactory().get("/observations/dynamic-geojson/", {"bbox": "3.7,51.0"}))
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db()
+def test_geojson_returns_only_observations_in_the_bbox(make_observation: Callable[..., Observation]) -> None:
+    """Observations outside the snapped box are left out."""
+    in_ghent = make_observation(location=Point(3.7174, 51.0543, srid=4326))
+    make_observation(location=Point(4.4025, 51.2194, srid=4326))
+
+    response = geojson_view(
+        APIRequestFactory().get("/observations/dynamic-geojson/", {"bbox": "3.71,51.01,3.79,51.09"})
+    )
+
+    assert response.status_code == 200
+    assert [feature["id"] for feature in json.loads(response.content)["features"]] == [in_ghent.pk]
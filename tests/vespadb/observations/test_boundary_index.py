@@ -0,0 +1,118 @@
+"""Tests for the in-memory boundary index."""
+
+from collections.abc import Callable
+from itertools import starmap
+from typing import Any
+
+import pytest
+import shapely
+import shapely.ops
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from pyproj import Transformer
+from pytest_mock import MockerFixture
+
+from vespadb.observations import spatial_index
+from vespadb.observations.cache import invalidate_boundary_index
+from vespadb.observations.models import ANB, Municipality
+from vespadb.observations.spatial_index import BoundaryIndex
+from vespadb.observations.utils import resolve_location
+
+GHENT = (3.7174, 51.0543)
+ANTWERP = (4.4025, 51.2194)
+NORTH_SEA = (2.5, 51.5)
+
+to_lambert = Transformer.from_crs(4326, 31370, always_xy=True)
+
+
+def lambert_wkb(xmin: float, ymin: float, xmax: float, ymax: float) -> bytes:
+    """Return a longitude/latitude box as a Lambert 72 WKB polygon."""
+    return shapely.to_wkb(shapely.ops.transform(to_lambert.transform, shapely.box(xmin, ymin, xmax, ymax)))
+
+
+GHENT_BOX = lambert_wkb(3.6, 51.0, 3.8, 51.1)
+ANTWERP_BOX = lambert_wkb(4.3, 51.1, 4.5, 51.3)
+
+
+def test_resolves_municipality_province_and_anb() -> None:
+    """Each point gets its municipality, that municipality's province and whether an ANB area contains it."""
+    index = BoundaryIndex([(1, 10, GHENT_BOX), (2, 20, ANTWERP_BOX)], [ANTWERP_BOX])
+
+    assert index.resolve([GHENT, ANTWERP]) == [(1, 10, False), (2, 20, True)]
+
+
+def test_overlapping_municipalities_resolve_to_the_first() -> None:
+    """The lookup order decides between overlapping municipalities, as the PostGIS lookup orders by name."""
+    index = BoundaryIndex([(2, None, GHENT_BOX), (1, None, lambert_wkb(3.7, 51.0, 3.9, 51.1))], [])
+
+    assert index.resolve([GHENT]) == [(2, None, False)]
+
+
+def test_points_on_a_boundary_are_not_contained() -> None:
+    """Like ST_Contains, a point on the edge of a polygon is outside it."""
+    x, y = to_lambert.transform(*GHENT)
+    edge = shapely.to_wkb(shapely.box(x, y - 10, x + 10, y + 10))
+
+    assert BoundaryIndex([(1, None, edge)], [edge]).resolve([GHENT]) == [(None, None, False)]
+
+
+def test_points_outside_every_municipality_have_no_province() -> None:
+    """The province follows the municipality, so a point in no municipality has neither."""
+    index = BoundaryIndex([(1, 10, GHENT_BOX)], [ANTWERP_BOX])
+
+    assert index.resolve([ANTWERP, (0.0, 0.0)]) == [(None, None, True), (None, None, False)]
+
+
+def test_index_is_reloaded_after_invalidation(mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Every process keeps its index until the boundaries generation moves."""
+    monkeypatch.setattr(spatial_index, "_index", None)
+    load = mocker.patch.object(BoundaryIndex, "load", side_effect=object)
+
+    first = spatial_index.get_boundary_index()
+    monkeypatch.setattr(spatial_index, "_index_checked_at", float("-inf"))
+    assert spatial_index.get_boundary_index() is first
+    invalidate_boundary_index()
+    monkeypatch.setattr(spatial_index, "_index_checked_at", float("-inf"))
+
+    assert spatial_index.get_boundary_index() is not first
+    assert load.call_count == 2
+
+
+def test_generation_is_checked_once_per_interval(mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Within the check interval the index is returned without reading the boundaries generation."""
+    monkeypatch.setattr(spatial_index, "_index", None)
+    mocker.patch.object(BoundaryIndex, "load", side_effect=object)
+    clock = mocker.patch.object(spatial_index.time, "monotonic", return_value=1000.0)
+    get_generation = mocker.spy(spatial_index, "get_cache_generation")
+
+    first = spatial_index.get_boundary_index()
+    invalidate_boundary_index()
+    clock.return_value += spatial_index.GENERATION_CHECK_INTERVAL - 1
+    assert spatial_index.get_boundary_index() is first
+    assert get_generation.call_count == 1
+
+    clock.return_value += 1
+    assert spatial_index.get_boundary_index() is not first
+    assert get_generation.call_count == 2
+
+
+@pytest.mark.django_db()
+def test_index_agrees_with_postgis(
+    settings: Any, monkeypatch: pytest.MonkeyPatch, make_municipality: Callable[..., Municipality]
+) -> None:
+    """The index and the PostGIS lookups resolve the same municipality and ANB flag."""
+    make_municipality("Gent")
+    make_municipality("Antwerpen", bbox=(4.3, 51.1, 4.5, 51.3))
+    make_municipality("Zelzate", bbox=(3.7, 51.0, 3.9, 51.1))
+    park = MultiPolygon(Polygon.from_bbox((4.39, 51.21, 4.41, 51.23)), srid=4326)
+    park.transform(31370)
+    ANB.objects.create(domain="Park", province="Antwerpen", polygon=park)
+    monkeypatch.setattr(spatial_index, "_index", None)
+    points = [GHENT, ANTWERP, NORTH_SEA]
+
+    settings.BOUNDARY_INDEX_ENABLED = False
+    from_postgis = list(starmap(resolve_location, points))
+    settings.BOUNDARY_INDEX_ENABLED = True
+    from_index = list(starmap(resolve_location, points))
+
+    assert from_index == from_postgis
+    assert [anb for _, _, anb in from_index] == [False, True, False]
@@ -0,0 +1,78 @@
+"""Tests for the generation-based cache invalidation."""
+
+from django.core.cache import cache
+from django.http import QueryDict
+from pytest_mock import MockerFixture
+
+from vespadb.observations.cache import (
+    GEOJSON_CACHE_FAMILY,
+    MUNICIPALITIES_CACHE_FAMILY,
+    OBSERVATIONS_LIST_CACHE_FAMILY,
+    bump_cache_generation,
+    get_cache_generation,
+    invalidate_geojson_cache,
+    invalidate_municipality_cache,
+    invalidate_observation_caches,
+)
+from vespadb.observations.queries import normalize_filter_params
+from vespadb.observations.utils import get_geojson_cache_key, get_tile_cache_key
+
+
+def test_generation_is_seeded_once_and_bumped_by_one() -> None:
+    """A family keeps its generation until it is bumped, and every bump moves it forward by one."""
+    generation = get_cache_generation(GEOJSON_CACHE_FAMILY)
+
+    assert get_cache_generation(GEOJSON_CACHE_FAMILY) == generation
+    assert bump_cache_generation(GEOJSON_CACHE_FAMILY) == generation + 1
+    assert get_cache_generation(GEOJSON_CACHE_FAMILY) == generation + 1
+
+
+def test_bumping_an_unseeded_family_seeds_it() -> None:
+    """The first bump of a family works without reading it first."""
+    generation = bump_cache_generation(MUNICIPALITIES_CACHE_FAMILY)
+
+    assert get_cache_generation(MUNICIPALITIES_CACHE_FAMILY) == generation
+
+
+def test_invalidate_geojson_cache_orphans_geojson_and_tile_keys(mocker: MockerFixture) -> None:
+    """GeoJSON and tile keys move to the new generation and a rebuild of the prewarmed caches is requested."""
+    rebuild = mocker.patch("vespadb.observations.tasks.cache_rebuild.rebuild_all_prewarmed_caches")
+    query_params = normalize_filter_params(QueryDict(""))
+    geojson_key = get_geojson_cache_key(query_params)
+    tile_key = get_tile_cache_key(query_params, 10, 524, 343)
+    list_generation = get_cache_generation(OBSERVATIONS_LIST_CACHE_FAMILY)
+
+    invalidate_geojson_cache()
+
+    assert get_geojson_cache_key(query_params) != geojson_key
+    assert get_tile_cache_key(query_params, 10, 524, 343) != tile_key
+    assert get_cache_generation(OBSERVATIONS_LIST_CACHE_FAMILY) == list_generation
+    assert rebuild.mock_calls
+
+
+def test_invalidate_observation_caches_bumps_the_list_and_geojson_families(mocker: MockerFixture) -> None:
+    """An observation write moves the list and GeoJSON families and drops the single observation entry."""
+    mocker.patch("vespadb.observations.tasks.cache_rebuild.rebuild_all_prewarmed_caches")
+    generations = {
+        family: get_cache_generation(family)
+        for family in (GEOJSON_CACHE_FAMILY, OBSERVATIONS_LIST_CACHE_FAMILY, MUNICIPALITIES_CACHE_FAMILY)
+    }
+    cache.set("vespadb::observations::1", {"id": 1})
+
+    invalidate_observation_caches("1")
+
+    assert get_cache_generation(GEOJSON_CACHE_FAMILY) == generations[GEOJSON_CACHE_FAMILY] + 1
+    assert get_cache_generation(OBSERVATIONS_LIST_CACHE_FAMILY) == generations[OBSERVATIONS_LIST_CACHE_FAMILY] + 1
+    assert get_cache_generation(MUNICIPALITIES_CACHE_FAMILY) == generations[MUNICIPALITIES_CACHE_FAMILY]
+    assert cache.get("vespadb::observations::1") is None
+
+
+def test_invalidate_municipality_cache_only_bumps_its_own_family() -> None:
+    """The municipality lists are invalidated without touching the observation families."""
+    generations = {
+        family: get_cache_generation(family) for family in (GEOJSON_CACHE_FAMILY, OBSERVATIONS_LIST_CACHE_FAMILY)
+    }
+
+    invalidate_municipality_cache()
+
+    assert {family: get_cache_generation(family) for family in generations} == generations
@@ -0,0 +1,134 @@
+"""Tests for the debounced rebuild of the pre-warmed GeoJSON caches."""
+
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from pytest_mock import MockerFixture
+
+from vespadb.observations.cache import increment_metric
+from vespadb.observations.tasks import cache_rebuild
+from vespadb.observations.tasks.cache_rebuild import (
+    LOCK_EXPIRE,
+    REBUILD_LAST_WRITE_KEY,
+    REBUILD_LOCK_KEY,
+    REBUILD_PENDING_KEY,
+    get_rebuild_metrics,
+    rebuild_all_prewarmed_caches,
+    schedule_prewarm_rebuild,
+)
+
+
+@pytest.fixture()
+def apply_async(mocker: MockerFixture) -> MagicMock:
+    """Capture the queued rebuild tasks instead of sending them to the broker."""
+    return mocker.patch.object(rebuild_all_prewarmed_caches, "apply_async")
+
+
+@pytest.fixture()
+def regenerate(mocker: MockerFixture) -> MagicMock:
+    """Replace the regeneration of the pre-warmed configurations."""
+    return mocker.patch.object(cache_rebuild, "generate_all_geojson_task")
+
+
+def counters() -> dict[str, int]:
+    """Return the scheduler counters that changed."""
+    return {name: value for name, value in get_rebuild_metrics().items() if type(value) is int and value}
+
+
+def writes(first_ago: float, last_ago: float) -> None:
+    """Mark a rebuild pending for writes between `first_ago` and `last_ago` seconds ago."""
+    now = time.time()
+    cache.set(REBUILD_PENDING_KEY, now - first_ago)
+    cache.set(REBUILD_LAST_WRITE_KEY, now - last_ago)
+
+
+def test_a_burst_of_writes_queues_one_rebuild(apply_async: MagicMock) -> None:
+    """The first write queues the trailing rebuild and later writes fold into it."""
+    for _ in range(5):
+        schedule_prewarm_rebuild()
+
+    apply_async.assert_called_once_with(countdown=settings.GEOJSON_REBUILD_DEBOUNCE_SECONDS)
+    assert counters() == {"requested": 5, "scheduled": 1, "coalesced": 4}
+    assert get_rebuild_metrics()["pending"] is True
+
+
+def test_rebuild_is_deferred_while_writes_keep_coming(apply_async: MagicMock, regenerate: MagicMock) -> None:
+    """A write within the debounce window slides the rebuild to the end of the window."""
+    writes(first_ago=20, last_ago=5)
+
+    rebuild_all_prewarmed_caches()
+
+    regenerate.assert_not_called()
+    (countdown,) = apply_async.call_args.kwargs.values()
+    assert countdown == pytest.approx(settings.GEOJSON_REBUILD_DEBOUNCE_SECONDS - 5, abs=1)
+    assert counters() == {"deferred": 1}
+
+
+@pytest.mark.parametrize(
+    ("first_ago", "last_ago"),
+    [
+        (60, 60),
+        (settings.GEOJSON_REBUILD_MAX_DELAY_SECONDS + 1, 1),
+    ],
+)
+def test_rebuild_runs_once_quiet_or_overdue(
+    apply_async: MagicMock, regenerate: MagicMock, first_ago: float, last_ago: float
+) -> None:
+    """The rebuild runs after a quiet window, or when the first write it covers waited the maximum delay."""
+    writes(first_ago, last_ago)
+
+    rebuild_all_prewarmed_caches()
+
+    assert regenerate.called
+    apply_async.assert_not_called()
+    assert counters() == {"completed": 1}
+    assert cache.get(REBUILD_PENDING_KEY) is None
+    assert cache.get(REBUILD_LOCK_KEY) is None
+
+
+def test_rebuild_in_flight_postpones_the_next_one(apply_async: MagicMock, regenerate: MagicMock) -> None:
+    """While another worker holds the lock, the run is pushed back instead of regenerating twice."""
+    writes(first_ago=60, last_ago=60)
+    cache.set(REBUILD_LOCK_KEY, "locked")
+
+    rebuild_all_prewarmed_caches()
+
+    regenerate.assert_not_called()
+    apply_async.assert_called_once_with(countdown=settings.GEOJSON_REBUILD_DEBOUNCE_SECONDS)
+    assert counters() == {"skipped": 1}
+
+
+def test_a_write_during_the_rebuild_queues_a_trailing_run(apply_async: MagicMock, regenerate: MagicMock) -> None:
+    """Writes that arrive after the rebuild started are not covered by it, so they queue a new one."""
+    writes(first_ago=60, last_ago=60)
+    regenerate.side_effect = lambda *args, **kwargs: schedule_prewarm_rebuild()
+
+    rebuild_all_prewarmed_caches()
+
+    assert apply_async.call_count == 1
+    assert counters()["scheduled"] == 1
+    assert counters()["completed"] == 1
+    assert get_rebuild_metrics()["pending"] is True
+
+
+def test_the_lock_is_held_as_long_as_the_task_may_run(
+    apply_async: MagicMock, regenerate: MagicMock, mocker: MockerFixture
+) -> None:
+    """A slow rebuild is killed by its time limit before its lock can expire under it."""
+    writes(first_ago=60, last_ago=60)
+    add = mocker.spy(cache, "add")
+
+    rebuild_all_prewarmed_caches()
+
+    add.assert_any_call(REBUILD_LOCK_KEY, "locked", timeout=LOCK_EXPIRE)
+    assert rebuild_all_prewarmed_caches.time_limit <= LOCK_EXPIRE
+
+
+def test_counters_are_shared_metrics() -> None:
+    """The rebuild counters are read from the same metrics as every other counter."""
+    increment_metric("geojson_rebuild:failed")
+
+    assert counters() == {"failed": 1}
@@ -0,0 +1,78 @@
+"""Tests that the CET datetime fast path renders exactly what the parsing path rendered."""
+
+from datetime import UTC, datetime, timedelta, timezone
+
+import pytest
+from rest_framework import serializers
+
+from vespadb.observations.helpers import format_cet_datetime, parse_and_convert_to_cet
+from vespadb.observations.serializers import CETDateTimeField
+
+CET_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+AWARE_VALUES = [
+    datetime(2025, 1, 15, 11, 30, 5, tzinfo=UTC),
+    datetime(2025, 7, 1, 23, 59, 59, 999999, tzinfo=UTC),
+    datetime(2025, 12, 31, 23, 30, tzinfo=UTC),
+    # The last second of CET and the first of CEST.
+    datetime(2025, 3, 30, 0, 59, 59, tzinfo=UTC),
+    datetime(2025, 3, 30, 1, 0, 0, tzinfo=UTC),
+    # Both passes through the repeated hour when CEST ends.
+    datetime(2025, 10, 26, 0, 30, tzinfo=UTC),
+    datetime(2025, 10, 26, 1, 30, tzinfo=UTC),
+    datetime(2025, 10, 26, 2, 0, 0, 500000, tzinfo=UTC),
+    datetime(2025, 6, 1, 12, tzinfo=timezone(timedelta(hours=-5))),
+]
+NAIVE_VALUES = [  # naive values are taken to be CET already
+    datetime(2025, 1, 15, 12, 30, 5),  # noqa: DTZ001
+    datetime(2025, 3, 30, 1, 59, 59, 999999),  # noqa: DTZ001
+    datetime(2025, 3, 30, 3, 0, 0),  # noqa: DTZ001
+    datetime(2025, 10, 26, 3, 0, 0),  # noqa: DTZ001
+]
+
+
+def serializer_before(value: datetime) -> str:
+    """Render a datetime the way ObservationSerializer did: to an ISO string, parsed back and reformatted."""
+    return parse_and_convert_to_cet(serializers.DateTimeField().to_representation(value)).strftime(CET_FORMAT)
+
+
+def export_before(value: datetime) -> str:
+    """Render a datetime the way the CSV export did."""
+    return parse_and_convert_to_cet(value).replace(microsecond=0).strftime(CET_FORMAT)
+
+
+@pytest.mark.parametrize("value", AWARE_VALUES + NAIVE_VALUES, ids=lambda value: value.isoformat())
+def test_fast_path_matches_the_parsing_paths(value: datetime) -> None:
+    """Aware values are converted to CET and naive ones taken as CET, to the second, as before."""
+    expected = serializer_before(value)
+
+    assert export_before(value) == expected
+    assert format_cet_datetime(value) == expected
+    assert CETDateTimeField().to_representation(value) == expected
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        (datetime(2025, 3, 30, 0, 59, 59, tzinfo=UTC), "2025-03-30T01:59:59"),
+        (datetime(2025, 3, 30, 1, 0, 0, tzinfo=UTC), "2025-03-30T03:00:00"),
+        (datetime(2025, 10, 26, 0, 30, tzinfo=UTC), "2025-10-26T02:30:00"),
+        (datetime(2025, 10, 26, 1, 30, tzinfo=UTC), "2025-10-26T02:30:00"),
+    ],
+)
+def test_dst_boundaries(value: datetime, expected: str) -> None:
+    """Clocks jump forward an hour in March and repeat an hour in October."""
+    assert format_cet_datetime(value) == expected
+
+
+def test_strings_are_parsed_as_before() -> None:
+    """The field still accepts ISO strings, for values that were never loaded from the database."""
+    assert CETDateTimeField().to_representation("2025-07-01T10:00:00Z") == serializer_before(
+        datetime(2025, 7, 1, 10, tzinfo=UTC)
+    )
+
+
+def test_none_renders_as_none() -> None:
+    """Missing datetimes stay None, as the serializer skipped them before."""
+    assert format_cet_datetime(None) is None
+    assert CETDateTimeField().to_representation(None) is None
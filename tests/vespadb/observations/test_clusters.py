@@ -0,0 +1,88 @@
+"""Tests for the server-side clustering of dynamic-geojson."""
+
+import json
+from collections.abc import Callable
+
+import pytest
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.http import QueryDict
+from rest_framework.test import APIRequestFactory
+
+from vespadb.observations.models import Observation
+from vespadb.observations.queries import build_cluster_query, normalize_filter_params, resolve_cluster_zoom
+from vespadb.observations.utils import get_geojson_cache_key
+from vespadb.observations.views import ObservationsViewSet
+
+geojson_view = ObservationsViewSet.as_view({"get": "geojson"})
+
+
+@pytest.mark.parametrize(
+    ("zoom", "expected"),
+    [
+        ("5", 5),
+        ("5.7", 5),
+        ("0", 0),
+        ("12", None),
+        ("18", None),
+        ("-1", None),
+        ("far", None),
+        ("", None),
+    ],
+)
+def test_resolve_cluster_zoom(zoom: str, expected: int | None) -> None:
+    """Only zoom levels below the threshold cluster, and only those are kept in the parameters."""
+    query_params = QueryDict(f"zoom={zoom}", mutable=True)
+
+    assert resolve_cluster_zoom(query_params) == expected
+    assert query_params.get("zoom") == (None if expected is None else str(expected))
+
+
+def test_point_zoom_levels_share_one_cache_entry() -> None:
+    """Every zoom level at or past the threshold returns the same points, so it shares the key of no zoom."""
+
+    def cache_key(query: str) -> str:
+        query_params = normalize_filter_params(QueryDict(query))
+        resolve_cluster_zoom(query_params)
+        return get_geojson_cache_key(query_params)
+
+    assert cache_key("zoom=13") == cache_key("zoom=18") == cache_key("")
+    assert len({cache_key("zoom=5"), cache_key("zoom=6"), cache_key("")}) == 3
+
+
+@pytest.mark.parametrize("zoom", [0, 5, 11])
+def test_build_cluster_query_cell_size_follows_the_zoom(zoom: int) -> None:
+    """Each zoom level halves the grid cell and the filters still apply."""
+    sql, params = build_cluster_query(normalize_filter_params(QueryDict("anb=true")), zoom)
+
+    assert params["cell_size"] == 360.0 / (2**zoom * settings.GEOJSON_CLUSTER_GRID_DIVISIONS)
+    assert params["anb"] is True
+    assert "obs.anb = %(anb)s" in sql
+    assert "GROUP BY floor(ST_X(location) / %(cell_size)s), floor(ST_Y(location) / %(cell_size)s)" in sql
+
+
+@pytest.mark.django_db()
+def test_geojson_clusters_observations_per_grid_cell(make_observation: Callable[..., Observation]) -> None:
+    """Observations in one grid cell become one feature with the total and the count per nest status."""
+    make_observation(location=Point(3.7174, 51.0543, srid=4326))
+    make_observation(location=Point(3.7200, 51.0500, srid=4326), eradication_result="successful")
+    make_observation(location=Point(4.4025, 51.2194, srid=4326))
+    make_observation(location=Point(4.4025, 51.2194, srid=4326), visible=False)
+
+    response = geojson_view(APIRequestFactory().get("/observations/dynamic-geojson/", {"zoom": "8"}))
+
+    assert response.status_code == 200
+    features = json.loads(response.content)["features"]
+    clusters = sorted((feature["properties"] for feature in features), key=lambda cluster: cluster["count"])
+    assert clusters == [
+        {
+            "cluster": True,
+            "count": 1,
+            "status_counts": {"eradicated": 0, "visited": 0, "reserved": 0, "untreated": 1},
+        },
+        {
+            "cluster": True,
+            "count": 2,
+            "status_counts": {"eradicated": 1, "visited": 0, "reserved": 0, "untreated": 1},
+        },
+    ]
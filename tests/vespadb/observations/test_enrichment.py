@@ -0,0 +1,105 @@
+"""Tests for the set-based spatial enrichment."""
+
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from pytest_mock import MockerFixture
+
+from vespadb.observations import enrichment, spatial_index
+from vespadb.observations.enrichment import build_reenrichment_query, reenrich_observations, resolve_locations
+from vespadb.observations.models import ANB, Municipality, Observation
+
+GHENT = (3.7174, 51.0543)
+ANTWERP = (4.4025, 51.2194)
+NORTH_SEA = (2.5, 51.5)
+
+
+def test_reenrichment_query_restricts_the_id_range() -> None:
+    """The optional id bounds become bound parameters of the UPDATE."""
+    sql, params = build_reenrichment_query(10, 20)
+
+    assert "WHERE obs.location IS NOT NULL AND obs.id >= %(min_id)s AND obs.id <= %(max_id)s" in sql
+    assert params == {"min_id": 10, "max_id": 20}
+    assert build_reenrichment_query()[1] == {}
+
+
+def test_resolve_locations_uses_the_boundary_index(settings: Any, mocker: MockerFixture) -> None:
+    """With the index enabled the batch is resolved in memory, without a statement."""
+    settings.BOUNDARY_INDEX_ENABLED = True
+    resolve_points = mocker.patch("vespadb.observations.spatial_index.resolve_points", return_value=[(1, 2, True)])
+    enrich_points = mocker.patch.object(enrichment, "enrich_points")
+
+    assert resolve_locations([GHENT]) == [(1, 2, True)]
+    assert resolve_locations([]) == []
+    resolve_points.assert_called_once_with([GHENT])
+    enrich_points.assert_not_called()
+
+
+@pytest.fixture()
+def boundaries(make_municipality: Callable[..., Municipality]) -> dict[str, Municipality]:
+    """Create Ghent, Antwerp and an ANB area in Antwerp."""
+    park = MultiPolygon(Polygon.from_bbox((4.39, 51.21, 4.41, 51.23)), srid=4326)
+    park.transform(31370)
+    ANB.objects.create(domain="Park", province="Antwerpen", polygon=park)
+    return {
+        "Gent": make_municipality("Gent"),
+        "Antwerpen": make_municipality("Antwerpen", bbox=(4.3, 51.1, 4.5, 51.3)),
+    }
+
+
+@pytest.mark.django_db()
+def test_one_join_per_batch_agrees_with_the_index(
+    settings: Any, monkeypatch: pytest.MonkeyPatch, boundaries: dict[str, Municipality]
+) -> None:
+    """The spatial join resolves every point of every batch like the in-memory index."""
+    monkeypatch.setattr(enrichment, "ENRICHMENT_BATCH_SIZE", 2)
+    monkeypatch.setattr(spatial_index, "_index", None)
+    points = [GHENT, ANTWERP, NORTH_SEA]
+
+    settings.BOUNDARY_INDEX_ENABLED = False
+    from_sql = resolve_locations(points)
+    settings.BOUNDARY_INDEX_ENABLED = True
+
+    assert from_sql == resolve_locations(points)
+    assert from_sql == [
+        (boundaries["Gent"].pk, None, False),
+        (boundaries["Antwerpen"].pk, None, True),
+        (None, None, False),
+    ]
+
+
+@pytest.mark.django_db()
+def test_reenrichment_only_writes_changed_rows(
+    boundaries: dict[str, Municipality], make_observation: Callable[..., Observation]
+) -> None:
+    """Stale enrichment is corrected within the id range, and a second run changes nothing."""
+    in_ghent = make_observation(municipality=boundaries["Antwerpen"], anb=True)
+    in_antwerp = make_observation(location=Point(*ANTWERP, srid=4326))
+    out_of_range = make_observation(municipality=boundaries["Antwerpen"])
+
+    summary = reenrich_observations(in_ghent.pk, in_antwerp.pk)
+
+    assert summary == {"checked": 2, "changed": 2, "municipality": 2, "province": 0, "anb": 2}
+    assert reenrich_observations(in_ghent.pk, in_antwerp.pk)["changed"] == 0
+    rows = dict(Observation.objects.values_list("pk", "municipality_id"))
+    assert rows == {
+        in_ghent.pk: boundaries["Gent"].pk,
+        in_antwerp.pk: boundaries["Antwerpen"].pk,
+        out_of_range.pk: boundaries["Antwerpen"].pk,
+    }
+    assert list(Observation.objects.filter(anb=True).values_list("pk", flat=True)) == [in_antwerp.pk]
+
+
+@pytest.mark.django_db()
+def test_dry_run_only_reports(
+    boundaries: dict[str, Municipality], make_observation: Callable[..., Observation]
+) -> None:
+    """A dry run counts the same changes without writing them."""
+    observation = make_observation(municipality=boundaries["Antwerpen"])
+
+    summary = reenrich_observations(dry_run=True)
+
+    assert summary == {"checked": 1, "changed": 1, "municipality": 1, "province": 0, "anb": 0}
+    assert Observation.objects.get(pk=observation.pk).municipality_id == boundaries["Antwerpen"].pk
@@ -0,0 +1,140 @@
+"""Tests for the constant-memory export writers."""
+
+import gzip
+from typing import Any
+
+import pytest
+
+from vespadb.observations.export_storage import (
+    S3_MIN_PART_SIZE,
+    S3MultipartWriter,
+    open_binary_export,
+    open_text_export,
+)
+
+
+class FakeS3Client:
+    """Records the multipart calls of one upload and assembles the object on completion."""
+
+    def __init__(self) -> None:
+        self.parts: dict[int, bytes] = {}
+        self.objects: dict[str, bytes] = {}
+        self.content_types: dict[str, str] = {}
+        self.aborted: list[str] = []
+
+    def create_multipart_upload(self, **kwargs: Any) -> dict[str, str]:
+        """Start the upload and remember its content type."""
+        self.content_types[kwargs["Key"]] = kwargs["ContentType"]
+        return {"UploadId": "upload-1"}
+
+    def upload_part(self, **kwargs: Any) -> dict[str, str]:
+        """Store one part."""
+        assert kwargs["UploadId"] == "upload-1"
+        self.parts[kwargs["PartNumber"]] = kwargs["Body"]
+        return {"ETag": f"etag-{kwargs['PartNumber']}"}
+
+    def complete_multipart_upload(self, **kwargs: Any) -> None:
+        """Assemble the object from the listed parts."""
+        parts = kwargs["MultipartUpload"]["Parts"]
+        assert [part["ETag"] for part in parts] == [f"etag-{part['PartNumber']}" for part in parts]
+        self.objects[kwargs["Key"]] = b"".join(self.parts[part["PartNumber"]] for part in parts)
+
+    def abort_multipart_upload(self, **kwargs: Any) -> None:
+        """Record the aborted key."""
+        self.aborted.append(kwargs["Key"])
+
+
+class FakeBucket:
+    """The parts of an S3Boto3Storage bucket that the export writers use."""
+
+    name = "exports"
+
+    def __init__(self, client: FakeS3Client) -> None:
+        self.meta = type("Meta", (), {"client": client})()
+
+
+class FakeS3Storage:
+    """A storage that looks like S3Boto3Storage to the export writers."""
+
+    location = "media"
+
+    def __init__(self) -> None:
+        self.client = FakeS3Client()
+        self.bucket = FakeBucket(self.client)
+
+
+def test_writer_splits_parts_at_the_part_size() -> None:
+    """Full parts are uploaded while writing; the remainder becomes the last, smaller part."""
+    client = FakeS3Client()
+    writer = S3MultipartWriter(client, "exports", "export.csv", S3_MIN_PART_SIZE, "text/csv")
+    data = bytes(range(256)) * (S3_MIN_PART_SIZE // 256 * 2 + 100)
+    for start in range(0, len(data), 1_000_000):
+        writer.write(data[start : start + 1_000_000])
+    assert list(client.parts) == [1, 2]
+
+    writer.close()
+
+    assert [len(part) for part in client.parts.values()] == [S3_MIN_PART_SIZE, S3_MIN_PART_SIZE, 25600]
+    assert client.objects["export.csv"] == data
+    assert writer.bytes_written == len(data)
+
+
+def test_writer_raises_small_part_sizes_to_the_s3_minimum() -> None:
+    """Parts below 5 MiB would be rejected by S3, so they are never used."""
+    client = FakeS3Client()
+    with S3MultipartWriter(client, "exports", "export.csv", 1024, "text/csv") as writer:
+        writer.write(b"x" * (S3_MIN_PART_SIZE + 1))
+
+    assert [len(part) for part in client.parts.values()] == [S3_MIN_PART_SIZE, 1]
+
+
+def test_writer_uploads_one_empty_part_for_an_empty_file() -> None:
+    """A multipart upload needs at least one part."""
+    client = FakeS3Client()
+    S3MultipartWriter(client, "exports", "empty.csv", S3_MIN_PART_SIZE, "text/csv").close()
+
+    assert client.objects == {"empty.csv": b""}
+
+
+def test_abort_discards_the_upload() -> None:
+    """An aborted upload is never completed and rejects further writes."""
+    client = FakeS3Client()
+    writer = S3MultipartWriter(client, "exports", "export.csv", S3_MIN_PART_SIZE, "text/csv")
+    writer.write(b"x" * (S3_MIN_PART_SIZE + 10))
+
+    writer.abort()
+    writer.close()
+
+    assert client.aborted == ["export.csv"]
+    assert client.objects == {}
+    with pytest.raises(ValueError, match="closed"):
+        writer.write(b"more")
+
+
+def test_open_binary_export_aborts_on_error() -> None:
+    """An error inside the block aborts the upload, so no partial file appears."""
+    storage = FakeS3Storage()
+
+    def fail_halfway() -> None:
+        with open_binary_export("export.csv", storage=storage) as stream:
+            stream.write(b"id\n1\n")
+            raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        fail_halfway()
+
+    assert storage.client.aborted == ["media/export.csv"]
+    assert storage.client.objects == {}
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_open_text_export_writes_through_the_upload(compress: bool) -> None:
+    """Text written to the export ends up as the object, gzipped when asked."""
+    storage = FakeS3Storage()
+    text = "".join(f"{number},Gemeente {number}\n" for number in range(200_000))
+    with open_text_export("export.csv", compress=compress, storage=storage) as stream:
+        stream.write(text)
+
+    body = storage.client.objects["media/export.csv"]
+    assert (gzip.decompress(body) if compress else body).decode("utf-8") == text
+    assert storage.client.content_types["media/export.csv"] == ("application/gzip" if compress else "text/csv")
@@ -0,0 +1,220 @@
+"""Tests for the normalized observation map filters."""
+
+from collections.abc import Callable
+from datetime import date
+
+import pytest
+from django.db import connection
+from django.db.models import Q
+from django.http import QueryDict
+from pytest_mock import MockerFixture
+from rest_framework.exceptions import ValidationError
+
+from vespadb.observations.filter_spec import NEST_STATUSES, FilterSpec, get_nest_status, nest_status_q
+from vespadb.observations.filters import ObservationFilter
+from vespadb.observations.models import Observation
+from vespadb.observations.queries import OBSERVATION_TABLE
+from vespadb.users.models import VespaUser
+
+
+def test_from_params_normalizes_query_parameters() -> None:
+    """Repeated and comma-separated values are merged, sorted and deduplicated; other parameters are ignored."""
+    spec = FilterSpec.from_params(
+        QueryDict(
+            "municipality_id=3,1&municipality_id=2&municipality_id=3&nest_status=open&nest_status=eradicated"
+            "&anb=1&min_observation_datetime=2025-04-01T00:00:00Z&nest_type=b,a&page=2"
+        )
+    )
+
+    assert spec == FilterSpec(
+        visible=True,
+        min_observation_datetime="2025-04-01T02:00:00+02:00",
+        municipality_ids=(1, 2, 3),
+        nest_types=("a", "b"),
+        anb=True,
+        nest_statuses=("eradicated", "untreated"),
+    )
+
+
+def test_spellings_of_the_same_filters_share_a_cache_key() -> None:
+    """Prewarm aliases, native values, time zones and bboxes within one grid cell all normalize alike."""
+    from_request = FilterSpec.from_params(
+        QueryDict(
+            "municipality_id=3,1,2&nest_status=open,eradicated&anb=true"
+            "&bbox=3.71,51.01,3.79,51.09&min_observation_datetime=2025-04-01T00:00:00Z"
+        )
+    )
+    from_config = FilterSpec.from_params({
+        "municipalities": [2, 1, 3, 3],
+        "nest_status": ["eradicated", "untreated"],
+        "anb_areas_actief": True,
+        "bbox": "3.72,51.02,3.78,51.08",
+        "min_observation_datetime": "2025-04-01T02:00:00+02:00",
+    })
+
+    assert from_request == from_config
+    assert from_request.cache_key() == from_config.cache_key()
+    assert from_request.cache_key() == (
+        "anb=true&bbox=3.7000,51.0000,3.8000,51.1000&min_observation_datetime=2025-04-01T02:00:00+02:00"
+        "&municipality_id=1,2,3&nest_status=eradicated,untreated&visible=true"
+    )
+
+
+@pytest.mark.parametrize(
+    ("params", "expected"),
+    [
+        ({}, True),
+        ({"visible": "false"}, False),
+        ({"visible": "0"}, False),
+        ({"visible": "all"}, None),
+        ({"visible": "All"}, None),
+    ],
+)
+def test_visible_defaults_to_true(params: dict[str, str], expected: bool | None) -> None:
+    """Only visible observations unless `visible` says otherwise; `all` drops the filter."""
+    assert FilterSpec.from_params(params).visible is expected
+
+
+def test_different_filters_get_different_cache_keys() -> None:
+    """Specs selecting different observations never share a cache entry."""
+    keys = {
+        FilterSpec.from_params(params).cache_key()
+        for params in (
+            {},
+            {"visible": "all"},
+            {"anb": "false"},
+            {"municipality_id": "1"},
+            {"province_id": "1"},
+            {"nest_status": "reserved"},
+        )
+    }
+    assert len(keys) == 6
+
+
+def test_to_query_dict_round_trips() -> None:
+    """The canonical query parameters parse back into the same spec."""
+    spec = FilterSpec.from_params({
+        "province_id": "2,1",
+        "nest_type": "actief_primair_nest",
+        "visible": "all",
+        "nest_status": "visited",
+    })
+
+    assert FilterSpec.from_params(spec.to_query_dict()) == spec
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"visible": "maybe"},
+        {"anb": "yes"},
+        {"municipality_id": "gent"},
+        {"min_observation_datetime": "not a date"},
+    ],
+)
+def test_from_params_rejects_malformed_values(params: dict[str, str]) -> None:
+    """Malformed filter values raise ValueError, which the views turn into a 400."""
+    with pytest.raises(ValueError, match="Invalid"):
+        FilterSpec.from_params(params)
+
+
+def test_unknown_nest_statuses_are_ignored() -> None:
+    """Unknown nest statuses do not filter anything."""
+    assert FilterSpec.from_params({"nest_status": "unknown"}).nest_statuses == ()
+
+
+def test_to_sql_binds_every_value_under_the_prefix() -> None:
+    """All values are bound as named parameters, so several specs can share one statement."""
+    spec = FilterSpec.from_params({"municipality_id": "2,1", "anb": "false", "nest_status": "reserved"})
+
+    conditions, params = spec.to_sql("v1_")
+
+    assert conditions == [
+        "obs.visible = %(v1_visible)s",
+        "obs.municipality_id IN %(v1_municipality_id)s",
+        "obs.anb = %(v1_anb)s",
+        "((obs.eradication_result IS NULL AND obs.reserved_by_id IS NOT NULL))",
+    ]
+    assert params == {"v1_visible": True, "v1_municipality_id": (1, 2), "v1_anb": False}
+
+
+def test_to_q_follows_the_same_filters() -> None:
+    """The Q object filters the same columns as the SQL conditions, in the same order."""
+    spec = FilterSpec.from_params({"municipality_id": "2,1", "anb": "false", "nest_status": "reserved"})
+
+    assert spec.to_q() == Q(visible=True) & Q(municipality_id__in=(1, 2)) & Q(anb=False) & nest_status_q(["reserved"])
+    assert FilterSpec(visible=None).to_q() == Q()
+
+
+def test_observation_filter_compiles_through_the_spec(mocker: MockerFixture) -> None:
+    """The REST filters go through FilterSpec, without the map's visible-only default."""
+    from_params = mocker.spy(FilterSpec, "from_params")
+
+    queryset = ObservationFilter(
+        data=QueryDict("municipality_id=1&nest_status=open&nest_type=a,b&min_created_datetime="),
+        queryset=Observation.objects.all(),
+    ).qs
+
+    assert queryset.model is Observation
+    assert from_params.spy_return == FilterSpec(
+        visible=None, municipality_ids=(1,), nest_types=("a", "b"), nest_statuses=("untreated",)
+    )
+
+
+def test_observation_filter_rejects_malformed_values() -> None:
+    """A value the spec cannot parse is a validation error, which DRF turns into a 400."""
+    with pytest.raises(ValidationError, match="municipality_id"):
+        ObservationFilter(data=QueryDict("municipality_id=gent"), queryset=Observation.objects.all()).qs.count()
+
+
+@pytest.mark.parametrize(
+    ("eradication_result", "reserved_by_id", "expected"),
+    [
+        ("successful", 1, "eradicated"),
+        ("unsuccessful", None, "visited"),
+        (None, 1, "reserved"),
+        (None, None, "untreated"),
+    ],
+)
+def test_get_nest_status(eradication_result: str | None, reserved_by_id: int | None, expected: str) -> None:
+    """The eradication result decides before the reservation."""
+    assert get_nest_status(eradication_result, reserved_by_id) == expected
+
+
+@pytest.mark.django_db()
+def test_nest_status_definitions_agree(
+    make_user: Callable[[str], VespaUser], make_observation: Callable[..., Observation]
+) -> None:
+    """The Q objects, the SQL conditions and the Python status select the same observations."""
+    alice = make_user("alice")
+    observations = [
+        make_observation(),
+        make_observation(reserved_by=alice),
+        make_observation(reserved_by=alice, eradication_result="successful", eradication_date=date(2025, 5, 1)),
+        make_observation(eradication_result="unsuccessful", eradication_date=date(2025, 5, 1)),
+    ]
+
+    for status in NEST_STATUSES:
+        expected = {
+            observation.pk
+            for observation in observations
+            if get_nest_status(observation.eradication_result, observation.reserved_by_id) == status
+        }
+        conditions, params = FilterSpec(visible=None, nest_statuses=(status,)).to_sql()
+        # The conditions are built by FilterSpec from fixed fragments; the values are bound as params.
+        sql = f"SELECT obs.id FROM {OBSERVATION_TABLE} AS obs WHERE {' AND '.join(conditions)}"  # noqa: S608
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            from_sql = {row[0] for row in cursor.fetchall()}
+
+        assert len(expected) == 1
+        assert set(Observation.objects.filter(nest_status_q([status])).values_list("pk", flat=True)) == expected
+        assert (
+            set(
+                Observation.objects.filter(FilterSpec(visible=None, nest_statuses=(status,)).to_q()).values_list(
+                    "pk", flat=True
+                )
+            )
+            == expected
+        )
+        assert from_sql == expected
@@ -0,0 +1,94 @@
+"""Tests for the CSV export rows."""
+
+import csv
+import io
+from collections.abc import Callable
+from datetime import UTC, date, datetime
+
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+
+from vespadb.observations.models import Municipality, Observation, Province
+from vespadb.observations.tasks.generate_export import (
+    PUBLIC_FIELDS,
+    format_images,
+    generate_export_rows,
+    generate_rows,
+    prepare_row_data,
+)
+from vespadb.users.models import VespaUser
+
+# Around Ghent, in Belgian Lambert 72.
+GHENT = MultiPolygon(Polygon.from_bbox((100000, 190000, 110000, 200000)), srid=31370)
+
+
+@pytest.mark.parametrize(
+    ("images", "expected"),
+    [
+        (None, ""),
+        ([], ""),
+        (["a.jpg", "b.jpg"], "a.jpg,b.jpg"),
+        ("['a.jpg', 'b.jpg']", "a.jpg,b.jpg"),
+    ],
+)
+def test_both_export_engines_render_images_alike(images: list[str] | str | None, expected: str) -> None:
+    """Missing images are an empty cell in both engines, lists and their string form are comma-joined."""
+    observation = Observation(location=Point(3.7174, 51.0543, srid=4326), images=images)
+
+    row = prepare_row_data(observation, is_admin=True, user_municipality_ids=set())
+
+    assert row[PUBLIC_FIELDS.index("images")] == expected
+    assert format_images(images) == expected
+
+
+@pytest.mark.django_db()
+def test_generate_export_rows_matches_generate_rows(
+    make_user: Callable[[str], VespaUser], make_observation: Callable[..., Observation]
+) -> None:
+    """The values_list export renders every cell exactly like the model-based rows."""
+    province = Province.objects.create(name="Oost-Vlaanderen", nis_code="40000", polygon=GHENT)
+    municipality = Municipality.objects.create(name="Gent", nis_code="44021", polygon=GHENT, province=province)
+    reserver = make_user("alice")
+    placed = [
+        make_observation(
+            location=Point(3.7174, 51.0543, srid=4326),
+            observation_datetime=datetime(2025, 6, 1, 12, 30, 15, 123456, tzinfo=UTC),
+            images=["https://waarnemingen.be/media/photo/1.jpg", "https://waarnemingen.be/media/photo/2.jpg"],
+            notes='Hoog in een eik, "moeilijk" bereikbaar',
+            nest_type="actief_primair_nest",
+            nest_height="hoger_dan_4_meter",
+            queen_present=True,
+            moth_present=False,
+            wn_id=123456,
+            wn_cluster_id=42,
+            wn_validation_status="goedgekeurd_met_bewijs",
+            source="Waarnemingen.be",
+            source_id=987,
+        ),
+        make_observation(
+            location=Point(3.72, 51.05, srid=4326),
+            images=["https://waarnemingen.be/media/photo/3.jpg"],
+            reserved_by=reserver,
+            anb=True,
+        ),
+        make_observation(
+            location=Point(3.71, 51.06, srid=4326),
+            eradication_date=date(2025, 7, 14),
+            eradication_result="successful",
+            duplicate_nest=False,
+            other_species_nest=False,
+        ),
+    ]
+    Observation.objects.filter(pk__in=[observation.pk for observation in placed]).update(
+        province=province, municipality=municipality
+    )
+    make_observation(location=Point(5.5, 50.9, srid=4326), eradication_result="unsuccessful")
+    queryset = Observation.objects.order_by("id")
+
+    with_related = queryset.select_related("province", "municipality")
+    expected = list(generate_rows(with_related, csv.writer(io.StringIO()), is_admin=True, user_municipality_ids=set()))
+    actual = list(generate_export_rows(queryset, fetch_size=2))
+
+    assert len(actual) == 5
+    for expected_row, actual_row in zip(expected, actual, strict=True):
+        assert actual_row == expected_row
@@ -0,0 +1,26 @@
+"""Tests for the dynamic GeoJSON endpoint."""
+
+import pytest
+
+from vespadb.observations.views import accepts_gzip
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "expected"),
+    [
+        ("gzip, deflate, br", True),
+        ("br;q=1.0, gzip;q=0.8", True),
+        ("x-gzip", True),
+        ("*", True),
+        ("", False),
+        ("deflate, br", False),
+        ("gzip;q=0, deflate", False),
+        ("gzip; q=0.000", False),
+        ("*;q=0.5, gzip;q=0", False),
+        ("gzip;q=0, *", False),
+        ("gzip;q=oops", False),
+    ],
+)
+def test_accepts_gzip(accept_encoding: str, expected: bool) -> None:
+    """Zero q-values refuse gzip and an explicit gzip entry overrides the wildcard."""
+    assert accepts_gzip(accept_encoding) is expected
@@ -0,0 +1,104 @@
+"""Tests for the dynamic GeoJSON changes feed."""
+
+import json
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from django.conf import settings
+from django.http import QueryDict
+from django.utils import timezone
+from pytest_mock import MockerFixture
+from rest_framework.test import APIRequestFactory
+
+from vespadb.observations.models import Observation
+from vespadb.observations.queries import build_changes_query
+from vespadb.observations.utils import current_change_token, decode_change_token
+from vespadb.observations.views import ObservationsViewSet
+
+changes_view = ObservationsViewSet.as_view({"get": "geojson_changes"})
+
+
+def token_for(moment: datetime) -> str:
+    """Return the changes token a client would have received at `moment`."""
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def test_change_token_lags_the_clock_by_the_overlap(mocker: MockerFixture) -> None:
+    """A token decodes to the moment it was issued minus the overlap, to the microsecond."""
+    issued = datetime(2025, 6, 1, 12, 0, 0, 123456, tzinfo=UTC)
+    mocker.patch("django.utils.timezone.now", return_value=issued)
+
+    token = current_change_token()
+
+    assert decode_change_token(token) == issued - timedelta(seconds=settings.GEOJSON_CHANGES_OVERLAP_SECONDS)
+
+
+@pytest.mark.parametrize("token", ["yesterday", "1.5", "9" * 30])
+def test_decode_change_token_rejects_malformed_tokens(token: str) -> None:
+    """Malformed tokens raise ValueError, which the view turns into a 400."""
+    with pytest.raises(ValueError, match="invalid|Invalid"):
+        decode_change_token(token)
+
+
+def test_build_changes_query_binds_the_moment_and_the_filters() -> None:
+    """The query selects changes after `since` under the request filters and hands out a new token."""
+    since = datetime(2025, 6, 1, tzinfo=UTC)
+
+    sql, params = build_changes_query(QueryDict("municipality_id=1,2&anb=true"), since)
+
+    assert params["changes_since"] == since
+    assert decode_change_token(params["changes_token"]) > since
+    assert params["municipality_id"] == (1, 2)
+    assert params["anb"] is True
+    assert params["visible"] is True
+    assert "obs.modified_datetime > %(changes_since)s" in sql
+    assert "deleted_datetime > %(changes_since)s" in sql
+
+
+@pytest.mark.parametrize(
+    ("query", "expected_status"),
+    [
+        ("", 400),
+        ("since=yesterday", 400),
+        ("since=1&anb=maybe", 400),
+    ],
+)
+def test_changes_rejects_missing_and_malformed_input(query: str, expected_status: int) -> None:
+    """Without a valid token or with malformed filters the feed answers 400."""
+    response = changes_view(APIRequestFactory().get(f"/observations/dynamic-geojson/changes/?{query}"))
+
+    assert response.status_code == expected_status
+
+
+def test_changes_with_an_expired_token_is_gone() -> None:
+    """Tokens older than the tombstone retention answer 410, so the client reloads dynamic-geojson."""
+    expired = timezone.now() - timedelta(days=settings.GEOJSON_CHANGES_RETENTION_DAYS, hours=1)
+
+    request = APIRequestFactory().get("/observations/dynamic-geojson/changes/", {"since": token_for(expired)})
+
+    response = changes_view(request)
+
+    assert response.status_code == 410
+    assert "expired" in json.loads(response.content)["error"]
+
+
+@pytest.mark.django_db()
+def test_changes_returns_upserts_and_removals(make_observation: Callable[..., Observation]) -> None:
+    """Matching changes come back as features, hidden and deleted observations as removed ids."""
+    unchanged = make_observation()
+    Observation.objects.filter(pk=unchanged.pk).update(modified_datetime=timezone.now() - timedelta(days=1))
+    since = token_for(timezone.now() - timedelta(hours=1))
+    changed = make_observation()
+    hidden = make_observation(visible=False)
+    deleted = make_observation()
+    deleted_pk = deleted.pk
+    deleted.delete()
+
+    response = changes_view(APIRequestFactory().get("/observations/dynamic-geojson/changes/", {"since": since}))
+
+    assert response.status_code == 200
+    delta = json.loads(response.content)
+    assert [feature["properties"]["id"] for feature in delta["features"]] == [changed.pk]
+    assert sorted(delta["removed"]) == sorted([hidden.pk, deleted_pk])
+    assert decode_change_token(delta["changes_token"]) > decode_change_token(since)
@@ -0,0 +1,177 @@
+"""Tests for the incremental hourly export."""
+
+import csv
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from vespadb.observations.export_storage import open_text_export, read_text_export
+from vespadb.observations.models import Observation
+from vespadb.observations.tasks.generate_export import PUBLIC_FIELDS, S3_EXPORT_PATH
+from vespadb.observations.tasks.incremental_export import (
+    CHANGE_COLUMN,
+    DELETE,
+    MANIFEST_PATH,
+    UPSERT,
+    compact,
+    read_manifest,
+    write_delta,
+)
+
+SNAPSHOT_PATH = f"{S3_EXPORT_PATH}/observations_20250101_000000.csv"
+PADDING = [""] * (len(PUBLIC_FIELDS) - 1)
+
+
+def row(observation_id: int, version: str) -> list[str]:
+    """Return an export row of `observation_id` whose other columns all hold `version`."""
+    return [str(observation_id)] + [version] * (len(PUBLIC_FIELDS) - 1)
+
+
+def write_csv(file_path: str, rows: list[list[str]], *, compress: bool = False) -> None:
+    """Write a CSV file to the default storage the way the export does."""
+    with open_text_export(file_path, compress=compress) as stream:
+        csv.writer(stream).writerows(rows)
+
+
+def read_csv(file_path: str) -> list[list[str]]:
+    """Read a CSV file from the default storage."""
+    with read_text_export(file_path) as stream:
+        return list(csv.reader(stream))
+
+
+def new_manifest(delta_paths: list[str], watermark: str = "2025-01-01T02:00:00+00:00") -> dict[str, Any]:
+    """Return a manifest for `SNAPSHOT_PATH` with the given deltas."""
+    return {
+        "snapshot": SNAPSHOT_PATH,
+        "rebuilt_at": "2025-01-01T00:00:00+00:00",
+        "watermark": watermark,
+        "fields": PUBLIC_FIELDS,
+        "deltas": [{"path": path} for path in delta_paths],
+    }
+
+
+@pytest.fixture(autouse=True)
+def _in_memory_storage(settings: Any) -> None:
+    """Keep the export files in memory."""
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    }
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_compact_merges_deltas_into_a_new_snapshot(settings: Any, *, compress: bool) -> None:
+    """Changes before, between, on and beyond the snapshot rows are merged by id; later deltas win."""
+    settings.EXPORT_GZIP = compress
+    write_csv(SNAPSHOT_PATH, [PUBLIC_FIELDS, row(2, "old"), row(4, "old"), row(6, "old"), row(8, "old")])
+    first_delta = f"{S3_EXPORT_PATH}/incremental/delta_20250101_010000.csv"
+    second_delta = f"{S3_EXPORT_PATH}/incremental/delta_20250101_020000.csv"
+    write_csv(
+        first_delta,
+        [
+            [CHANGE_COLUMN, *PUBLIC_FIELDS],
+            [UPSERT, *row(4, "first")],
+            [UPSERT, *row(5, "first")],
+            [UPSERT, *row(10, "first")],
+        ],
+    )
+    write_csv(
+        second_delta,
+        [
+            [CHANGE_COLUMN, *PUBLIC_FIELDS],
+            [UPSERT, *row(1, "second")],
+            [UPSERT, *row(6, "second")],
+            [UPSERT, *row(10, "second")],
+            [DELETE, "4", *PADDING],
+            [DELETE, "11", *PADDING],
+        ],
+    )
+    manifest = new_manifest([first_delta, second_delta])
+
+    count = compact(manifest)
+
+    assert count == 6
+    assert manifest["deltas"] == []
+    assert manifest["snapshot"] != SNAPSHOT_PATH
+    assert manifest["snapshot"].endswith(".csv.gz" if compress else ".csv")
+    assert read_manifest() == manifest
+    assert read_csv(manifest["snapshot"]) == [
+        PUBLIC_FIELDS,
+        row(1, "second"),
+        row(2, "old"),
+        row(5, "first"),
+        row(6, "second"),
+        row(8, "old"),
+        row(10, "second"),
+    ]
+    assert not default_storage.exists(first_delta)
+    assert not default_storage.exists(second_delta)
+    assert default_storage.exists(MANIFEST_PATH)
+
+
+def test_compact_onto_an_empty_snapshot_keeps_only_upserts() -> None:
+    """Without snapshot rows the upserts come out in id order and the deletes are dropped."""
+    write_csv(SNAPSHOT_PATH, [PUBLIC_FIELDS])
+    delta = f"{S3_EXPORT_PATH}/incremental/delta_20250101_010000.csv"
+    write_csv(
+        delta,
+        [
+            [CHANGE_COLUMN, *PUBLIC_FIELDS],
+            [UPSERT, *row(3, "new")],
+            [UPSERT, *row(1, "new")],
+            [DELETE, "2", *PADDING],
+        ],
+    )
+    manifest = new_manifest([delta])
+
+    assert compact(manifest) == 2
+    assert read_csv(manifest["snapshot"]) == [PUBLIC_FIELDS, row(1, "new"), row(3, "new")]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_write_delta_exports_changes_since_the_watermark(make_observation: Callable[..., Observation]) -> None:
+    """Visible changes are upserted, hidden and deleted observations become deletes, and the watermark moves."""
+    unchanged = make_observation()
+    updated = make_observation()
+    hidden = make_observation()
+    deleted = make_observation()
+    watermark = timezone.now()
+    Observation.objects.filter(pk=unchanged.pk).update(modified_datetime=watermark - timedelta(hours=1))
+    Observation.objects.filter(pk=updated.pk).update(modified_datetime=watermark + timedelta(seconds=1))
+    Observation.objects.filter(pk=hidden.pk).update(visible=False, modified_datetime=watermark + timedelta(seconds=1))
+    deleted_id = deleted.pk
+    deleted.delete()
+    manifest = new_manifest([], watermark=watermark.isoformat())
+
+    entry = write_delta(manifest)
+
+    assert entry is not None
+    assert (entry["upserts"], entry["deletes"]) == (1, 2)
+    assert manifest["deltas"] == [entry]
+    assert datetime.fromisoformat(manifest["watermark"]) > watermark
+    rows = read_csv(entry["path"])
+    assert rows[0] == [CHANGE_COLUMN, *PUBLIC_FIELDS]
+    assert [(change, observation_id) for change, observation_id, *_ in rows[1:]] == [
+        (UPSERT, str(updated.pk)),
+        (DELETE, str(min(hidden.pk, deleted_id))),
+        (DELETE, str(max(hidden.pk, deleted_id))),
+    ]
+
+
+@pytest.mark.django_db()
+def test_bulk_updates_and_partial_saves_stamp_modified_datetime(make_observation: Callable[..., Observation]) -> None:
+    """Queryset updates and saves with update_fields move modified_datetime, so the next delta picks them up."""
+    hidden, noted = make_observation(), make_observation()
+    long_ago = timezone.now() - timedelta(days=1)
+    Observation.objects.filter(pk__in=[hidden.pk, noted.pk]).update(modified_datetime=long_ago)
+
+    Observation.objects.filter(pk=hidden.pk).update(visible=False)
+    noted.notes = "Nest verwijderd"
+    noted.save(update_fields=["notes"])
+
+    modified = Observation.objects.filter(pk__in=[hidden.pk, noted.pk]).values_list("modified_datetime", flat=True)
+    assert all(value > long_ago + timedelta(hours=1) for value in modified)
@@ -0,0 +1,163 @@
+"""Tests for skipping the spatial enrichment of unchanged locations in Observation.save."""
+
+from collections.abc import Callable
+from unittest.mock import MagicMock
+
+import pytest
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.utils import timezone
+from pytest_mock import MockerFixture
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from vespadb.observations import models
+from vespadb.observations.cache import increment_metric
+from vespadb.observations.models import Municipality, Observation, get_location_enrichment_metrics
+from vespadb.observations.views import ObservationsViewSet
+from vespadb.users.models import VespaUser
+
+GHENT = Point(3.7174, 51.0543, srid=4326)
+ANTWERP = Point(4.4025, 51.2194, srid=4326)
+
+
+@pytest.fixture()
+def resolve(mocker: MockerFixture) -> MagicMock:
+    """Replace the boundary lookup done by Observation.save."""
+    return mocker.patch("vespadb.observations.models.resolve_location", return_value=(None, None, False))
+
+
+@pytest.fixture()
+def _every_save_sampled(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Record the enrichment metric on every save instead of one in `LOCATION_ENRICHMENT_SAMPLE_RATE`."""
+    monkeypatch.setattr(models, "LOCATION_ENRICHMENT_SAMPLE_RATE", 1)
+
+
+@pytest.fixture()
+def saved(make_observation: Callable[..., Observation]) -> Observation:
+    """Return an observation in Ghent as it is loaded from the database, with the metrics of its creation cleared."""
+    pk = make_observation(location=GHENT).pk
+    cache.clear()
+    return Observation.objects.get(pk=pk)
+
+
+def test_new_observations_count_as_moved() -> None:
+    """Observations that were never loaded always get enriched."""
+    assert Observation(location=GHENT).location_changed()
+
+
+def test_status_reports_the_counters() -> None:
+    """Admins can read how often the enrichment ran and was skipped."""
+    increment_metric("location_enrichment:executed")
+    increment_metric("location_enrichment:skipped")
+    increment_metric("location_enrichment:skipped")
+    request = APIRequestFactory().get("/observations/location-enrichment-status/")
+    force_authenticate(request, user=VespaUser(username="admin", is_staff=True, is_superuser=True))
+
+    response = ObservationsViewSet.as_view({"get": "location_enrichment_status"})(request)
+
+    assert response.status_code == 200
+    assert get_location_enrichment_metrics() == {"executed": 1, "skipped": 2}
+
+
+@pytest.mark.django_db()
+@pytest.mark.usefixtures("_every_save_sampled")
+def test_new_observation_is_enriched(resolve: MagicMock) -> None:
+    """Creating an observation resolves its ANB flag and municipality."""
+    Observation(location=GHENT, created_datetime=timezone.now()).save()
+
+    resolve.assert_called_once_with(GHENT.x, GHENT.y)
+    assert get_location_enrichment_metrics() == {"executed": 1, "skipped": 0}
+
+
+@pytest.mark.django_db()
+@pytest.mark.usefixtures("_every_save_sampled")
+def test_saving_other_fields_skips_the_lookups(saved: Observation, resolve: MagicMock) -> None:
+    """Eradication or reservation updates do not resolve the location again."""
+    saved.notes = "Nest removed"
+    saved.save()
+
+    resolve.assert_not_called()
+    assert get_location_enrichment_metrics() == {"executed": 0, "skipped": 1}
+
+
+@pytest.mark.django_db()
+@pytest.mark.usefixtures("resolve")
+def test_sampled_saves_are_weighted_by_the_rate(saved: Observation, mocker: MockerFixture) -> None:
+    """Only one in `LOCATION_ENRICHMENT_SAMPLE_RATE` saves touches the cache, and it counts for all of them."""
+    mocker.patch("vespadb.observations.models.random.randrange", side_effect=[1, 0])
+
+    saved.save()
+    assert get_location_enrichment_metrics() == {"executed": 0, "skipped": 0}
+    saved.save()
+
+    assert get_location_enrichment_metrics() == {"executed": 0, "skipped": models.LOCATION_ENRICHMENT_SAMPLE_RATE}
+
+
+@pytest.mark.django_db()
+def test_moved_nest_follows_its_location(
+    saved: Observation, resolve: MagicMock, make_municipality: Callable[..., Municipality]
+) -> None:
+    """A new location re-derives the ANB flag and the municipality, also with update_fields."""
+    antwerp = make_municipality("Antwerpen", bbox=(4.3, 51.1, 4.5, 51.3))
+    resolve.return_value = (antwerp.pk, None, True)
+
+    saved.location = ANTWERP
+    saved.save(update_fields=["location"])
+
+    resolve.assert_called_once_with(ANTWERP.x, ANTWERP.y)
+    reloaded = Observation.objects.get(pk=saved.pk)
+    assert (reloaded.anb, reloaded.municipality_id) == (True, antwerp.pk)
+
+
+@pytest.mark.parametrize(
+    ("province_id", "expected"),
+    [(7, (None, None)), (8, (None, 8))],
+    ids=["follows", "hand-picked"],
+)
+def test_province_is_cleared_with_the_municipality(
+    resolve: MagicMock, province_id: int, expected: tuple[int | None, int | None]
+) -> None:
+    """A nest moved outside every municipality loses its province too, unless the province was picked by hand."""
+    observation = Observation(pk=1, location=GHENT, municipality_id=5, province_id=7)
+    observation._remember_loaded_state()  # noqa: SLF001
+    observation.location = Point(2.5, 51.5, srid=4326)
+    observation.province_id = province_id
+
+    observation._enrich_location()  # noqa: SLF001
+
+    resolve.assert_called_once_with(2.5, 51.5)
+    assert (observation.municipality_id, observation.province_id) == expected
+
+
+@pytest.mark.django_db()
+def test_hand_picked_municipality_is_kept(
+    saved: Observation, resolve: MagicMock, make_municipality: Callable[..., Municipality]
+) -> None:
+    """A municipality chosen in the same save as the move is not overwritten."""
+    chosen = make_municipality("Gent")
+    resolve.return_value = (make_municipality("Antwerpen", bbox=(4.3, 51.1, 4.5, 51.3)).pk, None, False)
+
+    saved.location = ANTWERP
+    saved.municipality = chosen
+    saved.save()
+
+    resolve.assert_called_once()
+    assert Observation.objects.get(pk=saved.pk).municipality_id == chosen.pk
+
+
+@pytest.mark.django_db()
+@pytest.mark.parametrize(
+    ("move", "enrich_location", "enriched"),
+    [(False, True, True), (True, False, False)],
+    ids=["forced", "suppressed"],
+)
+def test_enrich_location_overrides_the_location_check(
+    saved: Observation, resolve: MagicMock, *, move: bool, enrich_location: bool, enriched: bool
+) -> None:
+    """Callers can force the lookups for an unchanged location or suppress them for a moved one."""
+    if move:
+        saved.location = ANTWERP
+
+    saved.save(enrich_location=enrich_location)
+
+    assert resolve.called is enriched
@@ -0,0 +1,110 @@
+"""Tests for the cache keys of the observation list."""
+
+from collections.abc import Callable
+from io import StringIO
+from unittest.mock import MagicMock
+
+import pytest
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser
+from django.http import QueryDict
+from pytest_mock import MockerFixture
+
+from vespadb.observations.admin import ObservationAdmin
+from vespadb.observations.cache import invalidate_observation_caches
+from vespadb.observations.models import Import, Municipality, Observation
+from vespadb.observations.tasks.generate_import import process_import
+from vespadb.observations.utils import get_observations_list_cache_key
+from vespadb.permissions import ObservationPermissionContext
+from vespadb.users.models import VespaUser
+
+
+@pytest.fixture()
+def rebuild(mocker: MockerFixture) -> MagicMock:
+    """Keep the writes from scheduling a rebuild of the prewarmed GeoJSON."""
+    return mocker.patch("vespadb.observations.tasks.cache_rebuild.rebuild_all_prewarmed_caches")
+
+
+def test_list_cache_key_ignores_parameter_order() -> None:
+    """The same query in another parameter order hits the same page, every repeated value counts."""
+    key = get_observations_list_cache_key(QueryDict("municipality_id=1&municipality_id=2&cursor=abc"), "public")
+
+    assert key == get_observations_list_cache_key(QueryDict("cursor=abc&municipality_id=1&municipality_id=2"), "public")
+    assert key != get_observations_list_cache_key(QueryDict("cursor=abc&municipality_id=1"), "public")
+    assert key != get_observations_list_cache_key(QueryDict("cursor=abd&municipality_id=1&municipality_id=2"), "public")
+
+
+def test_list_cache_key_is_scoped_to_the_permissions() -> None:
+    """Users who may see different fields never share a page, and the key names the permission tier."""
+    query_params = QueryDict("cursor=abc")
+    keys = {
+        scope: get_observations_list_cache_key(query_params, scope)
+        for scope in ("public", "admin", "municipalities:1,2", "municipalities:1")
+    }
+
+    assert len(set(keys.values())) == 4
+    assert all(key.split(":")[3] == scope.split(":")[0] for scope, key in keys.items())
+
+
+def test_list_cache_key_moves_with_the_list_generation(rebuild: MagicMock) -> None:
+    """Any observation write orphans every cached list page."""
+    key = get_observations_list_cache_key(QueryDict("cursor=abc"), "public")
+
+    invalidate_observation_caches("1")
+
+    assert get_observations_list_cache_key(QueryDict("cursor=abc"), "public") != key
+
+
+def test_admin_action_moves_the_list_generation(rebuild: MagicMock) -> None:
+    """Hiding observations from the admin orphans the cached list pages and the GeoJSON."""
+    key = get_observations_list_cache_key(QueryDict("cursor=abc"), "public")
+    model_admin = ObservationAdmin(Observation, admin.site)
+    model_admin.message_user = MagicMock()
+    queryset = MagicMock()
+    queryset.update.return_value = 2
+
+    model_admin.mark_as_not_visible(MagicMock(), queryset)
+
+    assert get_observations_list_cache_key(QueryDict("cursor=abc"), "public") != key
+    assert rebuild.mock_calls
+
+
+@pytest.mark.django_db()
+def test_import_moves_the_list_generation(
+    make_observation: Callable[..., Observation], rebuild: MagicMock, mocker: MockerFixture
+) -> None:
+    """An asynchronous import orphans the cached list pages once its records are saved."""
+    observation = make_observation()
+    mocker.patch("vespadb.observations.tasks.generate_import.default_storage.open", return_value=StringIO("[{}]"))
+    mocker.patch("vespadb.observations.tasks.generate_import.default_storage.delete")
+    mocker.patch(
+        "vespadb.observations.views.ObservationsViewSet.process_data",
+        return_value=([{"id": observation.id, "notes": "Nest verwijderd"}], []),
+    )
+    key = get_observations_list_cache_key(QueryDict("cursor=abc"), "public")
+
+    result = process_import(Import.objects.create(file_path="imports/observations.json").id)
+
+    assert result["updated_ids"] == [observation.id]
+    assert get_observations_list_cache_key(QueryDict("cursor=abc"), "public") != key
+    assert rebuild.mock_calls
+
+
+def test_permission_scope_of_anonymous_users_and_admins() -> None:
+    """Anonymous users see the public fields and superusers everything."""
+    assert ObservationPermissionContext.for_user(AnonymousUser()).cache_scope() == "public"
+    assert ObservationPermissionContext.for_user(VespaUser(username="root", is_superuser=True)).cache_scope() == "admin"
+
+
+@pytest.mark.django_db()
+def test_permission_scope_of_municipality_users(
+    make_user: Callable[[str], VespaUser], make_municipality: Callable[..., Municipality]
+) -> None:
+    """Users see the extra fields of their own municipalities; without municipalities they are public."""
+    alice, bob = make_user("alice"), make_user("bob")
+    ghent, antwerp = make_municipality("Gent"), make_municipality("Antwerpen")
+    alice.municipalities.set([antwerp, ghent])
+    municipality_ids = ",".join(str(pk) for pk in sorted([ghent.pk, antwerp.pk]))
+
+    assert ObservationPermissionContext.for_user(alice).cache_scope() == f"municipalities:{municipality_ids}"
+    assert ObservationPermissionContext.for_user(bob).cache_scope() == "public"
@@ -0,0 +1,106 @@
+"""Tests for the per-tier cache of serialized observations."""
+
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+import pytest
+from pytest_mock import MockerFixture
+
+from vespadb.observations.cache import OBSERVATION_ROWS_CACHE_FAMILY, get_cache_generation
+from vespadb.observations.models import Municipality, Observation
+from vespadb.observations.serializers import ObservationSerializer, get_observation_row_cache_key
+from vespadb.permissions import ObservationPermissionContext
+from vespadb.users.models import VespaUser
+
+PUBLIC = ObservationPermissionContext(is_admin=False, municipality_ids=frozenset())
+ADMIN = ObservationPermissionContext(is_admin=True, municipality_ids=frozenset())
+
+
+def test_tier_follows_the_users_municipalities() -> None:
+    """Users see the logged-in fields only in their own municipalities, admins see everything everywhere."""
+    user = ObservationPermissionContext(is_admin=False, municipality_ids=frozenset({1, 2}))
+
+    assert [user.tier_for(municipality_id) for municipality_id in (1, 3, None)] == ["logged_in", "public", "public"]
+    assert [ADMIN.tier_for(municipality_id) for municipality_id in (1, None)] == ["admin", "admin"]
+    assert PUBLIC.tier_for(1) == "public"
+
+
+def test_row_cache_key_changes_with_the_tier_the_version_and_the_generation() -> None:
+    """A row is cached per visibility tier; a save or a rename of an embedded name misses the old entry."""
+    observation = Observation(pk=1, modified_datetime=datetime(2025, 5, 1, 12, tzinfo=UTC))
+    keys = {get_observation_row_cache_key(observation, tier, 1) for tier in ("public", "logged_in", "admin")}
+    keys.add(get_observation_row_cache_key(observation, "public", 2))
+
+    observation.modified_datetime = datetime(2025, 5, 1, 12, 0, 1, tzinfo=UTC)
+    keys.add(get_observation_row_cache_key(observation, "public", 1))
+
+    assert len(keys) == 5
+
+
+@pytest.mark.django_db()
+def test_list_rows_are_cached_per_tier(
+    make_observation: Callable[..., Observation],
+    make_municipality: Callable[..., Municipality],
+    mocker: MockerFixture,
+) -> None:
+    """A page is served from cached rows, and each user gets the fields of their tier."""
+    ghent = make_municipality("Gent")
+    observations = [
+        make_observation(municipality=ghent, observer_email="finder@example.com"),
+        make_observation(observer_email="finder@example.com"),
+    ]
+    observations = list(Observation.objects.filter(pk__in=[observation.pk for observation in observations]))
+    serialize = mocker.spy(ObservationSerializer, "_serialize")
+    user = ObservationPermissionContext(is_admin=False, municipality_ids=frozenset({ghent.pk}))
+
+    def rows(permission_context: ObservationPermissionContext) -> list[dict]:
+        return ObservationSerializer(observations, many=True, context={"permission_context": permission_context}).data
+
+    public_rows = rows(PUBLIC)
+    assert serialize.call_count == 2
+    assert rows(PUBLIC) == public_rows
+    assert serialize.call_count == 2
+
+    user_rows = rows(user)
+    assert serialize.call_count == 3
+    assert "observer_email" not in public_rows[0]
+    assert user_rows[0]["observer_email"] == "finder@example.com"
+    assert user_rows[1] == public_rows[1]
+
+    observations[0].notes = "Nest verwijderd"
+    observations[0].save()
+    assert rows(PUBLIC)[0]["notes"] == "Nest verwijderd"
+    assert serialize.call_count == 4
+
+
+@pytest.mark.django_db()
+def test_renaming_a_municipality_refreshes_the_rows(
+    make_observation: Callable[..., Observation], make_municipality: Callable[..., Municipality]
+) -> None:
+    """Cached rows do not keep serving the old municipality name."""
+    ghent = make_municipality("Gent")
+    pk = make_observation(municipality=ghent).pk
+
+    def municipality_name() -> str:
+        observation = Observation.objects.select_related("municipality").get(pk=pk)
+        return ObservationSerializer(observation, context={"permission_context": PUBLIC}).data["municipality_name"]
+
+    assert municipality_name() == "Gent"
+    ghent.name = "Gent-Centrum"
+    ghent.save()
+
+    assert municipality_name() == "Gent-Centrum"
+
+
+@pytest.mark.django_db()
+def test_only_name_changes_of_users_invalidate_the_rows(make_user: Callable[[str], VespaUser]) -> None:
+    """A login's last_login update keeps the cached rows; a changed first name drops them."""
+    user = make_user("alice")
+    generation = get_cache_generation(OBSERVATION_ROWS_CACHE_FAMILY)
+
+    user.save(update_fields=["last_login"])
+    assert get_cache_generation(OBSERVATION_ROWS_CACHE_FAMILY) == generation
+
+    user.first_name = "Alice"
+    user.save(update_fields=["first_name"])
+    assert get_cache_generation(OBSERVATION_ROWS_CACHE_FAMILY) == generation + 1
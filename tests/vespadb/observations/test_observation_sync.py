@@ -0,0 +1,31 @@
+"""Tests for applying synced waarnemingen.be observations."""
+
+from collections.abc import Callable
+from datetime import timedelta
+
+import pytest
+from django.db import DatabaseError
+from django.utils import timezone
+from pytest_mock import MockerFixture
+
+from vespadb.observations.models import Observation
+from vespadb.observations.tasks.observation_sync import update_observations
+
+
+@pytest.mark.django_db()
+def test_individual_fallback_stamps_modified_datetime(
+    make_observation: Callable[..., Observation], mocker: MockerFixture
+) -> None:
+    """When the bulk update fails, the one-by-one saves still show up in the changes feed."""
+    stored = make_observation(wn_id=1, notes="Hoog in een eik")
+    long_ago = timezone.now() - timedelta(days=30)
+    Observation.objects.filter(pk=stored.pk).update(modified_datetime=long_ago)
+    synced = Observation.objects.get(pk=stored.pk)
+    synced.notes = "Nest verwijderd"
+    mocker.patch.object(Observation.objects, "bulk_update", side_effect=DatabaseError)
+
+    update_observations([synced], [1])
+
+    updated = Observation.objects.get(pk=stored.pk)
+    assert updated.notes == "Nest verwijderd"
+    assert updated.modified_datetime > long_ago
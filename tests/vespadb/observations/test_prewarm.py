@@ -0,0 +1,109 @@
+"""Tests for pre-warming the dynamic-geojson cache."""
+
+import json
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+import pytest
+from django.core.cache import cache
+from django.http import QueryDict
+from pytest_mock import MockerFixture
+from rest_framework.test import APIRequestFactory
+
+from vespadb.observations.cache import get_geojson_payload
+from vespadb.observations.cache_configs import PREWARM_CONFIGS
+from vespadb.observations.models import Observation
+from vespadb.observations.queries import (
+    build_geojson_variants_query,
+    normalize_filter_params,
+    render_geojson,
+    render_geojson_variants,
+)
+from vespadb.observations.tasks.generate_geojson_task import generate_all_geojson_task, generate_geojson_task
+from vespadb.observations.utils import get_geojson_cache_key
+from vespadb.observations.views import ObservationsViewSet
+
+geojson_view = ObservationsViewSet.as_view({"get": "geojson"})
+PREWARM_PARAMS = {
+    "visible": "true",
+    "min_observation_datetime": "2025-04-01",
+    "anb_areas_actief": True,
+    "nest_status": ["open", "reserved"],
+}
+MAP_QUERY = "visible=true&min_observation_datetime=2025-04-01&anb=true&nest_status=open&nest_status=reserved"
+
+
+def test_prewarm_writes_the_key_the_map_requests(mocker: MockerFixture) -> None:
+    """The prewarmed entry lands on the cache key of the matching map request."""
+    mocker.patch("vespadb.observations.tasks.generate_geojson_task.render_geojson", return_value=b"{}")
+
+    cache_key = generate_geojson_task(PREWARM_PARAMS)
+
+    assert cache_key == get_geojson_cache_key(normalize_filter_params(QueryDict(MAP_QUERY)))
+    assert get_geojson_payload(cache_key, accept_gzip=False) == (b"{}", False, False)
+
+
+@pytest.mark.django_db()
+def test_prewarmed_payload_matches_the_live_response(
+    make_observation: Callable[..., Observation], mocker: MockerFixture
+) -> None:
+    """A prewarmed entry is byte-identical to what the view renders for the same filters."""
+    mocker.patch("vespadb.observations.queries.current_change_token", return_value="1")
+    make_observation(observation_datetime=datetime(2025, 5, 1, tzinfo=UTC))
+    make_observation(observation_datetime=datetime(2025, 5, 1, tzinfo=UTC), eradication_result="successful")
+    make_observation(observation_datetime=datetime(2024, 5, 1, tzinfo=UTC))
+    params = {"visible": "true", "min_observation_datetime": "2025-04-01", "nest_status": ["open"]}
+
+    cache_key = generate_geojson_task(params)
+    prewarmed, _, _ = get_geojson_payload(cache_key, accept_gzip=False)
+    cache.clear()
+    response = geojson_view(APIRequestFactory().get("/observations/dynamic-geojson/", params))
+
+    assert response.status_code == 200
+    assert response.content == prewarmed
+    assert len(json.loads(prewarmed)["features"]) == 1
+
+
+def test_variants_query_scans_the_table_once_with_prefixed_parameters() -> None:
+    """Each filter set gets its own parameter prefix, flag column and FeatureCollection in one statement."""
+    variants = [normalize_filter_params(QueryDict(query)) for query in ("anb=true", "anb=false", "visible=all")]
+
+    sql, params = build_geojson_variants_query(variants)
+
+    assert sql.count("FROM") == 2
+    assert {key: value for key, value in params.items() if key.endswith("anb")} == {"v0_anb": True, "v1_anb": False}
+    assert "v2_visible" not in params
+    assert all(f"FILTER (WHERE v{index})" in sql for index in range(3))
+
+
+def test_prewarm_all_writes_every_configuration_in_one_pass(mocker: MockerFixture) -> None:
+    """All configurations are rendered by one call and land on the keys of the matching map requests."""
+    render = mocker.patch(
+        "vespadb.observations.tasks.generate_geojson_task.render_geojson_variants",
+        side_effect=lambda variants: [str(index).encode() for index in range(len(variants))],
+    )
+
+    cache_keys = generate_all_geojson_task()
+
+    render.assert_called_once()
+    assert len(set(cache_keys)) == len(PREWARM_CONFIGS)
+    for index, (cache_key, config) in enumerate(zip(cache_keys, PREWARM_CONFIGS, strict=True)):
+        assert cache_key == get_geojson_cache_key(normalize_filter_params(config["params"]))
+        assert get_geojson_payload(cache_key, accept_gzip=False) == (str(index).encode(), False, False)
+
+
+@pytest.mark.django_db()
+def test_variants_are_byte_identical_to_the_single_statement(
+    make_observation: Callable[..., Observation], mocker: MockerFixture
+) -> None:
+    """Rendering several filter sets from one scan yields exactly the documents of one statement each."""
+    mocker.patch("vespadb.observations.queries.current_change_token", return_value="1")
+    make_observation()
+    make_observation(eradication_result="successful")
+    make_observation(visible=False)
+    variants = [
+        normalize_filter_params(QueryDict(query))
+        for query in ("", "visible=all", "nest_status=eradicated", "nest_status=visited")
+    ]
+
+    assert render_geojson_variants(variants) == [render_geojson(variant) for variant in variants]
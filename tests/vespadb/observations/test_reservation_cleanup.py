@@ -0,0 +1,50 @@
+"""Tests for the cleanup of expired and half-set reservations."""
+
+from collections.abc import Callable
+from datetime import date, timedelta
+
+import pytest
+from django.conf import settings
+from django.utils import timezone
+from pytest_mock import MockerFixture
+
+from vespadb.observations.models import Observation
+from vespadb.observations.tasks.reservation_cleanup import cleanup_expired_reservations
+from vespadb.users.models import VespaUser
+
+
+@pytest.mark.django_db()
+def test_cleanup_expired_reservations_counts(
+    make_user: Callable[[str], VespaUser], make_observation: Callable[..., Observation], mocker: MockerFixture
+) -> None:
+    """The summary counts freed, repaired and released reservations and the adjusted users."""
+    invalidate = mocker.patch("vespadb.observations.cache.invalidate_geojson_cache")
+    alice, bob, carol = make_user("alice"), make_user("bob"), make_user("carol")
+    expired = timezone.now() - timedelta(days=settings.RESERVATION_DURATION_DAYS + 2)
+    expired_open = make_observation(reserved_by=alice)
+    expired_eradicated = make_observation(reserved_by=alice, eradication_date=date(2025, 5, 1))
+    fresh = make_observation(reserved_by=bob)
+    without_datetime = make_observation(reserved_by=carol)
+    without_user = make_observation()
+    # Past the save logic, which would stamp the reservation time.
+    Observation.objects.filter(pk__in=[expired_open.pk, expired_eradicated.pk]).update(reserved_datetime=expired)
+    Observation.objects.filter(pk=without_datetime.pk).update(reserved_datetime=None)
+    Observation.objects.filter(pk=without_user.pk).update(reserved_datetime=expired)
+
+    summary = cleanup_expired_reservations()
+
+    assert summary == {"freed": 2, "repaired": 2, "released": 2, "adjusted_users": 2}
+    for user, expected in ((alice, 0), (bob, 1), (carol, 0)):
+        user.refresh_from_db()
+        assert user.reservation_count == expected
+    assert list(Observation.objects.exclude(reserved_by=None).values_list("pk", flat=True)) == [fresh.pk]
+    assert not Observation.objects.filter(reserved_by=None).exclude(reserved_datetime=None).exists()
+    invalidate.assert_called_once_with()
+
+
+@pytest.mark.django_db()
+def test_cleanup_expired_reservations_without_work(make_observation: Callable[..., Observation]) -> None:
+    """A run with nothing to clean up reports zeros."""
+    make_observation()
+
+    assert cleanup_expired_reservations() == {"freed": 0, "repaired": 0, "released": 0, "adjusted_users": 0}
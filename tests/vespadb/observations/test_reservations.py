@@ -0,0 +1,139 @@
+"""Tests for the reservation counters of users."""
+
+from collections.abc import Callable
+from datetime import date
+
+import pytest
+from django.contrib.admin.sites import AdminSite
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from pytest_mock import MockerFixture
+
+from vespadb.observations.admin import ObservationAdmin
+from vespadb.observations.models import Observation
+from vespadb.observations.reservations import (
+    get_reservation_count_drift,
+    reconcile_reservation_counts,
+    reservation_deltas,
+)
+from vespadb.users.models import VespaUser
+
+
+@pytest.mark.django_db()
+def test_mark_as_eradicated_releases_open_reservations(
+    make_user: Callable[[str], VespaUser], make_observation: Callable[..., Observation], mocker: MockerFixture
+) -> None:
+    """Eradicating from the admin takes only the open reservations off the counters."""
+    alice, bob = make_user("alice"), make_user("bob")
+    make_observation(reserved_by=alice)
+    make_observation(reserved_by=alice)
+    make_observation(reserved_by=bob)
+    make_observation(reserved_by=bob, eradication_date=date(2025, 5, 1))
+    make_observation()
+    alice.refresh_from_db()
+    bob.refresh_from_db()
+    assert (alice.reservation_count, bob.reservation_count) == (2, 1)
+
+    model_admin = ObservationAdmin(Observation, AdminSite())
+    mocker.patch.object(model_admin, "message_user")
+    model_admin.mark_as_eradicated(RequestFactory().post("/"), Observation.objects.exclude(reserved_by=None))
+
+    alice.refresh_from_db()
+    bob.refresh_from_db()
+    assert (alice.reservation_count, bob.reservation_count) == (0, 0)
+    assert not Observation.objects.filter(eradication_date=None).exclude(reserved_by=None).exists()
+
+
+@pytest.mark.django_db()
+def test_reserving_stamps_reserved_datetime_in_one_update(
+    make_user: Callable[[str], VespaUser], make_observation: Callable[..., Observation]
+) -> None:
+    """The reservation time is written with the reservation, not by a second save."""
+    alice = make_user("alice")
+    observation = Observation.objects.get(pk=make_observation().pk)
+
+    observation.reserved_by = alice
+    with CaptureQueriesContext(connection) as queries:
+        observation.save(update_fields=["reserved_by"])
+
+    updates = [query["sql"] for query in queries if query["sql"].startswith('UPDATE "observations_observation"')]
+    assert len(updates) == 1
+    assert "reserved_datetime" in updates[0]
+    assert Observation.objects.get(pk=observation.pk).reserved_datetime is not None
+
+
+@pytest.mark.parametrize(
+    ("old", "new", "expected"),
+    [
+        (None, (1, None), {1: 1}),
+        (None, (1, date(2025, 5, 1)), {}),
+        ((1, None), None, {1: -1}),
+        ((1, None), (2, None), {1: -1, 2: 1}),
+        ((1, None), (1, date(2025, 5, 1)), {1: -1}),
+        ((1, date(2025, 5, 1)), (1, None), {1: 1}),
+        ((1, None), (1, None), {}),
+        ((None, None), (None, None), {}),
+    ],
+)
+def test_reservation_deltas(
+    old: tuple[int | None, date | None] | None, new: tuple[int | None, date | None] | None, expected: dict[int, int]
+) -> None:
+    """Only open reservations count, and unchanged ones cancel out."""
+    assert reservation_deltas(old, new) == expected
+
+
+@pytest.mark.django_db()
+def test_observation_save_keeps_reservation_counts(
+    make_user: Callable[[str], VespaUser], make_observation: Callable[..., Observation]
+) -> None:
+    """Reserving, moving, eradicating and deleting through the model keep the counters in step."""
+    alice, bob = make_user("alice"), make_user("bob")
+
+    def counts() -> tuple[int, int]:
+        alice.refresh_from_db()
+        bob.refresh_from_db()
+        return alice.reservation_count, bob.reservation_count
+
+    observation = make_observation(reserved_by=alice)
+    assert counts() == (1, 0)
+
+    observation.reserved_by = bob
+    observation.save()
+    assert counts() == (0, 1)
+
+    observation.eradication_date = date(2025, 5, 1)
+    observation.save(update_fields=["eradication_date"])
+    assert counts() == (0, 0)
+
+    observation.notes = "Nest verwijderd"
+    observation.save(update_fields=["notes"])
+    assert counts() == (0, 0)
+
+    reopened = Observation.objects.get(pk=observation.pk)
+    reopened.eradication_date = None
+    reopened.save()
+    assert counts() == (0, 1)
+
+    reopened.delete()
+    assert counts() == (0, 0)
+
+
+@pytest.mark.django_db()
+def test_reconcile_resets_drifted_counters(
+    make_user: Callable[[str], VespaUser], make_observation: Callable[..., Observation]
+) -> None:
+    """Drift is reported without writing and repaired in one statement, including users without reservations."""
+    alice, bob = make_user("alice"), make_user("bob")
+    make_observation(reserved_by=alice)
+    make_observation(reserved_by=alice, eradication_date=date(2025, 5, 1))
+    VespaUser.objects.filter(pk=alice.pk).update(reservation_count=3)
+    VespaUser.objects.filter(pk=bob.pk).update(reservation_count=2)
+
+    assert get_reservation_count_drift() == {"drifted_users": 2, "total_drift": 4}
+    assert reconcile_reservation_counts() == 2
+    assert get_reservation_count_drift() == {"drifted_users": 0, "total_drift": 0}
+    assert dict(VespaUser.objects.filter(pk__in=[alice.pk, bob.pk]).values_list("username", "reservation_count")) == {
+        "alice": 1,
+        "bob": 0,
+    }
@@ -0,0 +1,141 @@
+"""Tests for serving stale cache entries while one worker refreshes them."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.core.cache import cache
+from django.http import QueryDict
+from pytest_mock import MockerFixture
+from rest_framework.test import APIRequestFactory
+
+from vespadb.observations.cache import (
+    FRESH_SUFFIX,
+    GEOJSON_CACHE_FAMILY,
+    claim_refresh,
+    compute_once,
+    get_geojson_payload,
+    get_stale_while_revalidate,
+    release_refresh,
+    set_geojson_payload,
+    set_stale_while_revalidate,
+)
+from vespadb.observations.queries import normalize_filter_params
+from vespadb.observations.tasks.generate_geojson_task import refresh_geojson_cache
+from vespadb.observations.utils import get_geojson_cache_key
+from vespadb.observations.views import ObservationsViewSet
+
+geojson_view = ObservationsViewSet.as_view({"get": "geojson"})
+PAYLOAD = b'{"type": "FeatureCollection", "features": []}'
+
+
+def expire_soft_ttl(cache_key: str) -> None:
+    """Let the entry pass its soft TTL while it is still cached."""
+    cache.delete(f"{cache_key}{FRESH_SUFFIX}")
+
+
+def test_entry_is_fresh_until_its_soft_ttl_and_then_stale() -> None:
+    """A stored entry reads as fresh, and as stale but still present past the soft TTL."""
+    set_stale_while_revalidate("key", {"key": "page"}, GEOJSON_CACHE_FAMILY)
+
+    assert get_stale_while_revalidate("key") == ("page", False)
+    expire_soft_ttl("key")
+    assert get_stale_while_revalidate("key") == ("page", True)
+    assert get_stale_while_revalidate("missing") is None
+
+
+def test_only_one_caller_claims_the_refresh() -> None:
+    """The refresh lock goes to the first caller until the entry is stored again or the lock is released."""
+    assert claim_refresh("key") is True
+    assert claim_refresh("key") is False
+
+    set_stale_while_revalidate("key", {"key": "page"}, GEOJSON_CACHE_FAMILY)
+    assert claim_refresh("key") is True
+
+    release_refresh("key")
+    assert claim_refresh("key") is True
+
+
+def test_stale_geojson_is_served_while_one_refresh_is_queued(mocker: MockerFixture) -> None:
+    """Every reader gets the stale payload at once and only the first one queues a refresh."""
+    refresh = mocker.patch("vespadb.observations.views.refresh_geojson_cache")
+    cache_key = get_geojson_cache_key(normalize_filter_params(QueryDict("")))
+    set_geojson_payload(cache_key, PAYLOAD)
+
+    responses = [geojson_view(APIRequestFactory().get("/observations/dynamic-geojson/")) for _ in range(2)]
+    refresh.delay.assert_not_called()
+
+    expire_soft_ttl(cache_key)
+    responses += [geojson_view(APIRequestFactory().get("/observations/dynamic-geojson/")) for _ in range(3)]
+
+    assert [response.content for response in responses] == [PAYLOAD] * 5
+    refresh.delay.assert_called_once()
+    assert refresh.delay.call_args.args[0] == cache_key
+
+
+def test_refresh_task_stores_a_fresh_payload(mocker: MockerFixture) -> None:
+    """The refresh renders the entry from its parameters and stores it fresh, releasing the lock."""
+    render = mocker.patch("vespadb.observations.tasks.generate_geojson_task.render_geojson", return_value=PAYLOAD)
+    claim_refresh("geojson-key")
+
+    refresh_geojson_cache("geojson-key", {"visible": ["true"]}, None)
+
+    assert render.call_args.args[0]["visible"] == "true"
+    assert get_geojson_payload("geojson-key", accept_gzip=False) == (PAYLOAD, False, False)
+    assert claim_refresh("geojson-key") is True
+
+
+def test_failed_refresh_releases_the_lock(mocker: MockerFixture) -> None:
+    """A refresh that fails lets the next reader try again."""
+    mocker.patch(
+        "vespadb.observations.tasks.generate_geojson_task.render_geojson", side_effect=RuntimeError("database down")
+    )
+    claim_refresh("geojson-key")
+
+    with pytest.raises(RuntimeError, match="database down"):
+        refresh_geojson_cache("geojson-key", {"visible": ["true"]}, None)
+
+    assert claim_refresh("geojson-key") is True
+
+
+def test_concurrent_geojson_misses_render_once(mocker: MockerFixture) -> None:
+    """Two requests missing the same key at once share a single render."""
+    rendering = threading.Event()
+
+    def render(*args: object) -> bytes:
+        rendering.set()
+        time.sleep(0.2)
+        return PAYLOAD
+
+    render_geojson = mocker.patch("vespadb.observations.views.render_geojson", side_effect=render)
+    mocker.patch("vespadb.observations.cache.MISS_POLL_INTERVAL", 0.01)
+
+    def request() -> bytes:
+        return geojson_view(APIRequestFactory().get("/observations/dynamic-geojson/")).content
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(request)
+        rendering.wait(timeout=5)
+        second = executor.submit(request)
+        contents = [first.result(), second.result()]
+
+    assert contents == [PAYLOAD, PAYLOAD]
+    render_geojson.assert_called_once()
+
+
+def test_waiting_caller_computes_when_the_entry_never_appears(mocker: MockerFixture) -> None:
+    """A caller that waited out the timeout, e.g. because the computing worker died, computes the entry itself."""
+    mocker.patch("vespadb.observations.cache.MISS_WAIT_TIMEOUT", 0.05)
+    mocker.patch("vespadb.observations.cache.MISS_POLL_INTERVAL", 0.01)
+    claim_refresh("key")
+
+    assert compute_once("key", lambda: None, lambda: "page") == "page"
+
+
+def test_failed_computation_releases_the_lock(mocker: MockerFixture) -> None:
+    """A computation that fails lets the next caller try again at once."""
+    with pytest.raises(RuntimeError, match="database down"):
+        compute_once("key", lambda: None, mocker.Mock(side_effect=RuntimeError("database down")))
+
+    assert claim_refresh("key") is True
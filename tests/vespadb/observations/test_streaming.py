@@ -0,0 +1,40 @@
+"""Tests for the streaming reads of bulk jobs."""
+
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+import pytest
+from django.db import DatabaseError
+
+from vespadb.observations.models import Observation
+from vespadb.observations.streaming import snapshot, stream_query, stream_values
+
+
+def test_stream_query_needs_a_transaction() -> None:
+    """Named cursors die with their transaction, so streaming outside one is refused."""
+    with pytest.raises(RuntimeError, match="snapshot"):
+        next(stream_query("SELECT 1"))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stream_values_matches_the_queryset(make_observation: Callable[..., Observation]) -> None:
+    """Rows come back in fetch_size round trips with the field converters applied."""
+    for day in range(1, 6):
+        make_observation(observation_datetime=datetime(2025, 6, day, 12, tzinfo=UTC), images=[f"{day}.jpg"])
+    queryset = Observation.objects.order_by("id").values_list("id", "observation_datetime", "images", "location")
+
+    with snapshot():
+        streamed = list(stream_values(queryset, fetch_size=2))
+
+    assert streamed == list(queryset)
+    assert len(streamed) == 5
+    assert list(stream_values(queryset.none())) == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_snapshot_is_read_only(make_observation: Callable[..., Observation]) -> None:
+    """Bulk reads can never write by accident."""
+    observation = make_observation()
+
+    with pytest.raises(DatabaseError, match="read-only"), snapshot():
+        Observation.objects.filter(pk=observation.pk).update(notes="changed")
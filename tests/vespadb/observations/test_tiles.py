@@ -0,0 +1,64 @@
+"""Tests for the vector tile endpoint."""
+
+from django.core.cache import cache
+from django.http import QueryDict
+from rest_framework.test import APIRequestFactory
+
+from vespadb.observations.queries import build_tile_query, normalize_filter_params
+from vespadb.observations.utils import get_tile_cache_key
+from vespadb.observations.views import ObservationsViewSet
+
+tiles_view = ObservationsViewSet.as_view({"get": "tiles"})
+
+
+def test_build_tile_query_binds_the_tile_and_the_filters() -> None:
+    """The tile is bound as parameters and the envelope test comes first, so the GiST index answers it."""
+    sql, params = build_tile_query(normalize_filter_params(QueryDict("anb=true")), z=10, x=524, y=343)
+
+    assert {key: params[key] for key in ("tile_z", "tile_x", "tile_y", "anb", "visible")} == {
+        "tile_z": 10,
+        "tile_x": 524,
+        "tile_y": 343,
+        "anb": True,
+        "visible": True,
+    }
+    assert "WHERE obs.location && ST_Transform(bounds.geom, 4326) AND " in sql
+    assert "obs.anb = %(anb)s" in sql
+    assert "ST_AsMVT(" in sql
+
+
+def test_tile_cache_keys_differ_per_tile_and_filter_set() -> None:
+    """Neighbouring tiles and other filters never share a cache entry."""
+    visible = normalize_filter_params(QueryDict(""))
+    in_anb = normalize_filter_params(QueryDict("anb=true"))
+
+    keys = {
+        get_tile_cache_key(visible, 10, 524, 343),
+        get_tile_cache_key(visible, 10, 525, 343),
+        get_tile_cache_key(visible, 11, 524, 343),
+        get_tile_cache_key(in_anb, 10, 524, 343),
+    }
+
+    assert len(keys) == 4
+    assert get_tile_cache_key(visible, 10, 524, 343) == get_tile_cache_key(
+        normalize_filter_params(QueryDict("")), 10, 524, 343
+    )
+
+
+def test_tiles_rejects_coordinates_outside_the_zoom_level() -> None:
+    """Columns and rows must lie within the 2**z grid of the zoom level."""
+    request = APIRequestFactory().get("/observations/tiles/2/4/0.mvt")
+
+    assert tiles_view(request, z=2, x=4, y=0).status_code == 400
+    assert tiles_view(request, z=23, x=0, y=0).status_code == 400
+
+
+def test_tiles_serves_a_cached_tile() -> None:
+    """A cached tile is returned as a Mapbox vector tile without running the query."""
+    cache.set(get_tile_cache_key(normalize_filter_params(QueryDict("")), 3, 4, 2), b"\x1a\x02tile")
+
+    response = tiles_view(APIRequestFactory().get("/observations/tiles/3/4/2.mvt"), z=3, x=4, y=2)
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/vnd.mapbox-vector-tile"
+    assert response.content == b"\x1a\x02tile"
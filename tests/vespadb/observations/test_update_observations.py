@@ -0,0 +1,85 @@
+"""Tests for the update_observations re-enrichment command."""
+
+from collections.abc import Callable
+from io import StringIO
+from unittest.mock import MagicMock
+
+import pytest
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from pytest_mock import MockerFixture
+
+from vespadb.management.commands.update_observations import CHECKPOINT_KEY
+from vespadb.observations.cache import OBSERVATIONS_LIST_CACHE_FAMILY, get_cache_generation
+from vespadb.observations.models import Municipality, Observation
+
+
+@pytest.fixture()
+def invalidate_geojson(mocker: MockerFixture) -> MagicMock:
+    """Keep the command from scheduling a rebuild of the prewarmed GeoJSON."""
+    return mocker.patch("vespadb.observations.cache.invalidate_geojson_cache")
+
+
+@pytest.fixture()
+def stale(
+    make_municipality: Callable[..., Municipality], make_observation: Callable[..., Observation]
+) -> list[Observation]:
+    """Return three observations in Ghent that are not enriched yet."""
+    make_municipality("Gent")
+    return [make_observation() for _ in range(3)]
+
+
+def update_observations(*args: str) -> str:
+    """Run the command and return its output."""
+    stdout = StringIO()
+    call_command("update_observations", *args, stdout=stdout)
+    return stdout.getvalue()
+
+
+def enriched(observations: list[Observation]) -> list[bool]:
+    """Return whether each observation has a municipality in the database."""
+    return [Observation.objects.get(pk=observation.pk).municipality_id is not None for observation in observations]
+
+
+@pytest.mark.django_db()
+def test_updates_every_chunk_and_invalidates_once(stale: list[Observation], invalidate_geojson: MagicMock) -> None:
+    """All chunks are re-enriched, the checkpoint is cleared and the caches are invalidated at the end."""
+    list_generation = get_cache_generation(OBSERVATIONS_LIST_CACHE_FAMILY)
+
+    output = update_observations("--batch-size", "2")
+
+    assert "Chunk 2 " in output
+    assert "3 observations with a location checked, 3 changed" in output
+    assert enriched(stale) == [True, True, True]
+    assert cache.get(CHECKPOINT_KEY) is None
+    assert get_cache_generation(OBSERVATIONS_LIST_CACHE_FAMILY) == list_generation + 1
+    invalidate_geojson.assert_called_once_with()
+
+
+@pytest.mark.django_db()
+def test_dry_run_writes_nothing(stale: list[Observation], invalidate_geojson: MagicMock) -> None:
+    """A dry run reports the diff without updating rows, checkpointing or invalidating."""
+    output = update_observations("--dry-run")
+
+    assert "Dry run complete: 3 observations with a location checked, 3 would change (municipality: 3" in output
+    assert enriched(stale) == [False, False, False]
+    assert cache.get(CHECKPOINT_KEY) is None
+    invalidate_geojson.assert_not_called()
+
+
+@pytest.mark.django_db()
+def test_resume_continues_after_the_checkpoint(stale: list[Observation], invalidate_geojson: MagicMock) -> None:
+    """An interrupted run picks up after the last committed chunk."""
+    cache.set(CHECKPOINT_KEY, stale[0].pk)
+
+    output = update_observations("--resume")
+
+    assert f"Resuming after observation {stale[0].pk}" in output
+    assert enriched(stale) == [False, True, True]
+    invalidate_geojson.assert_called_once_with()
+
+
+def test_start_id_and_resume_are_exclusive() -> None:
+    """A checkpoint may not silently override an explicit start id."""
+    with pytest.raises(CommandError, match="not allowed with argument"):
+        update_observations("--start-id", "5", "--resume")
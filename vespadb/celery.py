@@ -16,5 +16,7 @@ app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
 app.autodiscover_tasks(['vespadb.observations.tasks.generate_export'])
 app.autodiscover_tasks(['vespadb.observations.tasks.generate_geojson_task'])
 app.autodiscover_tasks(['vespadb.observations.tasks.generate_import'])
+app.autodiscover_tasks(['vespadb.observations.tasks.incremental_export'])
 app.autodiscover_tasks(['vespadb.observations.tasks.observation_sync'])
 app.autodiscover_tasks(['vespadb.observations.tasks.reservation_cleanup'])
+app.autodiscover_tasks(['vespadb.observations.tasks.tombstone_cleanup'])
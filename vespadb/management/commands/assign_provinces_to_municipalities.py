@@ -4,6 +4,7 @@ from typing import Any
 
 from django.core.management.base import BaseCommand
 
+from vespadb.observations.cache import invalidate_boundary_index
 from vespadb.observations.models import Municipality, Province
 
 
@@ -53,3 +54,5 @@ class Command(BaseCommand):
                     )
                 else:
                     self.stdout.write(self.style.WARNING(f"No province found for municipality {municipality.name}"))
+
+        invalidate_boundary_index()
@@ -0,0 +1,74 @@
+"""
+Benchmark the old and new CET datetime rendering of the serializer and the export on synthetic rows.
+
+Usage: python manage.py benchmark_datetime_formatting --rows 50000
+"""
+import random
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from rest_framework import serializers
+
+from vespadb.observations.helpers import format_cet_datetime, parse_and_convert_to_cet
+
+# The datetime fields rendered per row by ObservationSerializer and by the CSV export.
+SERIALIZER_DATETIME_FIELDS = 6
+EXPORT_DATETIME_FIELDS = 3
+
+
+class Command(BaseCommand):
+    """Benchmark the old and new CET datetime rendering."""
+
+    help = "Compare the per-row cost of the old and new CET datetime rendering of the serializer and the export"
+
+    def add_arguments(self, parser: Any) -> None:
+        """Add the number of synthetic rows as an argument."""
+        parser.add_argument("--rows", type=int, default=50000, help="Number of synthetic rows. Default: 50000")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Render the same synthetic datetimes both ways, check they agree and report the timings."""
+        rows = options["rows"]
+        rng = random.Random(42)
+        start = datetime(2024, 1, 1, tzinfo=UTC)
+        values = [
+            [start + timedelta(seconds=rng.randrange(0, 2 * 365 * 86400), microseconds=rng.randrange(0, 10**6))
+             for _ in range(SERIALIZER_DATETIME_FIELDS)]
+            for _ in range(rows)
+        ]
+        drf_field = serializers.DateTimeField()
+
+        def serializer_before(value: datetime) -> str:
+            # DRF renders an ISO string, which to_representation parsed again and reformatted.
+            return parse_and_convert_to_cet(drf_field.to_representation(value)).strftime("%Y-%m-%dT%H:%M:%S")
+
+        def export_before(value: datetime) -> str:
+            return parse_and_convert_to_cet(value).replace(microsecond=0).strftime("%Y-%m-%dT%H:%M:%S")
+
+        for sample in values[0]:
+            if not serializer_before(sample) == export_before(sample) == format_cet_datetime(sample):
+                self.stderr.write(self.style.ERROR(f"Output differs for {sample.isoformat()}"))
+                return
+
+        self.stdout.write(f"Rendering datetimes of {rows} rows\n")
+        self._compare("serializer", values, SERIALIZER_DATETIME_FIELDS, serializer_before)
+        self._compare("export", values, EXPORT_DATETIME_FIELDS, export_before)
+
+    def _compare(self, name: str, values: list[list[datetime]], fields: int, before: Callable[[datetime], str]) -> None:
+        """Time `before` against `format_cet_datetime` on the first `fields` datetimes of every row."""
+        timings = {}
+        for label, render in (("before", before), ("after", format_cet_datetime)):
+            started = time.perf_counter()
+            for row in values:
+                for value in row[:fields]:
+                    render(value)
+            timings[label] = time.perf_counter() - started
+        per_row = {label: elapsed / len(values) * 1_000_000 for label, elapsed in timings.items()}
+        self.stdout.write(
+            f"{name} ({fields} fields/row): "
+            f"before {timings['before']:.2f}s ({per_row['before']:.1f} us/row), "
+            f"after {timings['after']:.2f}s ({per_row['after']:.1f} us/row), "
+            f"{timings['before'] / timings['after']:.1f}x faster"
+        )
@@ -0,0 +1,145 @@
+"""
+Benchmark the model-based export rows against the values_list rows on synthetic observations.
+
+Usage: python manage.py benchmark_export_rows --rows 100000
+"""
+import random
+import time
+from datetime import UTC, date, datetime, timedelta
+from typing import Any
+
+from django.contrib.gis.geos import GEOSGeometry, Point
+from django.core.management.base import BaseCommand
+
+from vespadb.observations.models import Municipality, Observation, Province
+from vespadb.observations.tasks.generate_export import PUBLIC_FIELDS, compile_export_columns, prepare_row_data
+
+# Reference values of the synthetic observations.
+MUNICIPALITY_NAMES = ("Gent", "Antwerpen", "Leuven", "Brugge", "Hasselt")
+PROVINCE_NAMES = ("Oost-Vlaanderen", "Antwerpen", "Vlaams-Brabant", "West-Vlaanderen", "Limburg")
+ERADICATION_RESULTS = (None, None, "successful", "unsuccessful")
+NEST_TYPES = (None, "actief_embryonaal_nest", "actief_primair_nest", "actief_secundair_nest")
+# Share of the synthetic observations in an ANB area.
+ANB_SHARE = 0.1
+
+
+class Command(BaseCommand):
+    """Benchmark the model-based export rows against the values_list rows."""
+
+    help = (
+        "Compare the per-row cost of the model-based export rows (generate_rows) with the values_list "
+        "rows and compiled column formatters (generate_export_rows) on synthetic observations"
+    )
+
+    def add_arguments(self, parser: Any) -> None:
+        """Add the number of synthetic rows as an argument."""
+        parser.add_argument("--rows", type=int, default=100000, help="Number of synthetic rows. Default: 100000")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Render the same synthetic rows with both engines, check they agree and report the timings."""
+        rows = options["rows"]
+        rng = random.Random(42)
+        # _meta is Django's documented model metadata API.
+        attnames = [field.attname for field in Observation._meta.concrete_fields]  # noqa: SLF001
+        province_field = Observation.province.field
+        municipality_field = Observation.municipality.field
+        expressions, formatters = compile_export_columns(PUBLIC_FIELDS)
+        provinces = [Province(id=i + 1, name=name) for i, name in enumerate(PROVINCE_NAMES)]
+        municipalities = [Municipality(id=i + 1, name=name) for i, name in enumerate(MUNICIPALITY_NAMES)]
+
+        # Per row, what the database returns to each engine: every column of the observation with the
+        # location as hex EWKB plus the joined rows for generate_rows, the projection for the other.
+        model_rows = []
+        value_rows = []
+        for _ in range(rows):
+            observation = self._synthetic_observation(rng)
+            place = rng.randrange(len(PROVINCE_NAMES) + 1)
+            place_id = place + 1 if place < len(PROVINCE_NAMES) else None
+            observation["province_id"] = observation["municipality_id"] = place_id
+            location = observation.pop("location")
+            observation["location"] = Point(*location, srid=4326).hexewkb
+            model_rows.append(([observation.get(name) for name in attnames], place))
+            projected = {
+                **observation,
+                "export_longitude": location[0],
+                "export_latitude": location[1],
+                "province__name": PROVINCE_NAMES[place] if place < len(PROVINCE_NAMES) else None,
+                "municipality__name": MUNICIPALITY_NAMES[place] if place < len(MUNICIPALITY_NAMES) else None,
+            }
+            value_rows.append(tuple(projected[expression] for expression in expressions))
+
+        location_position = attnames.index("location")
+
+        def model_row(values: list[Any], place: int) -> list[str]:
+            # What queryset.iterator() with select_related does per row before prepare_row_data runs.
+            values = list(values)
+            values[location_position] = GEOSGeometry(values[location_position])
+            observation = Observation.from_db("default", attnames, values)
+            known = place < len(PROVINCE_NAMES)
+            province_field.set_cached_value(observation, provinces[place] if known else None)
+            municipality_field.set_cached_value(observation, municipalities[place] if known else None)
+            return prepare_row_data(observation, is_admin=True, user_municipality_ids=set())
+
+        def values_row(values: tuple[Any, ...]) -> list[str]:
+            return [formatter(values) for formatter in formatters]
+
+        for (values, place), projected in zip(model_rows[:100], value_rows[:100], strict=True):
+            if model_row(values, place) != values_row(projected):
+                self.stderr.write(self.style.ERROR(f"Output differs for observation {values[0]}"))
+                return
+
+        self.stdout.write(f"Rendering {rows} export rows of {len(PUBLIC_FIELDS)} columns\n")
+        started = time.perf_counter()
+        for values, place in model_rows:
+            model_row(values, place)
+        before = time.perf_counter() - started
+        started = time.perf_counter()
+        for values in value_rows:
+            values_row(values)
+        after = time.perf_counter() - started
+        self.stdout.write(
+            f"generate_rows {before:.2f}s ({before / rows * 1_000_000:.1f} us/row), "
+            f"generate_export_rows {after:.2f}s ({after / rows * 1_000_000:.1f} us/row), "
+            f"{before / after:.1f}x faster"
+        )
+        self.stdout.write(
+            f"generate_export_rows also fetches {len(expressions)} instead of {len(attnames)} columns per row "
+            "and no joined province and municipality rows; that saving is not part of these timings."
+        )
+
+    def _synthetic_observation(self, rng: random.Random) -> dict[str, Any]:
+        start = datetime(2024, 1, 1, tzinfo=UTC)
+
+        def moment() -> datetime:
+            return start + timedelta(seconds=rng.randrange(0, 2 * 365 * 86400), microseconds=rng.randrange(0, 10**6))
+
+        eradication_result = rng.choice(ERADICATION_RESULTS)
+        return {
+            "id": rng.randrange(1, 10**7),
+            "wn_id": rng.randrange(1, 10**9),
+            "created_datetime": moment(),
+            "modified_datetime": moment(),
+            "observation_datetime": moment(),
+            "location": (rng.uniform(2.5, 5.9), rng.uniform(50.7, 51.5)),
+            "source": "Waarnemingen.be",
+            "source_id": rng.randrange(1, 10**6),
+            "notes": rng.choice((None, "Nest in de haag", "Hoog in een eik, moeilijk bereikbaar")),
+            "wn_validation_status": rng.choice(("goedgekeurd_met_bewijs", "in_behandeling")),
+            "nest_type": rng.choice(NEST_TYPES),
+            "nest_height": rng.choice((None, "lager_dan_4_meter", "hoger_dan_4_meter")),
+            "nest_size": rng.choice((None, "kleiner_dan_25_cm", "groter_dan_25_cm")),
+            "nest_location": rng.choice((None, "binnen_gebouw_of_constructie", "buiten_onbedekt_in_boom_of_struik")),
+            "wn_cluster_id": rng.choice((None, rng.randrange(1, 10**6))),
+            "visible": True,
+            "images": [
+                f"https://waarnemingen.be/media/photo/{rng.randrange(10**8)}.jpg" for _ in range(rng.randrange(3))
+            ],
+            "reserved_by_id": rng.choice((None, rng.randrange(1, 500))),
+            "eradication_date": date(2024, 6, 1) + timedelta(days=rng.randrange(300)) if eradication_result else None,
+            "eradication_result": eradication_result,
+            "queen_present": rng.choice((None, True, False)),
+            "moth_present": rng.choice((None, True, False)),
+            "anb": rng.random() < ANB_SHARE,
+            "duplicate_nest": rng.choice((None, False)),
+            "other_species_nest": rng.choice((None, False)),
+        }
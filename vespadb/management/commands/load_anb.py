@@ -6,6 +6,7 @@ from typing import Any
 from django.contrib.gis.utils import LayerMapping
 from django.core.management.base import BaseCommand
 
+from vespadb.observations.cache import invalidate_boundary_index
 from vespadb.observations.models import ANB
 
 # A mapping dictionary to map field names from the Shapefile to the ANB model fields.
@@ -54,3 +55,5 @@ class Command(BaseCommand):
                 self.stdout.write(
                     self.style.SUCCESS(f"ANB with domain '{attrs['domain']}' has been added to the database.")
                 )
+
+        invalidate_boundary_index()
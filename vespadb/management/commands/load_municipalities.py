@@ -3,6 +3,7 @@ from typing import Any
 from django.contrib.gis.utils import LayerMapping
 from django.core.management.base import BaseCommand
 from django.db import IntegrityError
+from vespadb.observations.cache import invalidate_boundary_index, invalidate_municipality_cache
 from vespadb.observations.models import Municipality
 import logging
 
@@ -105,6 +106,9 @@ class Command(BaseCommand):
         logger.info("Reassigning provinces to municipalities")
         self.run_assign_provinces()
 
+        invalidate_municipality_cache()
+        invalidate_boundary_index()
+
     def run_assign_provinces(self):
         from django.core.management import call_command
         call_command("assign_provinces_to_municipalities")
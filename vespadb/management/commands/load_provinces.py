@@ -6,6 +6,7 @@ from typing import Any
 from django.contrib.gis.utils import LayerMapping
 from django.core.management.base import BaseCommand
 
+from vespadb.observations.cache import invalidate_boundary_index
 from vespadb.observations.models import Province
 
 provinces_mapping = {
@@ -55,3 +56,5 @@ class Command(BaseCommand):
                 self.stdout.write(
                     self.style.SUCCESS(f"Province with name '{attrs['name']}' has been added to the database.")
                 )
+
+        invalidate_boundary_index()
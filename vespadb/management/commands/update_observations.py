@@ -1,111 +1,107 @@
-from django.core.management.base import BaseCommand
-from django.db import transaction, connection
-from vespadb.observations.models import Observation
-from vespadb.observations.utils import get_municipality_from_coordinates, check_if_point_in_anb_area
-from django.contrib.gis.geos import Point
+"""
+Usage: python manage.py update_observations [--batch-size 5000] [--dry-run] [--start-id ID | --resume]
+"""
 import logging
+import time
+from typing import Any
 
-logger = logging.getLogger(__name__)
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
 
-class Command(BaseCommand):
-    help = "Update municipality and province assignments for all observations based on current municipality data."
+from vespadb.observations.cache import invalidate_observation_caches
+from vespadb.observations.enrichment import REENRICHMENT_SUMMARY_FIELDS, reenrich_observations
 
-    def handle(self, *args, **options):
-        batch_size = 1000
-        total_updated = 0
-        total_failed = 0
+logger = logging.getLogger(__name__)
 
-        # Log initial state
-        observation_count = Observation.objects.count()
-        logger.info(f"Starting update_observations command. Total observations in database: {observation_count}")
-        self.stdout.write(self.style.SUCCESS(f"Found {observation_count} observations to process"))
+# Highest observation id of the last committed chunk, so an interrupted run can `--resume`.
+CHECKPOINT_KEY = "vespadb:update_observations:last_id"
 
-        if observation_count == 0:
-            logger.warning("No observations found in the database. Exiting.")
-            self.stdout.write(self.style.WARNING("No observations to update. Check if observations have been loaded."))
-            return
+# Upper id of the next keyset chunk: the id `batch_size` rows after `last_id`, or the last id.
+NEXT_CHUNK_SQL = """
+    SELECT max(id) FROM (
+        SELECT id FROM "observations_observation"
+        WHERE id > %(last_id)s
+        ORDER BY id
+        LIMIT %(batch_size)s
+    ) chunk
+"""
 
-        # Verify database connection
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT COUNT(*) FROM observations_observation")
-                db_count = cursor.fetchone()[0]
-                logger.info(f"Raw SQL count of observations: {db_count}")
-                self.stdout.write(self.style.SUCCESS(f"Raw SQL count confirms {db_count} observations"))
-        except Exception as e:
-            logger.error(f"Failed to verify observation count via raw SQL: {str(e)}")
-            self.stdout.write(self.style.ERROR("Error verifying observation count in database"))
 
-        with transaction.atomic():
-            # Process observations in batches
-            for i in range(0, observation_count, batch_size):
-                logger.info(f"Processing batch {i // batch_size + 1} (indices {i} to {i + batch_size})")
-                batch = Observation.objects.all()[i:i + batch_size]
-                batch_count = len(batch)
-                logger.info(f"Batch size: {batch_count} observations")
-                self.stdout.write(self.style.SUCCESS(f"Batch {i // batch_size + 1}: Processing {batch_count} observations"))
+class Command(BaseCommand):
+    help = (
+        "Re-derive municipality, province and ANB membership of all observations from their location, "
+        "with one set-based UPDATE per chunk of observation ids."
+    )
 
-                if batch_count == 0:
-                    logger.warning(f"Empty batch at index {i}. Skipping.")
-                    continue
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Observations per chunk. Default: 5000")
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+        start = parser.add_mutually_exclusive_group()
+        start.add_argument("--start-id", type=int, default=0, help="Only process observations with a higher id")
+        start.add_argument(
+            "--resume", action="store_true", help="Continue after the last chunk committed by an interrupted run"
+        )
 
-                for obs in batch:
-                    try:
-                        logger.debug(f"Processing observation ID {obs.id}")
-                        if obs.location and isinstance(obs.location, Point):
-                            long, lat = obs.location.x, obs.location.y
-                            logger.debug(f"Observation {obs.id} location: ({long}, {lat})")
-                            municipality = get_municipality_from_coordinates(long, lat)
-                            logger.debug(f"Observation {obs.id} assigned municipality: {municipality.name if municipality else 'None'}")
+    def handle(self, *args: Any, **options: Any) -> None:
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+        last_id = options["start_id"]
+        if options["resume"]:
+            checkpoint = cache.get(CHECKPOINT_KEY)
+            if checkpoint is None:
+                self.stdout.write(self.style.WARNING("No checkpoint found, starting from the beginning"))
+            else:
+                last_id = checkpoint
+                self.stdout.write(self.style.SUCCESS(f"Resuming after observation {last_id}"))
 
-                            # Store old values for comparison
-                            old_municipality = obs.municipality
-                            old_province = obs.province
-                            old_anb = obs.anb
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM "observations_observation" WHERE id > %s', [last_id])
+            remaining = cursor.fetchone()[0]
+        logger.info(f"Starting update_observations after id {last_id}: {remaining} observations, dry run: {dry_run}")
+        self.stdout.write(self.style.SUCCESS(f"Found {remaining} observations to process"))
 
-                            # Assign new values
-                            obs.municipality = municipality
-                            obs.province = municipality.province if municipality else None
-                            obs.anb = check_if_point_in_anb_area(long, lat)
+        totals = dict.fromkeys(REENRICHMENT_SUMMARY_FIELDS, 0)
+        processed = 0
+        chunks = 0
+        started = time.monotonic()
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(NEXT_CHUNK_SQL, {"last_id": last_id, "batch_size": batch_size})
+                max_id = cursor.fetchone()[0]
+            if max_id is None:
+                break
 
-                            # Check which fields have changed
-                            changed_fields = []
-                            if old_municipality != obs.municipality:
-                                old_muni_name = old_municipality.name if old_municipality else "None"
-                                new_muni_name = municipality.name if municipality else "None"
-                                changed_fields.append(
-                                    f"municipality: {old_muni_name} -> {new_muni_name}"
-                                )
-                            if old_province != obs.province:
-                                old_prov_name = old_province.name if old_province else "None"
-                                new_prov_name = municipality.province.name if municipality and municipality.province else "None"
-                                changed_fields.append(
-                                    f"province: {old_prov_name} -> {new_prov_name}"
-                                )
-                            if old_anb != obs.anb:
-                                changed_fields.append(f"anb: {old_anb} -> {obs.anb}")
+            # Every chunk commits on its own, so an interrupted run keeps its progress.
+            with transaction.atomic():
+                summary = reenrich_observations(min_id=last_id + 1, max_id=max_id, dry_run=dry_run)
+            if not dry_run:
+                cache.set(CHECKPOINT_KEY, max_id, timeout=None)
 
-                            # Save only if changes are detected
-                            if changed_fields:
-                                obs.save(update_fields=['municipality', 'province', 'anb'])
-                                total_updated += 1
-                                logger.info(
-                                    f"Successfully updated observation {obs.id}. Changed fields: {', '.join(changed_fields)}"
-                                )
-                            else:
-                                logger.debug(f"No changes for observation {obs.id}. Skipping save.")
-                        else:
-                            logger.warning(f"Invalid location for observation {obs.id}: {obs.location}")
-                            total_failed += 1
-                    except Exception as e:
-                        logger.error(f"Failed to update observation {obs.id}: {str(e)}")
-                        total_failed += 1
+            chunks += 1
+            processed += min(batch_size, remaining - processed)
+            for field in REENRICHMENT_SUMMARY_FIELDS:
+                totals[field] += summary[field]
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"Chunk {chunks} (ids {last_id + 1} to {max_id}): {summary['changed']} "
+                f"{'would change' if dry_run else 'changed'}; {processed}/{remaining} observations "
+                f"({processed / remaining if remaining else 1:.0%}), {processed / elapsed if elapsed else 0:.0f}/s"
+            )
+            last_id = max_id
 
-                self.stdout.write(
-                    self.style.SUCCESS(f"Processed batch {i // batch_size + 1}: {total_updated} updated, {total_failed} failed")
-                )
+        if not dry_run:
+            cache.delete(CHECKPOINT_KEY)
+            # A resumed run also covers the changes committed before the interruption.
+            if totals["changed"] or options["resume"]:
+                invalidate_observation_caches()
 
-        logger.info(f"Update complete: {total_updated} observations updated, {total_failed} failed")
+        verb = "would change" if dry_run else "changed"
+        logger.info(f"Update complete: {totals}")
         self.stdout.write(
-            self.style.SUCCESS(f"Update complete: {total_updated} observations updated, {total_failed} failed")
+            self.style.SUCCESS(
+                f"{'Dry run' if dry_run else 'Update'} complete: {totals['checked']} observations with a location "
+                f"checked, {totals['changed']} {verb} (municipality: {totals['municipality']}, "
+                f"province: {totals['province']}, anb: {totals['anb']})"
+            )
         )
@@ -2,6 +2,7 @@
 
 import json
 import logging
+from collections import Counter
 from typing import Any
 
 from django.utils import timezone
@@ -10,8 +11,8 @@ from django.contrib import admin, messages
 from django.contrib.admin import SimpleListFilter
 from django.contrib.gis import admin as gis_admin
 from django.core.mail import send_mail
-from django.db.models import Q
 from django.contrib.gis.geos import GEOSGeometry, Point
+from django.db import transaction
 from django.db.models.query import QuerySet
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import redirect, render
@@ -28,6 +29,7 @@ from vespadb.observations.models import Import
 from django.urls import reverse
 from django.utils.html import format_html
 
+from vespadb.observations.cache import invalidate_observation_caches
 from vespadb.observations.filters import (
     MunicipalityExcludeFilter, 
     ObserverReceivedEmailFilter, 
@@ -36,9 +38,10 @@ from vespadb.observations.filters import (
     CreatedByFilter, 
     ReservedByFilter
 )
+from vespadb.observations.filter_spec import nest_status_q
 from vespadb.observations.forms import SendEmailForm
 from vespadb.observations.models import Municipality, Observation, Province
-from vespadb.observations.utils import check_if_point_in_anb_area, get_municipality_from_coordinates
+from vespadb.observations.reservations import apply_reservation_deltas, is_open_reservation
 from vespadb.observations.views import ObservationsViewSet
 from vespadb.users.models import UserType
 from vespadb.users.utils import get_import_user
@@ -68,6 +71,7 @@ class NestStatusFilter(SimpleListFilter):
         """
         return [
             ("eradicated", "Eradicated"),
+            ("visited", "Visited"),
             ("reserved", "Reserved"),
             ("open", "Open"),
         ]
@@ -84,17 +88,8 @@ class NestStatusFilter(SimpleListFilter):
         if not value:
             return queryset
 
-        statuses = value.split(",")
-        query = Q()
-
-        if "eradicated" in statuses:
-            query |= Q(eradication_date__isnull=False)
-        if "reserved" in statuses:
-            query |= Q(reserved_datetime__isnull=False)
-        if "open" in statuses:
-            query |= Q(reserved_datetime__isnull=True, eradication_date__isnull=True)
-
-        return queryset.filter(query)
+        query = nest_status_q(value.split(","))
+        return queryset if query is None else queryset.filter(query)
 
 
 class ObservationAdminForm(forms.ModelForm):
@@ -281,20 +276,28 @@ class ObservationAdmin(gis_admin.GISModelAdmin):
         obj.modified_by = request.user
         obj.modified_datetime = now()
 
-        # Auto-edit based on location
+        # Auto-edit based on location: Observation.save re-derives ANB, municipality and province
+        # when the location changed.
         if obj.location:
             if not isinstance(obj.location, Point):
                 obj.location = GEOSGeometry(obj.location, srid=4326)
-            point = obj.location.transform(4326, clone=True)
-            long, lat = point.x, point.y
-            obj.anb = check_if_point_in_anb_area(long, lat)
-            municipality = get_municipality_from_coordinates(long, lat)
-            obj.municipality = municipality
-            obj.province = municipality.province if municipality else None
+            obj.location = obj.location.transform(4326, clone=True)
         if not obj.source:
             obj.source = "Waarnemingen.be"
 
         super().save_model(request, obj, form, change)
+        invalidate_observation_caches(obj.id)
+
+    def delete_model(self, request: HttpRequest, obj: Observation) -> None:
+        """Delete a single observation and invalidate the caches it appeared in."""
+        observation_id = obj.id
+        super().delete_model(request, obj)
+        invalidate_observation_caches(observation_id)
+
+    def delete_queryset(self, request: HttpRequest, queryset: QuerySet[Observation]) -> None:
+        """Delete the selected observations and invalidate the caches they appeared in."""
+        super().delete_queryset(request, queryset)
+        invalidate_observation_caches()
 
     def changelist_view(self, request: HttpRequest, extra_context: Any = None) -> TemplateResponse:
         """
@@ -462,6 +465,7 @@ class ObservationAdmin(gis_admin.GISModelAdmin):
                         fail_list.append(observation.id)
 
                 if success_list:
+                    invalidate_observation_caches(*success_list)
                     messages.success(request, f"Emails successfully sent to {len(success_list)} observers.")
                 if fail_list:
                     messages.warning(request, f"Failed to send emails for {len(fail_list)} observations.")
@@ -499,10 +503,18 @@ class ObservationAdmin(gis_admin.GISModelAdmin):
         - None
         """
         from vespadb.observations.models import EradicationResultEnum
-        count = queryset.update(
-            eradication_date=now(),
-            eradication_result=EradicationResultEnum.SUCCESSFUL
-        )
+        with transaction.atomic():
+            # Lock the rows so the counters match what the update eradicates.
+            rows = queryset.select_for_update().values_list("reserved_by_id", "eradication_date")
+            closed = Counter(reserved_by_id for reserved_by_id, eradication_date in rows
+                             if is_open_reservation(reserved_by_id, eradication_date))
+            count = queryset.update(
+                eradication_date=now(),
+                eradication_result=EradicationResultEnum.SUCCESSFUL,
+                modified_datetime=now(),
+            )
+            apply_reservation_deltas({user_id: -closed_count for user_id, closed_count in closed.items()})
+        invalidate_observation_caches()
         self.message_user(request, f"{count} observaties gemarkeerd als bestreden (succesvol).", messages.SUCCESS)
 
     @admin.action(description="Markeer observatie(s) als niet zichtbaar")
@@ -519,7 +531,8 @@ class ObservationAdmin(gis_admin.GISModelAdmin):
         -------
         - None
         """
-        count = queryset.update(visible=False)
+        count = queryset.update(visible=False, modified_datetime=now())
+        invalidate_observation_caches()
         self.message_user(request, f"{count} observations marked as not visible.", messages.SUCCESS)
 
 
@@ -1,26 +1,305 @@
+from django.conf import settings
 from django.core.cache import cache
+import gzip
 import logging
-from vespadb.observations.tasks.cache_rebuild import rebuild_all_prewarmed_caches
+import time
+from collections.abc import Callable
+from typing import Any, TypeVar
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+GEOJSON_GZIP_SUFFIX = ":gz"
+GEOJSON_GZIP_LEVEL = 6
+
+# Stale-while-revalidate bookkeeping stored next to every cached response.
+FRESH_SUFFIX = ":fresh"
+REFRESH_LOCK_SUFFIX = ":refreshing"
+REFRESH_LOCK_TIMEOUT = 120
+# How long requests that miss an entry another request is computing wait for it, and how often they look.
+MISS_WAIT_TIMEOUT = 10
+MISS_POLL_INTERVAL = 0.05
+
+GEOJSON_CACHE_FAMILY = "geojson"
+OBSERVATIONS_LIST_CACHE_FAMILY = "observations_list"
+MUNICIPALITIES_CACHE_FAMILY = "municipalities"
+# Serialized observation rows, which embed municipality and user names.
+OBSERVATION_ROWS_CACHE_FAMILY = "observation_rows"
+# Not a cache of responses: its generation tells every process to reload the in-memory boundary index.
+BOUNDARIES_CACHE_FAMILY = "boundaries"
+
+
+def _generation_key(family: str) -> str:
+    return f"vespadb:generation:{family}"
+
+
+def get_cache_generation(family: str) -> int:
+    """
+    Return the current generation of a cache family.
+
+    Every cache key of the family embeds this number, so bumping it orphans all existing
+    entries at once; they are never read again and simply expire.
+
+    :param family: One of the `*_CACHE_FAMILY` constants.
+    :return: The current generation.
+    """
+    key = _generation_key(family)
+    generation = cache.get(key)
+    if generation is None:
+        # Seed from the clock rather than 1, so a counter lost to eviction or a flush can never
+        # fall back to a generation whose entries are still cached.
+        cache.add(key, time.time_ns() // 1_000_000, timeout=None)
+        generation = cache.get(key)
+    return int(generation)
+
+
+def bump_cache_generation(family: str) -> int:
+    """
+    Atomically move a cache family to a new generation, invalidating all of its entries in O(1).
+
+    :param family: One of the `*_CACHE_FAMILY` constants.
+    :return: The new generation.
+    """
+    key = _generation_key(family)
+    try:
+        return int(cache.incr(key))
+    except ValueError:
+        # The counter does not exist yet, seeding it is as good as bumping it.
+        get_cache_generation(family)
+        return int(cache.incr(key))
+
+
+def _metric_key(name: str) -> str:
+    return f"vespadb:metrics:{name}"
+
+
+def increment_metric(name: str, amount: int = 1) -> None:
+    """
+    Increment a counter shared by all web and Celery workers.
+
+    :param name: Name of the counter, e.g. `location_enrichment:skipped`.
+    :param amount: How much to add, e.g. the weight of a sampled event.
+    """
+    key = _metric_key(name)
+    if not cache.add(key, amount, timeout=None):
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            # Evicted between add and incr; losing one increment is fine for a metric.
+            cache.add(key, amount, timeout=None)
+
+
+def get_metrics(names: list[str]) -> dict[str, int]:
+    """
+    Read counters written with `increment_metric`.
+
+    :param names: Names of the counters.
+    :return: The value per counter, 0 for counters that were never incremented.
+    """
+    values = cache.get_many([_metric_key(name) for name in names])
+    return {name: int(values.get(_metric_key(name), 0)) for name in names}
+
+
 def invalidate_geojson_cache() -> None:
     """
     Invalidate all GeoJSON-related caches and trigger a safe, locked regeneration.
     """
-    pattern = "vespadb::/observations/dynamic-geojson/*"
-    keys = cache.keys(pattern)
-    if keys:
-        cache.delete_many(keys)
-        logger.info(f"Invalidated {len(keys)} GeoJSON caches matching pattern '{pattern}'")
+    generation = bump_cache_generation(GEOJSON_CACHE_FAMILY)
+    logger.info(f"Invalidated GeoJSON caches, now at generation {generation}")
+
+    # Imported here because the prewarm tasks themselves write through this module.
+    from vespadb.observations.tasks.cache_rebuild import schedule_prewarm_rebuild  # noqa: PLC0415
+
+    # Bursts of writes are coalesced into a single trailing rebuild of the pre-warmed caches.
+    schedule_prewarm_rebuild()
+
+
+def invalidate_observation_caches(*observation_ids: str) -> None:
+    """
+    Invalidate every cache an observation write affects: the list pages, the GeoJSON and the tiles.
+
+    Every write path goes through here, so no path can bump one generation and forget the other.
+
+    :param observation_ids: The ids of single observations whose own cache entry should be dropped as well
+    """
+    cache.delete_many([f"vespadb::observations::{observation_id}" for observation_id in observation_ids])
+    bump_cache_generation(OBSERVATIONS_LIST_CACHE_FAMILY)
+    invalidate_geojson_cache()
+
+
+def invalidate_municipality_cache() -> None:
+    """Invalidate all cached municipality lists."""
+    bump_cache_generation(MUNICIPALITIES_CACHE_FAMILY)
+
+
+def invalidate_observation_rows() -> None:
+    """Invalidate every cached serialized observation row, after a change to a name the rows embed."""
+    bump_cache_generation(OBSERVATION_ROWS_CACHE_FAMILY)
+
+
+def invalidate_boundary_index() -> None:
+    """Make every process reload its in-memory municipality, province and ANB boundary index."""
+    bump_cache_generation(BOUNDARIES_CACHE_FAMILY)
+
+
+def get_cache_ttls(family: str) -> tuple[int, int]:
+    """
+    Return the (soft, hard) TTL of a cache family, see `CACHE_TTLS` in the settings.
+
+    Past the soft TTL an entry is stale: it is still served, but one caller refreshes it.
+    Past the hard TTL it is gone.
+
+    :param family: One of the `*_CACHE_FAMILY` constants.
+    :return: Tuple of (soft TTL, hard TTL) in seconds.
+    """
+    ttls = settings.CACHE_TTLS[family]
+    return ttls["soft"], ttls["hard"]
+
+
+def _fresh_key(cache_key: str) -> str:
+    return f"{cache_key}{FRESH_SUFFIX}"
+
 
-    # Asynchronously schedule the master rebuild task.
-    # The lock inside the task will prevent system overload.
-    logger.info("Scheduling a task to regenerate all pre-warmed GeoJSON caches.")
-    rebuild_all_prewarmed_caches.delay()
+def _refresh_lock_key(cache_key: str) -> str:
+    return f"{cache_key}{REFRESH_LOCK_SUFFIX}"
+
+
+def set_stale_while_revalidate(cache_key: str, values: dict[str, Any], family: str) -> None:
+    """
+    Store the entries of one cached response with the TTLs of its family and mark it fresh.
+
+    The entries live for the hard TTL; a separate marker living for the soft TTL tells readers
+    whether they are still fresh. Any refresh lock on the key is released.
+
+    :param cache_key: The main cache key; the freshness marker and refresh lock derive from it.
+    :param values: All entries to store, usually `{cache_key: value}` plus any variants.
+    :param family: One of the `*_CACHE_FAMILY` constants.
+    """
+    set_many_stale_while_revalidate({cache_key: values}, family)
+
+
+def set_many_stale_while_revalidate(responses: dict[str, dict[str, Any]], family: str) -> None:
+    """
+    Batch version of `set_stale_while_revalidate`: store many cached responses in three round-trips.
+
+    :param responses: Entries to store per main cache key.
+    :param family: One of the `*_CACHE_FAMILY` constants.
+    """
+    soft_ttl, hard_ttl = get_cache_ttls(family)
+    values: dict[str, Any] = {}
+    for entries in responses.values():
+        values.update(entries)
+    cache.set_many(values, hard_ttl)
+    cache.set_many({_fresh_key(cache_key): True for cache_key in responses}, soft_ttl)
+    cache.delete_many([_refresh_lock_key(cache_key) for cache_key in responses])
+
+
+def get_stale_while_revalidate(cache_key: str) -> tuple[Any, bool] | None:
+    """
+    Fetch a value stored with `set_stale_while_revalidate`.
+
+    :param cache_key: The main cache key.
+    :return: Tuple of (value, is_stale) or None on a cache miss.
+    """
+    values = cache.get_many([cache_key, _fresh_key(cache_key)])
+    if values.get(cache_key) is None:
+        return None
+    return values[cache_key], _fresh_key(cache_key) not in values
+
+
+def claim_refresh(cache_key: str) -> bool:
+    """
+    Try to become the single refresher of a stale cache entry.
+
+    :param cache_key: The main cache key.
+    :return: True if the caller holds the refresh lock and must refresh the entry, False if another
+        worker already does.
+    """
+    return cache.add(_refresh_lock_key(cache_key), True, timeout=REFRESH_LOCK_TIMEOUT)
 
 
-def invalidate_observation_cache(observation_id: str) -> None:
-    """Invalidate the cache for a single observation."""
-    cache_key = f"vespadb::observations::{observation_id}"
-    cache.delete(cache_key)
+def release_refresh(cache_key: str) -> None:
+    """Release the refresh lock of a cache entry without storing a new value, e.g. after a failure."""
+    cache.delete(_refresh_lock_key(cache_key))
+
+
+def compute_once(cache_key: str, fetch: Callable[[], T | None], compute: Callable[[], T]) -> T:
+    """
+    Resolve a cache miss with a single computation, however many requests miss the entry at once.
+
+    The first caller takes the refresh lock and computes the entry; `compute` stores it, which releases
+    the lock. The other callers poll `fetch` until the entry appears. If it does not appear within
+    `MISS_WAIT_TIMEOUT`, e.g. because the computing worker died, they compute it themselves.
+
+    :param cache_key: The main cache key.
+    :param fetch: Return the cached value, or None while it is missing.
+    :param compute: Compute the value, store it with `set_stale_while_revalidate` and return it.
+    :return: The cached or computed value.
+    """
+    if not claim_refresh(cache_key):
+        deadline = time.monotonic() + MISS_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(MISS_POLL_INTERVAL)
+            value = fetch()
+            if value is not None:
+                return value
+        logger.warning(f"Gave up waiting for another worker to compute {cache_key}")
+    try:
+        return compute()
+    except Exception:
+        release_refresh(cache_key)
+        raise
+
+
+def _geojson_entries(cache_key: str, payload: bytes) -> dict[str, bytes]:
+    return {
+        cache_key: payload,
+        f"{cache_key}{GEOJSON_GZIP_SUFFIX}": gzip.compress(payload, compresslevel=GEOJSON_GZIP_LEVEL),
+    }
+
+
+def set_geojson_payload(cache_key: str, payload: bytes) -> None:
+    """
+    Store a serialized GeoJSON payload as raw UTF-8 bytes, together with a gzip-compressed variant.
+
+    Storing bytes avoids the dict -> pickle -> unpickle -> JSON round-trip on every cache hit.
+    Both variants expire with the GeoJSON family TTLs.
+
+    :param cache_key: Cache key produced by `get_geojson_cache_key`.
+    :param payload: The UTF-8 encoded GeoJSON document.
+    """
+    set_stale_while_revalidate(cache_key, _geojson_entries(cache_key, payload), GEOJSON_CACHE_FAMILY)
+
+
+def set_geojson_payloads(payloads: dict[str, bytes]) -> None:
+    """
+    Store many serialized GeoJSON payloads at once, see `set_geojson_payload`.
+
+    :param payloads: UTF-8 encoded GeoJSON documents per cache key.
+    """
+    set_many_stale_while_revalidate(
+        {cache_key: _geojson_entries(cache_key, payload) for cache_key, payload in payloads.items()},
+        GEOJSON_CACHE_FAMILY,
+    )
+
+
+def get_geojson_payload(cache_key: str, accept_gzip: bool) -> tuple[bytes, bool, bool] | None:
+    """
+    Fetch a cached GeoJSON payload, preferring the gzip variant when the client accepts it.
+
+    :param cache_key: Cache key produced by `get_geojson_cache_key`.
+    :param accept_gzip: Whether the client sent `Accept-Encoding: gzip`.
+    :return: Tuple of (payload bytes, is_gzipped, is_stale) or None on a cache miss.
+    """
+    gzip_key = f"{cache_key}{GEOJSON_GZIP_SUFFIX}"
+    keys = [cache_key, _fresh_key(cache_key)]
+    if accept_gzip:
+        keys.append(gzip_key)
+    values = cache.get_many(keys)
+    is_stale = _fresh_key(cache_key) not in values
+    if isinstance(values.get(gzip_key), bytes):
+        return values[gzip_key], True, is_stale
+    if isinstance(values.get(cache_key), bytes):
+        return values[cache_key], False, is_stale
+    return None
@@ -0,0 +1,199 @@
+"""Set-based spatial enrichment: municipality, province and ANB membership for many locations per statement."""
+
+import logging
+from collections.abc import Sequence
+from typing import Any
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Locations per enrichment statement.
+ENRICHMENT_BATCH_SIZE = 5000
+
+# The boundary lookups shared by both statements, on a `points` relation with a Lambert 72 `geom`
+# column. They mirror `get_municipality_from_coordinates` and `check_if_point_in_anb_area`:
+# overlapping municipalities resolve to the first one by name.
+_MUNICIPALITY_JOIN_SQL = """
+    LEFT JOIN LATERAL (
+        SELECT mu.id, mu.province_id
+        FROM "observations_municipality" mu
+        WHERE ST_Contains(mu.polygon, points.geom)
+        ORDER BY mu.name, mu.id
+        LIMIT 1
+    ) municipality ON TRUE
+"""
+_ANB_SQL = """
+    EXISTS (SELECT 1 FROM "observations_anb" a WHERE ST_Contains(a.polygon, points.geom))
+"""
+
+# Resolves a batch of (tid, longitude, latitude) like `BoundaryIndex.resolve`: the province is the
+# municipality's, so points outside every municipality have neither. Only the constant fragments
+# above are interpolated; the points are bound as parameters.
+ENRICH_POINTS_SQL = f"""
+    WITH points AS (
+        SELECT p.tid, ST_Transform(ST_SetSRID(ST_MakePoint(p.lon, p.lat), 4326), 31370) AS geom
+        FROM unnest(%(tids)s::bigint[], %(lons)s::float8[], %(lats)s::float8[]) AS p (tid, lon, lat)
+    )
+    SELECT
+        points.tid,
+        municipality.id,
+        municipality.province_id,
+        {_ANB_SQL}
+    FROM points
+    {_MUNICIPALITY_JOIN_SQL}
+"""  # noqa: S608
+
+# Stored observations next to their freshly resolved enrichment. Like `Observation.save`, the
+# province follows the municipality. Only constant fragments are interpolated here; `{conditions}`
+# is filled by `build_reenrichment_query` from fixed conditions whose values are bound as parameters.
+_REENRICHMENT_CTE_SQL = f"""
+    resolved AS (
+        SELECT
+            points.id,
+            points.municipality_id AS old_municipality_id,
+            points.province_id AS old_province_id,
+            points.anb AS old_anb,
+            municipality.id AS municipality_id,
+            municipality.province_id,
+            {_ANB_SQL} AS anb
+        FROM (
+            SELECT obs.id, obs.municipality_id, obs.province_id, obs.anb, ST_Transform(obs.location, 31370) AS geom
+            FROM "observations_observation" obs
+            WHERE {{conditions}}
+        ) points
+        {_MUNICIPALITY_JOIN_SQL}
+    ),
+    changed AS (
+        SELECT * FROM resolved
+        WHERE (old_municipality_id, old_province_id, old_anb) IS DISTINCT FROM (municipality_id, province_id, anb)
+    )
+"""  # noqa: S608
+
+# Counts in the order of `REENRICHMENT_SUMMARY_FIELDS`.
+_REENRICHMENT_SUMMARY_SQL = """
+    SELECT
+        (SELECT count(*) FROM resolved),
+        count(*),
+        count(*) FILTER (WHERE old_municipality_id IS DISTINCT FROM municipality_id),
+        count(*) FILTER (WHERE old_province_id IS DISTINCT FROM province_id),
+        count(*) FILTER (WHERE old_anb IS DISTINCT FROM anb)
+    FROM {source}
+"""
+
+# Re-enriches stored observations in one UPDATE ... FROM. Only rows whose enrichment changes are
+# written, and they are stamped for the dynamic-geojson changes feed.
+REENRICH_OBSERVATIONS_SQL = f"""
+    WITH {_REENRICHMENT_CTE_SQL},
+    updated AS (
+        UPDATE "observations_observation" AS obs
+        SET
+            municipality_id = changed.municipality_id,
+            province_id = changed.province_id,
+            anb = changed.anb,
+            modified_datetime = now()
+        FROM changed
+        WHERE obs.id = changed.id
+        RETURNING changed.*
+    )
+    {_REENRICHMENT_SUMMARY_SQL.format(source="updated")}
+"""
+
+# The same comparison without writing anything.
+REENRICHMENT_DIFF_SQL = f"""
+    WITH {_REENRICHMENT_CTE_SQL}
+    {_REENRICHMENT_SUMMARY_SQL.format(source="changed")}
+"""
+
+# checked: observations with a location in the range; changed: observations whose enrichment differs;
+# municipality / province / anb: how many of those differ in that field.
+REENRICHMENT_SUMMARY_FIELDS = ("checked", "changed", "municipality", "province", "anb")
+
+
+def enrich_points(points: Sequence[tuple[int, float, float]]) -> dict[int, tuple[int | None, int | None, bool]]:
+    """
+    Resolve a batch of locations with one spatial join per `ENRICHMENT_BATCH_SIZE` points.
+
+    :param points: (temporary id, longitude, latitude) triples in EPSG:4326; the ids only have to be unique.
+    :return: Dictionary mapping each temporary id to (municipality_id, province_id, anb).
+    """
+    resolved: dict[int, tuple[int | None, int | None, bool]] = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(points), ENRICHMENT_BATCH_SIZE):
+            batch = points[start : start + ENRICHMENT_BATCH_SIZE]
+            cursor.execute(
+                ENRICH_POINTS_SQL,
+                {
+                    "tids": [tid for tid, _, _ in batch],
+                    "lons": [lon for _, lon, _ in batch],
+                    "lats": [lat for _, _, lat in batch],
+                },
+            )
+            for tid, municipality_id, province_id, anb in cursor.fetchall():
+                resolved[tid] = (municipality_id, province_id, anb)
+    return resolved
+
+
+def resolve_locations(points: Sequence[tuple[float, float]]) -> list[tuple[int | None, int | None, bool]]:
+    """
+    Resolve a batch of (longitude, latitude) pairs to (municipality_id, province_id, anb).
+
+    Uses the in-memory boundary index, or one spatial join per batch when `BOUNDARY_INDEX_ENABLED`
+    is off; never a query per point.
+
+    :param points: (longitude, latitude) pairs in EPSG:4326.
+    :return: (municipality_id, province_id, anb) per point, in input order.
+    """
+    if not points:
+        return []
+    if settings.BOUNDARY_INDEX_ENABLED:
+        from vespadb.observations.spatial_index import resolve_points  # noqa: PLC0415
+
+        return resolve_points(points)
+    resolved = enrich_points([(position, lon, lat) for position, (lon, lat) in enumerate(points)])
+    return [resolved[position] for position in range(len(points))]
+
+
+def build_reenrichment_query(
+    min_id: int | None = None, max_id: int | None = None, *, dry_run: bool = False
+) -> tuple[str, dict[str, Any]]:
+    """
+    Build the statement that re-enriches stored observations from their location.
+
+    :param min_id: Only observations with an id of at least this value.
+    :param max_id: Only observations with an id of at most this value.
+    :param dry_run: Only compare, do not update.
+    :return: Tuple of (SQL, named query parameters); the statement returns one row of `REENRICHMENT_SUMMARY_FIELDS`.
+    """
+    conditions = ["obs.location IS NOT NULL"]
+    params: dict[str, Any] = {}
+    if min_id is not None:
+        conditions.append("obs.id >= %(min_id)s")
+        params["min_id"] = min_id
+    if max_id is not None:
+        conditions.append("obs.id <= %(max_id)s")
+        params["max_id"] = max_id
+    template = REENRICHMENT_DIFF_SQL if dry_run else REENRICH_OBSERVATIONS_SQL
+    return template.format(conditions=" AND ".join(conditions)), params
+
+
+def reenrich_observations(
+    min_id: int | None = None, max_id: int | None = None, *, dry_run: bool = False
+) -> dict[str, int]:
+    """
+    Re-derive municipality, province and ANB of stored observations in a single statement.
+
+    Bypasses `Observation.save`, so callers invalidate the observation caches afterwards.
+
+    :param min_id: Only observations with an id of at least this value.
+    :param max_id: Only observations with an id of at most this value.
+    :param dry_run: Only report what would change.
+    :return: Counts keyed by `REENRICHMENT_SUMMARY_FIELDS`.
+    """
+    sql, params = build_reenrichment_query(min_id, max_id, dry_run=dry_run)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        summary = dict(zip(REENRICHMENT_SUMMARY_FIELDS, cursor.fetchone(), strict=True))
+    logger.info(f"Re-enriched observations {min_id} to {max_id}{' (dry run)' if dry_run else ''}: {summary}")
+    return summary
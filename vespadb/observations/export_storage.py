@@ -0,0 +1,230 @@
+"""Constant-memory writers for export files on the default storage."""
+
+import gzip
+import io
+import logging
+import posixpath
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import Storage, default_storage
+
+logger = logging.getLogger(__name__)
+
+# S3 rejects multipart parts smaller than this, except the last one.
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+GZIP_COMPRESS_LEVEL = 6
+# Exports spooled for storages without multipart uploads move to disk beyond this size.
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """
+    Binary file-like object that uploads everything written to it as one S3 multipart upload.
+
+    Bytes are buffered until a part is full and then uploaded, so memory stays bounded by the part
+    size however large the file grows. `close` uploads the last part and completes the upload;
+    `abort` discards the parts uploaded so far.
+    """
+
+    def __init__(self, client: Any, bucket: str, key: str, part_size: int, content_type: str) -> None:
+        """
+        Start the multipart upload.
+
+        :param client: A boto3 S3 client.
+        :param bucket: Name of the bucket.
+        :param key: Object key to write.
+        :param part_size: Bytes per uploaded part, raised to the S3 minimum of 5 MiB when smaller.
+        :param content_type: Content type stored with the object.
+        """
+        super().__init__()
+        self._client = client
+        self._bucket = bucket
+        self._key = key
+        self._part_size = max(part_size, S3_MIN_PART_SIZE)
+        self._buffer = bytearray()
+        self._parts: list[dict[str, Any]] = []
+        self._aborted = False
+        self.bytes_written = 0
+        upload = client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)
+        self._upload_id = upload["UploadId"]
+
+    def writable(self) -> bool:
+        """Tell `io` wrappers the stream accepts writes."""
+        return True
+
+    def write(self, data: Any) -> int:
+        """Buffer `data` and upload every part that is full."""
+        if self.closed:
+            raise ValueError("write to closed file")
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self._part_size:
+            self._upload_part(bytes(self._buffer[: self._part_size]))
+            del self._buffer[: self._part_size]
+        return len(data)
+
+    def _upload_part(self, body: bytes) -> None:
+        number = len(self._parts) + 1
+        response = self._client.upload_part(
+            Bucket=self._bucket, Key=self._key, UploadId=self._upload_id, PartNumber=number, Body=body
+        )
+        self._parts.append({"PartNumber": number, "ETag": response["ETag"]})
+
+    def close(self) -> None:
+        """Upload the remaining bytes as the last part and complete the upload."""
+        if self.closed:
+            return
+        try:
+            if not self._aborted:
+                # An upload needs at least one part, even for an empty file.
+                if self._buffer or not self._parts:
+                    self._upload_part(bytes(self._buffer))
+                    self._buffer.clear()
+                self._client.complete_multipart_upload(
+                    Bucket=self._bucket, Key=self._key, UploadId=self._upload_id, MultipartUpload={"Parts": self._parts}
+                )
+                logger.info(f"Uploaded {self._key} in {len(self._parts)} parts ({self.bytes_written} bytes)")
+        finally:
+            super().close()
+
+    def abort(self) -> None:
+        """Discard the upload; nothing is written to the key."""
+        if self._aborted or self.closed:
+            return
+        self._aborted = True
+        self._buffer.clear()
+        try:
+            self._client.abort_multipart_upload(Bucket=self._bucket, Key=self._key, UploadId=self._upload_id)
+        finally:
+            super().close()
+
+
+def _s3_location(storage: Storage, name: str) -> tuple[Any, str, str] | None:
+    """Return (client, bucket, key) when the storage is S3, None otherwise."""
+    bucket = getattr(storage, "bucket", None)
+    if bucket is None:
+        return None
+    location = getattr(storage, "location", "") or ""
+    return bucket.meta.client, bucket.name, posixpath.join(location, name) if location else name
+
+
+@contextmanager
+def open_binary_export(
+    file_path: str,
+    content_type: str = "text/csv",
+    part_size: int | None = None,
+    storage: Storage | None = None,
+    *,
+    overwrite: bool = False,
+) -> Iterator[io.RawIOBase]:
+    """
+    Open a binary stream that ends up as `file_path` on the storage, in bounded memory.
+
+    On S3 the bytes go straight into a multipart upload; other storages get a spooled temporary file
+    that is saved when the block ends. The file only appears when the block completes without error.
+
+    :param file_path: Path of the file on the storage.
+    :param content_type: Content type of the file.
+    :param part_size: Bytes per multipart part, defaults to `settings.EXPORT_UPLOAD_PART_SIZE`.
+    :param storage: The storage to write to, defaults to the default storage.
+    :param overwrite: Replace an existing file; multipart uploads always do, other storages would
+        otherwise save under a new name.
+    """
+    storage = storage or default_storage
+    s3 = _s3_location(storage, file_path)
+    if s3 is not None:
+        client, bucket, key = s3
+        writer = S3MultipartWriter(client, bucket, key, part_size or settings.EXPORT_UPLOAD_PART_SIZE, content_type)
+        try:
+            yield writer
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        return
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+        yield spool
+        spool.seek(0)
+        if overwrite and storage.exists(file_path):
+            storage.delete(file_path)
+        storage.save(file_path, File(spool))
+
+
+@contextmanager
+def open_text_export(
+    file_path: str, *, compress: bool = False, part_size: int | None = None, storage: Storage | None = None
+) -> Iterator[io.TextIOBase]:
+    """
+    Open a UTF-8 text stream for a CSV export, optionally gzipped on the fly.
+
+    :param file_path: Path of the file on the storage; gzipped files conventionally end in `.gz`.
+    :param compress: Gzip the stream while it is written.
+    :param part_size: Bytes per multipart part, defaults to `settings.EXPORT_UPLOAD_PART_SIZE`.
+    :param storage: The storage to write to, defaults to the default storage.
+    """
+    content_type = "application/gzip" if compress else "text/csv"
+    with open_binary_export(file_path, content_type, part_size, storage) as binary:
+        target: Any = binary
+        if compress:
+            target = gzip.GzipFile(fileobj=binary, mode="wb", compresslevel=GZIP_COMPRESS_LEVEL)
+        text = io.TextIOWrapper(target, encoding="utf-8", newline="", write_through=False)
+        try:
+            yield text
+            text.flush()
+        finally:
+            # Detach so closing the wrapper does not close the upload; the gzip trailer is written here.
+            text.detach()
+            if compress:
+                target.close()
+
+
+class _StreamingBodyReader(io.RawIOBase):
+    """Raw reader over a botocore streaming body, so it can be buffered and decoded incrementally."""
+
+    def __init__(self, body: Any) -> None:
+        super().__init__()
+        self._body = body
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        data = self._body.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._body.close()
+        super().close()
+
+
+@contextmanager
+def read_text_export(file_path: str, storage: Storage | None = None) -> Iterator[io.TextIOBase]:
+    """
+    Open an export written by `open_text_export` for reading, in bounded memory.
+
+    On S3 the object is streamed from the response body rather than downloaded into memory first.
+    Files ending in `.gz` are decompressed on the fly.
+
+    :param file_path: Path of the file on the storage.
+    :param storage: The storage to read from, defaults to the default storage.
+    """
+    storage = storage or default_storage
+    s3 = _s3_location(storage, file_path)
+    if s3 is not None:
+        client, bucket, key = s3
+        body = client.get_object(Bucket=bucket, Key=key)["Body"]
+        binary: Any = io.BufferedReader(_StreamingBodyReader(body))
+    else:
+        binary = storage.open(file_path, "rb")
+    with binary:
+        source: Any = gzip.GzipFile(fileobj=binary, mode="rb") if file_path.endswith(".gz") else binary
+        with io.TextIOWrapper(source, encoding="utf-8", newline="") as text:
+            yield text
@@ -0,0 +1,285 @@
+"""One compiled definition of the observation filters, shared by the REST API, export, GeoJSON, tiles and prewarm."""
+
+import logging
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from django.contrib.gis.geos import Polygon
+from django.db.models import Q
+from django.http import QueryDict
+
+from vespadb.observations.helpers import parse_and_convert_to_cet
+from vespadb.observations.utils import quantize_bbox
+
+logger = logging.getLogger(__name__)
+
+# Nest statuses in the order of `NEST_STATUS_SQL`: an observation has exactly one of them.
+NEST_STATUSES = ("eradicated", "visited", "reserved", "untreated")
+# The frontend and admin call an untreated nest "open".
+NEST_STATUS_ALIASES = {"open": "untreated"}
+
+# Prewarm configurations and the frontend store name some filters differently than the query parameters.
+PARAM_ALIASES = {
+    "anb_areas_actief": "anb",
+    "provinces": "province_id",
+    "municipalities": "municipality_id",
+}
+
+
+def _values(params: Mapping[str, Any], key: str) -> list[str]:
+    """Return all values of a parameter, accepting QueryDicts, repeated and comma-separated values."""
+    raw = params.getlist(key) if isinstance(params, QueryDict) else params.get(key)
+    if raw is None:
+        return []
+    if not isinstance(raw, (list, tuple)):
+        raw = [raw]
+    values = []
+    for item in raw:
+        if item is None:
+            continue
+        text = str(item).lower() if isinstance(item, bool) else str(item)
+        values.extend(part.strip() for part in text.split(",") if part.strip())
+    return values
+
+
+def _boolean(value: str, name: str) -> bool:
+    lowered = value.lower()
+    if lowered in {"true", "1"}:
+        return True
+    if lowered in {"false", "0"}:
+        return False
+    raise ValueError(f"Invalid {name}: {value}")
+
+
+def get_nest_status(eradication_result: str | None, reserved_by_id: int | None) -> str:
+    """
+    Return the nest status of an observation, the Python twin of `NEST_STATUS_SQL`.
+
+    :param eradication_result: The observation's `eradication_result`.
+    :param reserved_by_id: The observation's `reserved_by_id`.
+    :return: One of `NEST_STATUSES`.
+    """
+    if eradication_result == "successful":
+        return "eradicated"
+    if eradication_result is not None:
+        return "visited"
+    if reserved_by_id is not None:
+        return "reserved"
+    return "untreated"
+
+
+def nest_status_q(statuses: list[str] | tuple[str, ...]) -> Q | None:
+    """
+    Build the Q object selecting observations with any of the given nest statuses.
+
+    Follows `NEST_STATUS_SQL`, so a filtered observation always shows the status it was filtered on.
+
+    :param statuses: Nest statuses, `open` is accepted for `untreated`; unknown values are ignored.
+    :return: The Q object, or None when no known status was given.
+    """
+    canonical = {NEST_STATUS_ALIASES.get(status, status) for status in statuses}
+    conditions = {
+        "eradicated": Q(eradication_result="successful"),
+        "visited": Q(eradication_result__isnull=False) & ~Q(eradication_result="successful"),
+        "reserved": Q(eradication_result__isnull=True, reserved_by__isnull=False),
+        "untreated": Q(eradication_result__isnull=True, reserved_by__isnull=True),
+    }
+    query = None
+    for status in NEST_STATUSES:
+        if status in canonical:
+            query = conditions[status] if query is None else query | conditions[status]
+    return query
+
+
+# The column filters of `FilterSpec`: (attribute, query parameter name, SQL condition on `obs`, Django lookup).
+# A filter applies when its attribute is neither None nor empty.
+FIELD_FILTERS = (
+    ("visible", "visible", "obs.visible = {}", "visible"),
+    ("min_observation_datetime", "min_observation_datetime", "obs.observation_datetime >= {}", "observation_datetime__gte"),
+    ("max_observation_datetime", "max_observation_datetime", "obs.observation_datetime <= {}", "observation_datetime__lte"),
+    ("municipality_ids", "municipality_id", "obs.municipality_id IN {}", "municipality_id__in"),
+    ("province_ids", "province_id", "obs.province_id IN {}", "province_id__in"),
+    ("nest_types", "nest_type", "obs.nest_type IN {}", "nest_type__in"),
+    ("anb", "anb", "obs.anb = {}", "anb"),
+)
+
+NEST_STATUS_CONDITIONS_SQL = {
+    "eradicated": "obs.eradication_result = 'successful'",
+    "visited": "(obs.eradication_result IS NOT NULL AND obs.eradication_result != 'successful')",
+    "reserved": "(obs.eradication_result IS NULL AND obs.reserved_by_id IS NOT NULL)",
+    "untreated": "(obs.eradication_result IS NULL AND obs.reserved_by_id IS NULL)",
+}
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """
+    A normalized set of observation map filters.
+
+    Built with `from_params` from any spelling of the filters (query parameters, prewarm
+    configurations), it compiles to a Django Q object, a parameterized SQL fragment on the `obs`
+    alias and a canonical cache key. Two requests selecting the same observations produce the same
+    spec, so they share one cache entry.
+    """
+
+    visible: bool | None = True
+    min_observation_datetime: str | None = None
+    max_observation_datetime: str | None = None
+    municipality_ids: tuple[int, ...] = ()
+    province_ids: tuple[int, ...] = ()
+    nest_types: tuple[str, ...] = ()
+    anb: bool | None = None
+    bbox: str | None = None
+    nest_statuses: tuple[str, ...] = ()
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, Any]) -> "FilterSpec":
+        """
+        Normalize filter parameters into a spec.
+
+        Observations are visible-only unless `visible` is passed (`all` disables the filter),
+        observation datetime bounds are converted to CET ISO strings, `bbox` is snapped to the cache
+        grid and list values are deduplicated and sorted. Parameters that are not filters are ignored.
+
+        :param params: Query parameters or a plain filter dictionary; aliases in `PARAM_ALIASES` are accepted.
+        :return: The spec.
+        :raises ValueError: If a filter value is malformed.
+        """
+        values: dict[str, list[str]] = {}
+        for key in params:
+            name = PARAM_ALIASES.get(key, key)
+            values.setdefault(name, []).extend(_values(params, key))
+
+        def last(name: str) -> str | None:
+            return values[name][-1] if values.get(name) else None
+
+        visible: bool | None = True
+        if last("visible") is not None:
+            visible = None if last("visible").lower() == "all" else _boolean(last("visible"), "visible")
+
+        datetimes = {}
+        for name in ("min_observation_datetime", "max_observation_datetime"):
+            if last(name) is not None:
+                try:
+                    datetimes[name] = parse_and_convert_to_cet(last(name)).isoformat()
+                except (ValueError, TypeError, OverflowError) as e:
+                    raise ValueError(f"Invalid {name}: {last(name)}") from e
+
+        try:
+            municipality_ids = tuple(sorted({int(value) for value in values.get("municipality_id", [])}))
+            province_ids = tuple(sorted({int(value) for value in values.get("province_id", [])}))
+        except ValueError as e:
+            raise ValueError(f"Invalid municipality_id or province_id: {e}") from e
+
+        raw_bbox = params.get("bbox")
+        bbox = quantize_bbox(raw_bbox) if raw_bbox else None
+
+        statuses = {NEST_STATUS_ALIASES.get(value, value) for value in values.get("nest_status", [])}
+        unknown = statuses.difference(NEST_STATUSES)
+        if unknown:
+            logger.warning(f"Ignoring unknown nest_status values: {sorted(unknown)}")
+
+        return cls(
+            visible=visible,
+            min_observation_datetime=datetimes.get("min_observation_datetime"),
+            max_observation_datetime=datetimes.get("max_observation_datetime"),
+            municipality_ids=municipality_ids,
+            province_ids=province_ids,
+            nest_types=tuple(sorted(set(values.get("nest_type", [])))),
+            anb=_boolean(last("anb"), "anb") if last("anb") is not None else None,
+            bbox=bbox,
+            nest_statuses=tuple(status for status in NEST_STATUSES if status in statuses),
+        )
+
+    def to_query_dict(self) -> QueryDict:
+        """
+        Render the spec back into canonical query parameters.
+
+        :return: A mutable QueryDict; `from_params` on it returns an equal spec.
+        """
+        query_params = QueryDict(mutable=True)
+        query_params["visible"] = "all" if self.visible is None else str(self.visible).lower()
+        if self.min_observation_datetime:
+            query_params["min_observation_datetime"] = self.min_observation_datetime
+        if self.max_observation_datetime:
+            query_params["max_observation_datetime"] = self.max_observation_datetime
+        if self.municipality_ids:
+            query_params.setlist("municipality_id", [str(value) for value in self.municipality_ids])
+        if self.province_ids:
+            query_params.setlist("province_id", [str(value) for value in self.province_ids])
+        if self.nest_types:
+            query_params.setlist("nest_type", list(self.nest_types))
+        if self.anb is not None:
+            query_params["anb"] = str(self.anb).lower()
+        if self.bbox:
+            query_params["bbox"] = self.bbox
+        if self.nest_statuses:
+            query_params.setlist("nest_status", list(self.nest_statuses))
+        return query_params
+
+    def cache_key(self) -> str:
+        """
+        Return the canonical, process-independent cache key fragment of the spec.
+
+        :return: Sorted `name=value` pairs, list values comma-joined.
+        """
+        query_params = self.to_query_dict()
+        return "&".join(f"{key}={','.join(query_params.getlist(key))}" for key in sorted(query_params))
+
+    def _field_filters(self) -> list[tuple[str, str, str, Any]]:
+        """
+        Return the column filters that apply to this spec.
+
+        :return: Tuples of (query parameter name, SQL condition, Django lookup, value), see `FIELD_FILTERS`.
+        """
+        return [
+            (name, condition, lookup, getattr(self, attribute))
+            for attribute, name, condition, lookup in FIELD_FILTERS
+            if getattr(self, attribute) not in {None, ()}
+        ]
+
+    def to_q(self) -> Q:
+        """
+        Compile the spec into a Django Q object.
+
+        :return: The Q object; empty when the spec does not filter anything.
+        """
+        query = Q()
+        for _, _, lookup, value in self._field_filters():
+            query &= Q(**{lookup: value})
+        if self.bbox:
+            envelope = Polygon.from_bbox(tuple(float(part) for part in self.bbox.split(",")))
+            envelope.srid = 4326
+            query &= Q(location__bboverlaps=envelope)
+        status_query = nest_status_q(self.nest_statuses)
+        if status_query is not None:
+            query &= status_query
+        return query
+
+    def to_sql(self, prefix: str = "") -> tuple[list[str], dict[str, Any]]:
+        """
+        Compile the spec into SQL conditions on the `obs` alias.
+
+        :param prefix: Prefix for the named query parameters, so several specs can share one statement.
+        :return: Tuple of (list of SQL conditions to AND together, named query parameters).
+        """
+        filters: list[str] = []
+        params: dict[str, Any] = {}
+
+        def bind(name: str, value: Any) -> str:
+            params[f"{prefix}{name}"] = value
+            return f"%({prefix}{name})s"
+
+        for name, condition, _, value in self._field_filters():
+            filters.append(condition.format(bind(name, value)))
+        if self.bbox:
+            # && against the envelope is answered by the location_idx GiST index.
+            xmin, ymin, xmax, ymax = (float(part) for part in self.bbox.split(","))
+            filters.append(
+                f"obs.location && ST_MakeEnvelope({bind('bbox_xmin', xmin)}, {bind('bbox_ymin', ymin)}, "
+                f"{bind('bbox_xmax', xmax)}, {bind('bbox_ymax', ymax)}, 4326)"
+            )
+        if self.nest_statuses:
+            filters.append(f"({' OR '.join(NEST_STATUS_CONDITIONS_SQL[status] for status in self.nest_statuses)})")
+        return filters, params
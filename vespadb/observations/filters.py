@@ -5,15 +5,29 @@ from typing import Any
 
 import django_filters
 from django.contrib.admin import SimpleListFilter
-from django.db.models import Q, QuerySet
+from django.db.models import QuerySet
 from django.utils.translation import gettext_lazy as _
 from django.core.cache import cache
+from rest_framework.exceptions import ValidationError
 from rest_framework_gis.filterset import GeoFilterSet
 
+from vespadb.observations.filter_spec import FilterSpec
 from vespadb.observations.models import Municipality, Observation, Province
 
 logger = logging.getLogger(__name__)
 
+# The filters compiled through `FilterSpec`, so the list and the export select what the map shows.
+FILTER_SPEC_FIELDS = (
+    "municipality_id",
+    "province_id",
+    "min_observation_datetime",
+    "max_observation_datetime",
+    "anb",
+    "nest_type",
+    "nest_status",
+    "visible",
+)
+
 
 class ListFilter(django_filters.BaseInFilter, django_filters.CharFilter):
     """Filter for a list of values."""
@@ -36,63 +50,41 @@ class ObservationFilter(GeoFilterSet):
     min_observation_datetime = django_filters.DateTimeFilter(field_name="observation_datetime", lookup_expr="gte")
     max_observation_datetime = django_filters.DateTimeFilter(field_name="observation_datetime", lookup_expr="lte")
     anb = django_filters.BooleanFilter(field_name="anb")
-    nest_type = MultiCharFilter(method="filter_nest_type")
-    nest_status = MultiCharFilter(method="filter_nest_status")
+    nest_type = MultiCharFilter(field_name="nest_type")
+    nest_status = MultiCharFilter(field_name="nest_status")
     visible = django_filters.BooleanFilter(field_name="visible")
 
-    def filter_nest_status(self, queryset: QuerySet, name: str, value: str) -> QuerySet:
+    def filter_queryset(self, queryset: QuerySet) -> QuerySet:
         """
-        Filter the queryset based on multiple nest statuses.
-
-        Parameters
-        ----------
-        queryset : QuerySet
-            The initial queryset to be filtered.
-        name : str
-            The name of the filter being applied.
-        value : list
-            A list of desired nest statuses to filter by (e.g., ['eradicated', 'reserved']).
+        Filter the queryset, compiling the filters in `FILTER_SPEC_FIELDS` through `FilterSpec`.
 
-        Returns
-        -------
-        QuerySet
-            The filtered queryset based on the provided nest statuses.
-        """
-        if not value:
-            return queryset
-        query = Q()
-        if "eradicated" in value:
-            query |= Q(eradication_date__isnull=False)
-        if "visited" in value:
-            query |= Q(eradication_result__isnull=False) & ~Q(eradication_result='successful')
-        if "reserved" in value:
-            query |= Q(reserved_datetime__isnull=False)
-        if "open" in value:
-            query |= Q(reserved_datetime__isnull=True, eradication_date__isnull=True)
-
-        return queryset.filter(query)
-
-    def filter_nest_type(self, queryset: QuerySet, name: str, value: str) -> QuerySet:
-        """
-        Filter the queryset based on multiple nest types.
+        The declared filters still validate the parameters and document them; the other filters
+        apply as usual. Unlike the map, the list does not default to visible observations only,
+        `get_queryset` of the view decides that.
 
         Parameters
         ----------
         queryset : QuerySet
             The initial queryset to be filtered.
-        name : str
-            The name of the filter being applied.
-        value : list
-            A list of desired nest types to filter by (e.g., ['active_embryonal_nest', 'inactive_empty_nest']).
 
         Returns
         -------
         QuerySet
-            The filtered queryset based on the provided nest types.
+            The filtered queryset.
         """
-        if not value:
-            return queryset
-        return queryset.filter(nest_type__in=value)
+        for name, value in self.form.cleaned_data.items():
+            if name not in FILTER_SPEC_FIELDS:
+                queryset = self.filters[name].filter(queryset, value)
+
+        params: dict[str, Any] = {"visible": "all"}
+        for name in FILTER_SPEC_FIELDS:
+            if self.data.get(name) not in {None, ""}:
+                params[name] = self.data.getlist(name) if hasattr(self.data, "getlist") else self.data[name]
+        try:
+            spec = FilterSpec.from_params(params)
+        except ValueError as e:
+            raise ValidationError({"detail": str(e)}) from e
+        return queryset.filter(spec.to_q())
 
     class Meta:
         """Meta class for the ObservationFilter."""
@@ -23,6 +23,9 @@ DATETIME_FORMATS = [
 
 T = TypeVar("T")
 
+# Resolved once; looking a zone up per value dominated datetime rendering.
+CET_TZ = pytz.timezone("Europe/Brussels")
+
 
 def parse_and_convert_to_utc(datetime_str: str) -> datetime:
     """
@@ -59,7 +62,7 @@ def parse_and_convert_to_cet(datetime_str: Union[str, datetime]) -> datetime:
     Raises:
         ValueError: If the input cannot be parsed or converted.
     """
-    cet_tz = pytz.timezone("Europe/Brussels")
+    cet_tz = CET_TZ
 
     if isinstance(datetime_str, datetime):
         # If naive, assume it's in CET (matches app context), not UTC
@@ -82,6 +85,26 @@ def parse_and_convert_to_cet(datetime_str: Union[str, datetime]) -> datetime:
 
     raise ValueError(f"Expected datetime string or object, got: {type(datetime_str)}")
 
+def format_cet_datetime(value: datetime | None) -> str | None:
+    """
+    Render a datetime as CET wall-clock time without a timezone indicator (`YYYY-MM-DDTHH:MM:SS`).
+
+    Aware datetimes are converted straight to CET; naive ones are taken to be CET already, as in
+    `parse_and_convert_to_cet`. Unlike going through an ISO string and `parse_and_convert_to_cet`,
+    nothing is parsed.
+
+    Args:
+        value (datetime | None): The datetime to render.
+
+    Returns:
+        str | None: The formatted datetime, or None if no value was given.
+    """
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(CET_TZ)
+    return value.replace(tzinfo=None, microsecond=0).isoformat()
+
 def retry_with_backoff(func: Callable[..., T], retries: int=3, backoff_in_seconds: int=2) -> Any:
     """Retry mechanism for retrying a function with a backoff strategy."""
     for attempt in range(retries):
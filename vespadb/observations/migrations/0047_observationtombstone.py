@@ -0,0 +1,21 @@
+# Generated for the dynamic-geojson changes feed
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('observations', '0046_add_spray_spuitbus_eradication_product'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ObservationTombstone',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('observation_id', models.IntegerField(help_text='ID of the deleted observation')),
+                ('deleted_datetime', models.DateTimeField(auto_now_add=True, db_index=True, help_text='Datetime when the observation was deleted')),
+            ],
+        ),
+    ]
@@ -1,18 +1,36 @@
 """Observation models for the observations app."""
 
 import logging
+import random
 from typing import Any
 
 from django.conf import settings
 from django.contrib.gis.db import models as gis_models
 from django.contrib.gis.geos import Point
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from datetime import datetime
-from vespadb.observations.utils import check_if_point_in_anb_area, get_municipality_from_coordinates
+from vespadb.observations.cache import get_metrics, increment_metric
+from vespadb.observations.utils import resolve_location
 
 logger = logging.getLogger(__name__)
 
+# Marks snapshot attributes of instances that were not loaded from the database (or with the field deferred).
+_NOT_LOADED = object()
+
+LOCATION_ENRICHMENT_METRICS = ("location_enrichment:executed", "location_enrichment:skipped")
+# One in this many saves records the enrichment metric, weighted by the rate, so most saves skip the cache round trip.
+LOCATION_ENRICHMENT_SAMPLE_RATE = 20
+
+# Fields whose loaded values `Observation.save` compares against to handle reservation changes.
+RESERVATION_SNAPSHOT_FIELDS = ("reserved_by_id", "reserved_datetime", "eradication_date")
+
+
+def get_location_enrichment_metrics() -> dict[str, int]:
+    """Return how often `Observation.save` ran and skipped the spatial enrichment, estimated from sampled saves."""
+    return {name.split(":", 1)[1]: value for name, value in get_metrics(list(LOCATION_ENRICHMENT_METRICS)).items()}
+
 
 class NestHeightEnum(models.TextChoices):
     """Enum for the height of the nest."""
@@ -213,6 +231,22 @@ class ANB(models.Model):
         return str(self.domain)
 
 
+class ObservationQuerySet(models.QuerySet):
+    """QuerySet of observations whose bulk updates stamp `modified_datetime` like a save does."""
+
+    def update(self, **kwargs: Any) -> int:
+        """
+        Update the observations and stamp `modified_datetime`, which `auto_now` only sets on save.
+
+        The dynamic-geojson changes feed and the incremental export find changed observations by it.
+
+        :param kwargs: The fields to update; an explicit `modified_datetime` is kept.
+        :return: The number of updated observations.
+        """
+        kwargs.setdefault("modified_datetime", timezone.now())
+        return super().update(**kwargs)
+
+
 class Observation(models.Model):
     """Model for the observation of a Vespa velutina nest."""
 
@@ -385,35 +419,155 @@ class Observation(models.Model):
         help_text="Shows if the nest belongs to another species",
     )
 
+    objects = ObservationQuerySet.as_manager()
 
     def __str__(self) -> str:
         """Return the string representation of the model."""
         return f"Observation {self.id} - location: {self.location} - eradicated: {self.eradication_date}"
 
-    def save(self, *args: Any, **kwargs: Any) -> None:
+    @classmethod
+    def from_db(cls, db: str | None, field_names: list[str], values: list[Any]) -> "Observation":
+        """Load an observation and remember its location and reservation, so `save` can tell what changed."""
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_state()
+        return instance
+
+    def _location_snapshot(self) -> tuple[float, float, int | None] | None | object:
+        if "location" not in self.__dict__:
+            return _NOT_LOADED
+        location = self.__dict__["location"]
+        if not location:
+            return None
+        if not isinstance(location, Point):
+            location = Point(location)
+        return (location.x, location.y, location.srid)
+
+    def _remember_loaded_state(self) -> None:
+        self._loaded_location = self._location_snapshot()
+        self._loaded_municipality_id = self.__dict__.get("municipality_id", _NOT_LOADED)
+        self._loaded_province_id = self.__dict__.get("province_id", _NOT_LOADED)
+        self._loaded_reservation = {name: self.__dict__.get(name, _NOT_LOADED) for name in RESERVATION_SNAPSHOT_FIELDS}
+
+    def _loaded_reservation_value(self, name: str) -> Any:
+        return getattr(self, "_loaded_reservation", {}).get(name, _NOT_LOADED)
+
+    def location_changed(self) -> bool:
+        """Return whether the location differs from the one loaded from the database; True for new instances."""
+        loaded = getattr(self, "_loaded_location", _NOT_LOADED)
+        return loaded is _NOT_LOADED or loaded != self._location_snapshot()
+
+    def _enrich_location(self) -> list[str]:
+        """
+        Derive the ANB flag, municipality and province from the location with one boundary lookup.
+
+        The municipality is resolved when it is missing, or when it was not changed by hand since
+        the observation was loaded (so a moved nest follows its location). The province follows the
+        resolved municipality on the same terms, and is cleared with it for a location outside every
+        municipality.
+
+        :return: Names of the fields that were set.
+        """
+        municipality_id, province_id, self.anb = resolve_location(self.location.x, self.location.y)
+        fields = ["anb"]
+        loaded_municipality_id = getattr(self, "_loaded_municipality_id", _NOT_LOADED)
+        if not self.municipality_id or loaded_municipality_id == self.municipality_id:
+            loaded_province_id = getattr(self, "_loaded_province_id", _NOT_LOADED)
+            keep_province = self.province_id and loaded_province_id != self.province_id
+            self.municipality_id = municipality_id
+            fields.append("municipality")
+            if not keep_province:
+                self.province_id = province_id
+                fields.append("province")
+        return fields
+
+    def _apply_reservation_changes(self) -> list[str]:
+        """
+        Stamp `reserved_datetime` on a reservation that has none, before the write instead of in a second save.
+
+        :return: Names of the fields that were set.
+        """
+        loaded_reserved_by_id = self._loaded_reservation_value("reserved_by_id")
+        if loaded_reserved_by_id is not _NOT_LOADED and loaded_reserved_by_id != self.reserved_by_id:
+            logger.info(
+                f"Reservation changed for observation {self.pk}: from {loaded_reserved_by_id} to {self.reserved_by_id}"
+            )
+        if self.reserved_by_id and not self.reserved_datetime:
+            self.reserved_datetime = timezone.now()
+            return ["reserved_datetime"]
+        return []
+
+    def _reservation_count_deltas(self, update_fields: Any) -> dict[int, int]:
+        """
+        Return the reservation counter changes this save causes, from the loaded snapshot.
+
+        :param update_fields: The `update_fields` of the save; fields it leaves out keep their stored value.
+        :return: Dictionary mapping user ids to their counter change; empty when the stored state is unknown.
+        """
+        from vespadb.observations.reservations import reservation_deltas  # noqa: PLC0415
+
+        if self._state.adding:
+            old = None
+        else:
+            old = (self._loaded_reservation_value("reserved_by_id"), self._loaded_reservation_value("eradication_date"))
+            if any(value is _NOT_LOADED for value in old):
+                return {}
+
+        def written(*names: str) -> bool:
+            return update_fields is None or any(name in update_fields for name in names)
+
+        new = (
+            self.reserved_by_id if old is None or written("reserved_by", "reserved_by_id") else old[0],
+            self.eradication_date if old is None or written("eradication_date") else old[1],
+        )
+        return reservation_deltas(old, new)
+
+    def save(self, *args: Any, enrich_location: bool | None = None, **kwargs: Any) -> None:
         """
         Override the save method to automatically assign a municipality and ANB bool based on the observation's location.
 
+        The spatial lookups only run when the location changed since the observation was loaded
+        (always for new observations), so saves that only touch other fields skip them. Reservation
+        changes are derived from the same loaded snapshot: `reserved_datetime` is stamped in the one
+        UPDATE and the reservation counters follow with F() updates, without re-reading the observation.
+
         :param args: Variable length argument list.
+        :param enrich_location: Force (True) or suppress (False) the spatial enrichment instead of
+            deciding from the location change.
         :param kwargs: Arbitrary keyword arguments.
         """
         logger.info(f"Saving observation with created_datetime={self.created_datetime}, pk={self.pk}")
+        # Fields this save derives are written along with an explicit update_fields; auto_now only
+        # stamps modified_datetime when it is among the saved fields.
+        derived_fields = ["modified_datetime"]
         if self.location:
             if not isinstance(self.location, Point):
                 self.location = Point(self.location)
-            long, lat = self.location.x, self.location.y
-            self.anb = check_if_point_in_anb_area(long, lat)
-            if not self.municipality:
-                municipality = get_municipality_from_coordinates(long, lat)
-                self.municipality = municipality
-                if municipality and not self.province:
-                    self.province = municipality.province
+            should_enrich = self.location_changed() if enrich_location is None else enrich_location
+            if should_enrich:
+                derived_fields.extend(self._enrich_location())
+            if random.randrange(LOCATION_ENRICHMENT_SAMPLE_RATE) == 0:  # noqa: S311
+                increment_metric(
+                    LOCATION_ENRICHMENT_METRICS[0] if should_enrich else LOCATION_ENRICHMENT_METRICS[1],
+                    LOCATION_ENRICHMENT_SAMPLE_RATE,
+                )
+        derived_fields.extend(self._apply_reservation_changes())
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], *derived_fields}
+        reservation_count_deltas = self._reservation_count_deltas(kwargs.get("update_fields"))
         if self.modified_datetime is None:
             self.modified_datetime = datetime.now()
         if self.created_datetime is None and not self.pk:
             self.created_datetime = datetime.now()
             logger.info(f"Setting created_datetime to now: {self.created_datetime}")
-        super().save(*args, **kwargs)
+        if reservation_count_deltas:
+            from vespadb.observations.reservations import apply_reservation_deltas  # noqa: PLC0415
+
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                apply_reservation_deltas(reservation_count_deltas)
+        else:
+            super().save(*args, **kwargs)
+        self._remember_loaded_state()
         logger.info(f"Saved observation with created_datetime={self.created_datetime}")
         
     class Meta:
@@ -439,6 +593,19 @@ class Observation(models.Model):
             models.Index(fields=['municipality', 'observation_datetime']),
         ]
 
+class ObservationTombstone(models.Model):
+    """Record of a deleted observation, so map clients applying deltas can drop it."""
+
+    id = models.BigAutoField(primary_key=True)
+    observation_id = models.IntegerField(help_text="ID of the deleted observation")
+    deleted_datetime = models.DateTimeField(
+        auto_now_add=True, db_index=True, help_text="Datetime when the observation was deleted"
+    )
+
+    def __str__(self) -> str:
+        """Return the string representation of the model."""
+        return f"Tombstone for observation {self.observation_id}"
+
 class Export(models.Model):
     STATUS_CHOICES = (
         ("pending", "Pending"),
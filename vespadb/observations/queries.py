@@ -0,0 +1,327 @@
+"""Raw SQL building blocks shared by the map endpoints (GeoJSON, changes feed and vector tiles)."""
+
+import logging
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any
+
+from django.conf import settings
+from django.db import connection
+from django.http import QueryDict
+
+from vespadb.observations.filter_spec import FilterSpec
+from vespadb.observations.utils import current_change_token
+
+logger = logging.getLogger(__name__)
+
+OBSERVATION_TABLE = '"observations_observation"'
+EMPTY_FEATURE_COLLECTION = b'{"type": "FeatureCollection", "features": []}'
+
+# Map status of an observation, the SQL twin of `filter_spec.get_nest_status`.
+NEST_STATUS_SQL = """
+    CASE
+        WHEN obs.eradication_result = 'successful' THEN 'eradicated'
+        WHEN obs.eradication_result IS NOT NULL THEN 'visited'
+        WHEN obs.reserved_by_id IS NOT NULL THEN 'reserved'
+        ELSE 'untreated'
+    END
+"""
+
+# One observation rendered as a GeoJSON Feature.
+FEATURE_SQL = f"""
+    json_build_object(
+        'type', 'Feature',
+        'id', obs.id,
+        'geometry', ST_AsGeoJSON(obs.location, 6, 0)::json,
+        'properties', json_build_object(
+            'id', obs.id,
+            'municipality_id', obs.municipality_id,
+            'status', {NEST_STATUS_SQL}
+        )
+    )
+"""
+
+
+def normalize_filter_params(query_params: Mapping[str, Any]) -> QueryDict:
+    """
+    Return the canonical query parameters of a filter set, see `FilterSpec`.
+
+    Observations are visible-only unless `visible` is passed explicitly, observation datetime
+    bounds are converted to CET ISO strings, `bbox` is snapped to the cache grid and aliases such
+    as the prewarm `anb_areas_actief` are renamed. The `zoom` parameter is carried over.
+
+    :param query_params: The incoming request query parameters or a prewarm filter dictionary.
+    :return: The normalized, mutable copy.
+    :raises ValueError: If a filter value is malformed.
+    """
+    params = FilterSpec.from_params(query_params).to_query_dict()
+    if query_params.get("zoom") is not None:
+        params["zoom"] = str(query_params.get("zoom"))
+    return params
+
+
+def build_observation_filters(query_params: Mapping[str, Any], prefix: str = "") -> tuple[list[str], dict[str, Any]]:
+    """
+    Translate the observation filters into SQL conditions on the `obs` alias, see `FilterSpec.to_sql`.
+
+    :param query_params: Normalized query parameters, see `normalize_filter_params`.
+    :param prefix: Prefix for the named query parameters, so several filter sets can share one statement.
+    :return: Tuple of (list of SQL conditions, named query parameters).
+    """
+    return FilterSpec.from_params(query_params).to_sql(prefix)
+
+
+def build_geojson_query(query_params: QueryDict) -> tuple[str, dict[str, Any]]:
+    """
+    Build the statement that renders the filtered observations as a GeoJSON FeatureCollection.
+
+    The document is cast to text so psycopg2 hands back the exact JSON produced by PostgreSQL
+    instead of parsing it into a dict. It carries a `changes_token` that clients can pass to
+    the changes feed to receive only what changed afterwards.
+
+    :param query_params: Normalized query parameters, see `normalize_filter_params`.
+    :return: Tuple of (SQL, named query parameters).
+    """
+    filters, params = build_observation_filters(query_params)
+    params["changes_token"] = current_change_token()
+    sql = f"""
+    SELECT json_build_object(
+        'type', 'FeatureCollection',
+        'features', COALESCE(json_agg({FEATURE_SQL}), '[]'::json),
+        'changes_token', %(changes_token)s
+    )::text
+    FROM {OBSERVATION_TABLE} AS obs
+    """
+    if filters:
+        sql += " WHERE " + " AND ".join(filters)
+    return sql, params
+
+
+def build_changes_query(query_params: QueryDict, since: datetime) -> tuple[str, dict[str, Any]]:
+    """
+    Build the statement that renders the observation changes since a moment as a GeoJSON delta.
+
+    Observations modified after `since` that still match the filters are returned as features.
+    Modified observations that no longer match (e.g. hidden ones) and deleted observations are
+    returned as ids under `removed`.
+
+    :param query_params: Normalized query parameters, see `normalize_filter_params`.
+    :param since: Only changes after this moment are returned.
+    :return: Tuple of (SQL, named query parameters).
+    """
+    filters, params = build_observation_filters(query_params)
+    matches = " AND ".join(filters) if filters else "TRUE"
+    params.update({"changes_since": since, "changes_token": current_change_token()})
+    sql = f"""
+    WITH changed AS (
+        SELECT obs.id, COALESCE({matches}, FALSE) AS matches, {FEATURE_SQL} AS feature
+        FROM {OBSERVATION_TABLE} AS obs
+        WHERE obs.modified_datetime > %(changes_since)s
+    ),
+    removed AS (
+        SELECT id FROM changed WHERE NOT matches
+        UNION
+        SELECT observation_id FROM "observations_observationtombstone"
+        WHERE deleted_datetime > %(changes_since)s
+    )
+    SELECT json_build_object(
+        'type', 'FeatureCollection',
+        'features', COALESCE((SELECT json_agg(feature) FROM changed WHERE matches), '[]'::json),
+        'removed', COALESCE((SELECT json_agg(id) FROM removed), '[]'::json),
+        'changes_token', %(changes_token)s
+    )::text
+    """
+    return sql, params
+
+
+def build_geojson_variants_query(variants: list[QueryDict]) -> tuple[str, dict[str, Any]]:
+    """
+    Build one statement that renders a GeoJSON FeatureCollection for each of several filter sets.
+
+    The table is scanned once: every row matching any filter set is rendered as a Feature once,
+    with one boolean column per filter set, and each FeatureCollection aggregates its rows with
+    `json_agg(...) FILTER`. Every document is byte-identical to what `build_geojson_query` returns
+    for the same filter set.
+
+    :param variants: Normalized query parameters per filter set, see `normalize_filter_params`.
+    :return: Tuple of (SQL returning one text column per filter set, named query parameters).
+    """
+    params: dict[str, Any] = {"changes_token": current_change_token()}
+    conditions = []
+    for index, variant in enumerate(variants):
+        filters, variant_params = build_observation_filters(variant, prefix=f"v{index}_")
+        conditions.append(" AND ".join(filters) if filters else "TRUE")
+        params.update(variant_params)
+
+    columns = ",\n".join(f"COALESCE(({condition}), FALSE) AS v{index}" for index, condition in enumerate(conditions))
+    collections = ",\n".join(
+        f"""json_build_object(
+            'type', 'FeatureCollection',
+            'features', COALESCE(json_agg(feature) FILTER (WHERE v{index}), '[]'::json),
+            'changes_token', %(changes_token)s
+        )::text"""
+        for index in range(len(variants))
+    )
+    where = " OR ".join(f"({condition})" for condition in conditions)
+    sql = f"""
+    SELECT {collections}
+    FROM (
+        SELECT {FEATURE_SQL} AS feature, {columns}
+        FROM {OBSERVATION_TABLE} AS obs
+        WHERE {where}
+    ) AS matched
+    """
+    return sql, params
+
+
+def render_geojson_variants(variants: list[QueryDict]) -> list[bytes]:
+    """
+    Render the GeoJSON documents of several filter sets from a single table scan.
+
+    :param variants: Normalized query parameters per filter set, see `normalize_filter_params`.
+    :return: The UTF-8 encoded FeatureCollections, in the order of `variants`.
+    """
+    if not variants:
+        return []
+    sql, params = build_geojson_variants_query(variants)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return [value.encode("utf-8") if value else EMPTY_FEATURE_COLLECTION for value in row]
+
+
+def resolve_cluster_zoom(query_params: QueryDict) -> int | None:
+    """
+    Decide whether a GeoJSON request is answered with grid clusters instead of individual points.
+
+    The `zoom` parameter is normalized in place: it is kept (as an integer) only when clustering
+    applies, so all zoom levels past `GEOJSON_CLUSTER_MAX_ZOOM` share one cache entry.
+
+    :param query_params: Normalized, mutable query parameters.
+    :return: The zoom level to cluster at, or None to return individual points.
+    """
+    raw_zoom = query_params.pop("zoom", None)
+    if not raw_zoom:
+        return None
+    try:
+        zoom = int(float(raw_zoom[-1]))
+    except (ValueError, TypeError):
+        logger.warning(f"Ignoring invalid zoom: {raw_zoom}")
+        return None
+    if zoom < 0 or zoom >= settings.GEOJSON_CLUSTER_MAX_ZOOM:
+        return None
+    query_params["zoom"] = str(zoom)
+    return zoom
+
+
+def build_cluster_query(query_params: QueryDict, zoom: int) -> tuple[str, dict[str, Any]]:
+    """
+    Build the statement that aggregates the filtered observations into grid clusters.
+
+    Observations are snapped to a grid whose cell size follows the zoom level. Every cell becomes
+    one point feature at the centroid of its observations, with the total count and the count per
+    nest status as properties.
+
+    :param query_params: Normalized query parameters, see `normalize_filter_params`.
+    :param zoom: The map zoom level, see `resolve_cluster_zoom`.
+    :return: Tuple of (SQL, named query parameters).
+    """
+    filters, params = build_observation_filters(query_params)
+    params["cell_size"] = 360.0 / (2**zoom * settings.GEOJSON_CLUSTER_GRID_DIVISIONS)
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    sql = f"""
+    WITH points AS (
+        SELECT obs.location, {NEST_STATUS_SQL} AS status
+        FROM {OBSERVATION_TABLE} AS obs
+        {where}
+    ),
+    clusters AS (
+        SELECT
+            ST_Centroid(ST_Collect(location)) AS geom,
+            count(*) AS total,
+            count(*) FILTER (WHERE status = 'eradicated') AS eradicated,
+            count(*) FILTER (WHERE status = 'visited') AS visited,
+            count(*) FILTER (WHERE status = 'reserved') AS reserved,
+            count(*) FILTER (WHERE status = 'untreated') AS untreated
+        FROM points
+        GROUP BY floor(ST_X(location) / %(cell_size)s), floor(ST_Y(location) / %(cell_size)s)
+    )
+    SELECT json_build_object(
+        'type', 'FeatureCollection',
+        'features', COALESCE(json_agg(
+            json_build_object(
+                'type', 'Feature',
+                'geometry', ST_AsGeoJSON(geom, 6, 0)::json,
+                'properties', json_build_object(
+                    'cluster', true,
+                    'count', total,
+                    'status_counts', json_build_object(
+                        'eradicated', eradicated,
+                        'visited', visited,
+                        'reserved', reserved,
+                        'untreated', untreated
+                    )
+                )
+            )
+        ), '[]'::json)
+    )::text
+    FROM clusters
+    """
+    return sql, params
+
+
+def render_geojson(query_params: QueryDict, zoom: int | None = None) -> bytes:
+    """
+    Run the GeoJSON statement for a filter set and return the document as UTF-8 bytes.
+
+    :param query_params: Normalized query parameters, see `normalize_filter_params`.
+    :param zoom: Cluster zoom level from `resolve_cluster_zoom`, or None for individual points.
+    :return: The GeoJSON FeatureCollection.
+    """
+    if zoom is not None:
+        sql, params = build_cluster_query(query_params, zoom)
+    else:
+        sql, params = build_geojson_query(query_params)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return row[0].encode("utf-8") if row and row[0] else EMPTY_FEATURE_COLLECTION
+
+
+def build_tile_query(
+    query_params: QueryDict, *, z: int, x: int, y: int, extent: int = 4096, buffer: int = 64
+) -> tuple[str, dict[str, Any]]:
+    """
+    Build the statement that renders the filtered observations in one tile as a Mapbox vector tile.
+
+    The tile envelope is transformed back to EPSG:4326 so the `&&` test can use `location_idx`.
+
+    :param query_params: Normalized query parameters, see `normalize_filter_params`.
+    :param z: Tile zoom level.
+    :param x: Tile column.
+    :param y: Tile row.
+    :param extent: Tile extent in screen space.
+    :param buffer: Geometry buffer in screen space.
+    :return: Tuple of (SQL, named query parameters).
+    """
+    filters, params = build_observation_filters(query_params)
+    filters.insert(0, "obs.location && ST_Transform(bounds.geom, 4326)")
+    params.update({"tile_z": z, "tile_x": x, "tile_y": y, "tile_extent": extent, "tile_buffer": buffer})
+    sql = f"""
+    WITH bounds AS (
+        SELECT ST_TileEnvelope(%(tile_z)s, %(tile_x)s, %(tile_y)s) AS geom
+    ),
+    tile AS (
+        SELECT
+            ST_AsMVTGeom(
+                ST_Transform(obs.location, 3857), bounds.geom, %(tile_extent)s, %(tile_buffer)s, true
+            ) AS geom,
+            obs.id,
+            obs.municipality_id,
+            {NEST_STATUS_SQL} AS status
+        FROM {OBSERVATION_TABLE} AS obs, bounds
+        WHERE {" AND ".join(filters)}
+    )
+    SELECT ST_AsMVT(tile.*, 'observations', %(tile_extent)s, 'geom') FROM tile
+    """
+    return sql, params
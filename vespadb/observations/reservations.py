@@ -0,0 +1,116 @@
+"""Maintenance of `VespaUser.reservation_count`: the number of open reservations of a user.
+
+A reservation is open while the observation is reserved by the user and has no eradication date.
+Every write that changes this adjusts the counter with F() expressions, so reads stay a column
+lookup; `reconcile_reservation_counts` repairs any drift with a single statement.
+"""
+
+import logging
+from collections import defaultdict
+from collections.abc import Mapping
+from datetime import date
+from typing import Any
+
+from django.db import connection
+from django.db.models import F
+
+from vespadb.observations.models import Observation
+from vespadb.users.models import VespaUser
+
+logger = logging.getLogger(__name__)
+
+# Actual open reservations per user, next to the stored counter.
+_COUNTS_SQL = """
+    SELECT u.id, u.reservation_count AS stored, COALESCE(actual.open_reservations, 0) AS actual
+    FROM {users} u
+    LEFT JOIN (
+        SELECT reserved_by_id, count(*) AS open_reservations
+        FROM {observations}
+        WHERE reserved_by_id IS NOT NULL AND eradication_date IS NULL
+        GROUP BY reserved_by_id
+    ) actual ON actual.reserved_by_id = u.id
+"""
+
+RECONCILE_SQL = f"""
+    UPDATE {{users}} AS target
+    SET reservation_count = counts.actual
+    FROM ({_COUNTS_SQL}) counts
+    WHERE target.id = counts.id AND counts.stored IS DISTINCT FROM counts.actual
+"""
+
+DRIFT_SQL = f"""
+    SELECT
+        count(*) FILTER (WHERE counts.stored IS DISTINCT FROM counts.actual),
+        COALESCE(sum(abs(counts.stored - counts.actual)), 0)
+    FROM ({_COUNTS_SQL}) counts
+"""
+
+
+def _tables() -> dict[str, str]:
+    return {
+        "users": connection.ops.quote_name(VespaUser._meta.db_table),
+        "observations": connection.ops.quote_name(Observation._meta.db_table),
+    }
+
+
+def is_open_reservation(reserved_by_id: int | None, eradication_date: date | None) -> bool:
+    """Return whether an observation with these values counts towards its reserving user."""
+    return reserved_by_id is not None and eradication_date is None
+
+
+def reservation_deltas(
+    old: tuple[int | None, date | None] | None, new: tuple[int | None, date | None] | None
+) -> dict[int, int]:
+    """
+    Compute the counter changes of one observation going from `old` to `new`.
+
+    :param old: (reserved_by_id, eradication_date) before the write, None for a new observation.
+    :param new: (reserved_by_id, eradication_date) after the write, None for a deleted observation.
+    :return: Dictionary mapping user ids to their non-zero counter change.
+    """
+    deltas: dict[int, int] = defaultdict(int)
+    if old is not None and is_open_reservation(*old):
+        deltas[old[0]] -= 1
+    if new is not None and is_open_reservation(*new):
+        deltas[new[0]] += 1
+    return {user_id: delta for user_id, delta in deltas.items() if delta}
+
+
+def apply_reservation_deltas(deltas: Mapping[int, int]) -> None:
+    """
+    Apply counter changes atomically in the database, one UPDATE per distinct change.
+
+    :param deltas: Dictionary mapping user ids to the change of their reservation count.
+    """
+    users_by_delta: dict[int, list[int]] = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if delta:
+            users_by_delta[delta].append(user_id)
+    for delta, user_ids in users_by_delta.items():
+        VespaUser.objects.filter(pk__in=user_ids).update(reservation_count=F("reservation_count") + delta)
+
+
+def get_reservation_count_drift() -> dict[str, Any]:
+    """
+    Measure how far the stored counters are off, without changing them.
+
+    :return: Dictionary with the number of users whose counter is off and the summed absolute difference.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(DRIFT_SQL.format(**_tables()))
+        users, total = cursor.fetchone()
+    return {"drifted_users": users, "total_drift": total}
+
+
+def reconcile_reservation_counts() -> int:
+    """
+    Set every reservation counter to the actual number of open reservations in one statement.
+
+    :return: Number of users whose counter was corrected.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(RECONCILE_SQL.format(**_tables()))
+        corrected = cursor.rowcount
+    if corrected:
+        logger.warning(f"Corrected the reservation count of {corrected} users")
+    return corrected
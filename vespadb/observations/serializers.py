@@ -8,15 +8,20 @@ from typing import TYPE_CHECKING, Any
 
 from django.conf import settings
 from django.contrib.gis.geos import GEOSGeometry, Point
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied, ValidationError
+from django.db import models
 from pytz import timezone
 from rest_framework import serializers
 from rest_framework.request import Request
 from rest_framework_gis.fields import GeometryField
 
-from vespadb.observations.helpers import parse_and_convert_to_cet
+from vespadb.observations.cache import OBSERVATION_ROWS_CACHE_FAMILY, get_cache_generation
+from vespadb.observations.helpers import format_cet_datetime, parse_and_convert_to_cet
 from vespadb.observations.models import EradicationResultEnum, Municipality, Observation, Province, Export
+from vespadb.observations.filter_spec import get_nest_status
 from vespadb.observations.utils import get_municipality_from_coordinates
+from vespadb.permissions import ObservationPermissionContext
 from vespadb.users.models import VespaUser
 
 if TYPE_CHECKING:
@@ -88,12 +93,73 @@ admin_fields = logged_in_fields + [
     "wn_admin_notes",
 ]
 
+TIER_FIELDS = {
+    ObservationPermissionContext.PUBLIC: frozenset(public_fields),
+    ObservationPermissionContext.LOGGED_IN: frozenset(logged_in_fields),
+    ObservationPermissionContext.ADMIN: frozenset(admin_fields),
+}
+
+# Serialized rows are cached per (observation, version, tier); any save bumps modified_datetime, so a
+# changed observation is never served from an old entry. Changes to the municipality and user names the
+# rows embed bump the `OBSERVATION_ROWS_CACHE_FAMILY` generation (see signals).
+ROW_CACHE_TIMEOUT = 3600
+
 DATE_REGEX = re.compile(r"^\d{4}-\d{2}-\d{2}$")
 
 
+def get_observation_row_cache_key(instance: Observation, tier: str, generation: int) -> str:
+    """Return the cache key of one serialized observation for a visibility tier and row cache generation."""
+    version = instance.modified_datetime.timestamp() if instance.modified_datetime else "none"
+    return f"vespadb:observation_row:{generation}:{instance.pk}:{version}:{tier}"
+
+
+class CETDateTimeField(serializers.DateTimeField):
+    """DateTimeField rendered as CET wall-clock time (`YYYY-MM-DDTHH:MM:SS`), as the frontend expects."""
+
+    def to_representation(self, value: Any) -> str | None:
+        """Format the datetime directly, without the ISO string round-trip."""
+        if not value:
+            return None
+        if isinstance(value, str):
+            value = parse_and_convert_to_cet(value)
+        return format_cet_datetime(value)
+
+
+class ObservationListSerializer(serializers.ListSerializer):
+    """List serializer that fetches and stores all cached rows of a page in one round-trip each."""
+
+    def to_representation(self, data: Any) -> list[dict[str, Any]]:
+        """Serialize the observations, reusing cached rows."""
+        instances = list(data.all() if hasattr(data, "all") else data)
+        permission_context = self.child.permission_context
+        generation = get_cache_generation(OBSERVATION_ROWS_CACHE_FAMILY)
+        keys = [
+            get_observation_row_cache_key(instance, permission_context.tier_for(instance.municipality_id), generation)
+            for instance in instances
+        ]
+        cached_rows = cache.get_many(keys)
+        rows = []
+        missing = {}
+        for instance, key in zip(instances, keys, strict=True):
+            row = cached_rows.get(key)
+            if row is None:
+                row = self.child.to_representation(instance)
+                missing[key] = row
+            rows.append(row)
+        if missing:
+            cache.set_many(missing, ROW_CACHE_TIMEOUT)
+        return rows
+
+
 class ObservationSerializer(serializers.ModelSerializer):
     """Serializer for the full details of an Observation model instance."""
 
+    # All model datetimes render as CET wall-clock time.
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.DateTimeField: CETDateTimeField,
+    }
+
     municipality_name = serializers.CharField(source='municipality.name', read_only=True)
     nest_status = serializers.SerializerMethodField()
     location = GeometryField(required=False, allow_null=True)
@@ -104,6 +170,7 @@ class ObservationSerializer(serializers.ModelSerializer):
         """Meta class for the ObservationSerializer."""
 
         model = Observation
+        list_serializer_class = ObservationListSerializer
         fields = [
             'id', 'created_datetime', 'modified_datetime', 'location', 'source', 'source_id',
             'nest_height', 'nest_size', 'nest_location', 'nest_type', 'observation_datetime',
@@ -126,13 +193,7 @@ class ObservationSerializer(serializers.ModelSerializer):
 
     def get_nest_status(self, obj: Observation) -> str:  # Renamed method
         """Determine the status of the observation based on its properties."""
-        if obj.eradication_result == 'successful':
-            return "eradicated"
-        if obj.eradication_result is not None:
-            return "visited"
-        if obj.reserved_by:
-            return "reserved"
-        return "untreated"
+        return get_nest_status(obj.eradication_result, obj.reserved_by_id)
 
     def get_reserved_by_first_name(self, obj: Observation) -> str | None:
         """Retrieve the first name of the user who reserved the observation."""
@@ -146,44 +207,35 @@ class ObservationSerializer(serializers.ModelSerializer):
         """Retrieve the first name of the user who created the observation."""
         return obj.created_by.first_name if obj.created_by else None
         
+    @property
+    def permission_context(self) -> ObservationPermissionContext:
+        """Return the requesting user's permission context, resolved once and shared with the list serializer."""
+        context = self.context
+        if "permission_context" not in context:
+            request = context.get("request")
+            context["permission_context"] = ObservationPermissionContext.for_user(request.user if request else None)
+        return context["permission_context"]
+
     def to_representation(self, instance: Observation) -> dict[str, Any]:
-        """Dynamically filter fields based on user authentication status."""
+        """Return the cached representation for the user's tier, serializing it on a miss."""
+        tier = self.permission_context.tier_for(instance.municipality_id)
+        if isinstance(self.parent, ObservationListSerializer):
+            # The list serializer batches the cache lookups of a whole page.
+            return self._serialize(instance, tier)
+        key = get_observation_row_cache_key(instance, tier, get_cache_generation(OBSERVATION_ROWS_CACHE_FAMILY))
+        row = cache.get(key)
+        if row is None:
+            row = self._serialize(instance, tier)
+            cache.set(key, row, ROW_CACHE_TIMEOUT)
+        return row
+
+    def _serialize(self, instance: Observation, tier: str) -> dict[str, Any]:
+        """Dynamically filter fields based on the visibility tier."""
+        # Datetimes are already CET wall-clock strings (see `CETDateTimeField`) and dates ISO `YYYY-MM-DD`.
         data = super().to_representation(instance)
 
-        # Format datetime and date fields as required by frontend
-        datetime_fields = [
-            "created_datetime", "modified_datetime", "wn_modified_datetime",
-            "wn_created_datetime", "reserved_datetime", "observation_datetime"
-        ]
-        date_fields = ["eradication_date"]
-
-        for field in datetime_fields:
-            if data.get(field):
-                try:
-                    dt = parse_and_convert_to_cet(data[field])
-                    data[field] = dt.strftime("%Y-%m-%dT%H:%M:%S")
-                except (ValueError, TypeError):
-                    data[field] = None  # Fallback to None if parsing fails
-
-        for field in date_fields:
-            if data.get(field):
-                try:
-                    dt = datetime.strptime(data[field], "%Y-%m-%d")
-                    data[field] = dt.strftime("%Y-%m-%d")
-                except (ValueError, TypeError):
-                    data[field] = None  # Fallback to None if parsing fails
-
         # Filter fields based on user permissions
-        request = self.context.get("request")
-        if request and request.user.is_authenticated:
-            if request.user.is_superuser:
-                allowed = set(admin_fields)
-            else:
-                user_muni_ids = set(request.user.municipalities.values_list("id", flat=True))
-                allowed = set(logged_in_fields if instance.municipality and instance.municipality.id in user_muni_ids else public_fields)
-        else:
-            allowed = set(public_fields)
-
+        allowed = TIER_FIELDS[tier]
         return {k: v for k, v in data.items() if k in allowed}
 
     def update(self, instance: Observation, validated_data: dict[Any, Any]) -> Observation:
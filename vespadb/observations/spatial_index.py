@@ -0,0 +1,165 @@
+"""In-process spatial index of the municipality and ANB boundaries."""
+
+import logging
+import threading
+import time
+from collections.abc import Iterable
+
+import numpy as np
+import shapely
+from pyproj import Transformer
+
+from vespadb.observations.cache import BOUNDARIES_CACHE_FAMILY, get_cache_generation
+
+logger = logging.getLogger(__name__)
+
+# Observation locations are stored in WGS 84, the boundaries in Belgian Lambert 72.
+LOCATION_SRID = 4326
+BOUNDARY_SRID = 31370
+
+_NO_MATCH = -1
+
+# Seconds a process keeps using its index before it reads the boundaries generation again, so resolving
+# the location of a save usually costs no cache round trip.
+GENERATION_CHECK_INTERVAL = 30
+
+
+class _BoundaryLayer:
+    """Prepared polygons of one boundary table behind an STRtree."""
+
+    def __init__(self, polygons: list[bytes]) -> None:
+        self.geometries = np.asarray(shapely.from_wkb(polygons), dtype=object).reshape(-1)
+        shapely.prepare(self.geometries)
+        self.tree = shapely.STRtree(self.geometries)
+
+    def first_containing(self, points: np.ndarray) -> np.ndarray:
+        """
+        Return, per point, the position of the first polygon that contains it.
+
+        Like PostGIS `ST_Contains`, a point on a polygon boundary is not contained.
+
+        :param points: Array of shapely points in `BOUNDARY_SRID`.
+        :return: Array of polygon positions, `_NO_MATCH` where no polygon contains the point.
+        """
+        first = np.full(len(points), len(self.geometries), dtype=np.int64)
+        if len(self.geometries) and len(points):
+            # The tree only compares bounding boxes; the prepared polygons settle the candidates.
+            point_positions, polygon_positions = self.tree.query(points)
+            hits = shapely.contains(self.geometries[polygon_positions], points[point_positions])
+            np.minimum.at(first, point_positions[hits], polygon_positions[hits])
+        first[first == len(self.geometries)] = _NO_MATCH
+        return first
+
+
+class BoundaryIndex:
+    """
+    Resolve observation locations to their municipality, province and ANB membership in memory.
+
+    Mirrors `get_municipality_from_coordinates` and `check_if_point_in_anb_area`: overlapping
+    municipalities resolve to the first one by name and the province is the municipality's, so points
+    outside every municipality have neither.
+    """
+
+    def __init__(self, municipalities: list[tuple[int, int | None, bytes]], anb_areas: list[bytes]) -> None:
+        """
+        Build the index.
+
+        :param municipalities: (id, province_id, WKB polygon) per municipality, in lookup order.
+        :param anb_areas: WKB polygon per ANB area.
+        """
+        self._municipality_ids = [municipality_id for municipality_id, _, _ in municipalities]
+        self._municipality_province_ids = [province_id for _, province_id, _ in municipalities]
+        self._municipalities = _BoundaryLayer([polygon for _, _, polygon in municipalities])
+        self._anb_areas = _BoundaryLayer(anb_areas)
+        self._local = threading.local()
+
+    @classmethod
+    def load(cls) -> "BoundaryIndex":
+        """Read all boundary polygons from the database and build the index."""
+        from vespadb.observations.models import ANB, Municipality  # noqa: PLC0415
+
+        started = time.perf_counter()
+        municipalities = [
+            (municipality_id, province_id, bytes(polygon.wkb))
+            for municipality_id, province_id, polygon in Municipality.objects.order_by("name", "id").values_list(
+                "id", "province_id", "polygon"
+            )
+        ]
+        anb_areas = [bytes(polygon.wkb) for polygon in ANB.objects.values_list("polygon", flat=True)]
+        index = cls(municipalities, anb_areas)
+        logger.info(
+            f"Loaded boundary index with {len(municipalities)} municipalities and {len(anb_areas)} ANB areas "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return index
+
+    def _transformer(self) -> Transformer:
+        # pyproj transformers must not be shared between threads.
+        transformer = getattr(self._local, "transformer", None)
+        if transformer is None:
+            transformer = Transformer.from_crs(LOCATION_SRID, BOUNDARY_SRID, always_xy=True)
+            self._local.transformer = transformer
+        return transformer
+
+    def resolve(self, points: Iterable[tuple[float, float]]) -> list[tuple[int | None, int | None, bool]]:
+        """
+        Resolve a batch of locations.
+
+        :param points: (longitude, latitude) pairs in EPSG:4326.
+        :return: (municipality_id, province_id, anb) per point, in input order.
+        """
+        coordinates = np.asarray(list(points), dtype=float).reshape(-1, 2)
+        x, y = self._transformer().transform(coordinates[:, 0], coordinates[:, 1])
+        geometries = shapely.points(np.asarray(x), np.asarray(y))
+
+        municipalities = self._municipalities.first_containing(geometries)
+        anb = self._anb_areas.first_containing(geometries) != _NO_MATCH
+
+        resolved = []
+        for municipality, in_anb in zip(municipalities.tolist(), anb.tolist(), strict=True):
+            if municipality != _NO_MATCH:
+                resolved.append(
+                    (self._municipality_ids[municipality], self._municipality_province_ids[municipality], in_anb)
+                )
+            else:
+                resolved.append((None, None, in_anb))
+        return resolved
+
+
+_index: BoundaryIndex | None = None
+_index_generation: int | None = None
+_index_checked_at = float("-inf")
+_index_lock = threading.Lock()
+
+
+def get_boundary_index() -> BoundaryIndex:
+    """
+    Return this process's boundary index, loading it on first use.
+
+    The index is reloaded when `invalidate_boundary_index` bumped the boundaries generation, which
+    the commands that load municipalities, provinces and ANB areas do. The generation is read at most
+    once every `GENERATION_CHECK_INTERVAL` seconds, so other processes pick up new boundaries within
+    that interval.
+    """
+    global _index, _index_generation, _index_checked_at  # noqa: PLW0603
+    now = time.monotonic()
+    if _index is not None and now - _index_checked_at < GENERATION_CHECK_INTERVAL:
+        return _index
+    generation = get_cache_generation(BOUNDARIES_CACHE_FAMILY)
+    if _index is None or _index_generation != generation:
+        with _index_lock:
+            if _index is None or _index_generation != generation:
+                _index = BoundaryIndex.load()
+                _index_generation = generation
+    _index_checked_at = now
+    return _index
+
+
+def resolve_points(points: Iterable[tuple[float, float]]) -> list[tuple[int | None, int | None, bool]]:
+    """
+    Resolve a batch of (longitude, latitude) pairs to (municipality_id, province_id, anb) without database queries.
+
+    :param points: (longitude, latitude) pairs in EPSG:4326.
+    :return: (municipality_id, province_id, anb) per point, in input order.
+    """
+    return get_boundary_index().resolve(points)
@@ -0,0 +1,93 @@
+"""Streaming reads for bulk jobs: server-side cursors inside a consistent, read-only snapshot."""
+
+import logging
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.query import QuerySet
+
+logger = logging.getLogger(__name__)
+
+# Must be the first statement of the transaction.
+SNAPSHOT_SQL = "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY"
+
+
+@contextmanager
+def snapshot(using: str = DEFAULT_DB_ALIAS) -> Iterator[None]:
+    """
+    Run the block in a read-only REPEATABLE READ transaction.
+
+    Every query in the block sees the database as of its first query, so a count and the rows
+    streamed after it agree however long the job takes. The block cannot be nested in another
+    transaction, since the isolation level can only be set when the transaction starts.
+
+    :param using: The database alias.
+    """
+    with transaction.atomic(using=using, durable=True):
+        with connections[using].cursor() as cursor:
+            cursor.execute(SNAPSHOT_SQL)
+        yield
+
+
+def snapshot_time(using: str = DEFAULT_DB_ALIAS) -> datetime:
+    """Return the start time of the current transaction, the moment a `snapshot` reflects."""
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT now()")
+        return cursor.fetchone()[0]
+
+
+def stream_query(
+    sql: str,
+    params: Sequence[Any] | dict[str, Any] | None = None,
+    fetch_size: int | None = None,
+    using: str = DEFAULT_DB_ALIAS,
+) -> Iterator[Sequence[Any]]:
+    """
+    Yield the raw rows of a query from a named server-side cursor, `fetch_size` rows per round trip.
+
+    Named cursors only live as long as their transaction, so call this inside `snapshot` or
+    another `transaction.atomic` block.
+
+    :param sql: The query.
+    :param params: Query parameters.
+    :param fetch_size: Rows per round trip, defaults to `settings.STREAMING_FETCH_SIZE`.
+    :param using: The database alias.
+    """
+    connection = connections[using]
+    if not connection.in_atomic_block:
+        raise RuntimeError("stream_query needs a transaction; wrap the job in snapshot()")
+    fetch_size = fetch_size or settings.STREAMING_FETCH_SIZE
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while rows := cursor.fetchmany(fetch_size):
+            yield from rows
+
+
+def stream_values(queryset: QuerySet[Any], fetch_size: int | None = None) -> Iterator[tuple[Any, ...]]:
+    """
+    Yield the tuples of a `values_list` queryset through `stream_query`.
+
+    Unlike `queryset.iterator()`, the fetch size is the one tuned for bulk jobs. The field converters
+    still apply, so the tuples hold the same values as the queryset would return.
+
+    :param queryset: A `values_list` queryset.
+    :param fetch_size: Rows per round trip, defaults to `settings.STREAMING_FETCH_SIZE`.
+    """
+    compiler = queryset.query.get_compiler(using=queryset.db)
+    try:
+        sql, params = compiler.as_sql()
+    except EmptyResultSet:
+        return
+    # as_sql() set up the select list; these are the columns the converters apply to.
+    columns = [expression for expression, _, _ in compiler.select[: compiler.col_count]]
+    converters = compiler.get_converters(columns)
+    rows = stream_query(sql, params, fetch_size, using=queryset.db)
+    if converters:
+        rows = compiler.apply_converters(rows, converters)
+    for row in rows:
+        yield tuple(row)
@@ -1,37 +1,151 @@
 # vespadb/observations/tasks/cache_rebuild.py
 
+import logging
+import time
+from typing import Any
+
 from celery import shared_task
+from django.conf import settings
 from django.core.cache import cache
-import logging
+
+from vespadb.observations.cache import get_metrics, increment_metric
 
 # Import the tasks and configs
-from .generate_geojson_task import generate_geojson_task
+from .generate_geojson_task import generate_all_geojson_task
 from vespadb.observations.cache_configs import PREWARM_CONFIGS
 
 logger = logging.getLogger(__name__)
 
-# Define a lock key and timeout (in seconds)
+# Held while a rebuild runs; as long as the task's hard time limit, so it cannot expire under a slow rebuild.
 REBUILD_LOCK_KEY = "vespadb::rebuild_geojson_lock"
-LOCK_EXPIRE = 60 * 5  # Lock expires in 5 minutes to prevent it from getting stuck
+REBUILD_SOFT_TIME_LIMIT = 60 * 28
+REBUILD_TIME_LIMIT = 60 * 30
+LOCK_EXPIRE = REBUILD_TIME_LIMIT
+
+# Set while a rebuild is scheduled but has not started yet; holds the time of the first write it covers.
+REBUILD_PENDING_KEY = "vespadb::rebuild_geojson_pending"
+# Time of the most recent write that asked for a rebuild.
+REBUILD_LAST_WRITE_KEY = "vespadb::rebuild_geojson_last_write"
+
+# Details of the last run; the counters are `increment_metric` counters named `geojson_rebuild:<counter>`.
+REBUILD_METRICS_KEY = "vespadb::rebuild_geojson_metrics::{name}"
+REBUILD_COUNTERS = ("requested", "scheduled", "coalesced", "deferred", "skipped", "completed", "failed")
+
+
+def _record(name: str) -> None:
+    """Increment one of the `REBUILD_COUNTERS`."""
+    increment_metric(f"geojson_rebuild:{name}")
+
+
+def get_rebuild_metrics() -> dict[str, Any]:
+    """
+    Return the counters and state of the debounced GeoJSON rebuild scheduler.
+
+    - requested: writes that asked for a rebuild
+    - scheduled: rebuild tasks actually queued
+    - coalesced: requests folded into an already scheduled rebuild
+    - deferred: rebuild runs pushed back because writes kept coming in
+    - skipped: rebuild runs postponed because another rebuild was still in flight
+    - completed / failed: finished rebuild runs
+
+    :return: Dictionary with the counters, the last run details and whether a rebuild is pending or running.
+    """
+    counters = get_metrics([f"geojson_rebuild:{name}" for name in REBUILD_COUNTERS])
+    metrics: dict[str, Any] = {name.split(":", 1)[1]: value for name, value in counters.items()}
+    names = ["last_started", "last_completed", "last_duration"]
+    values = cache.get_many([REBUILD_METRICS_KEY.format(name=name) for name in names])
+    metrics.update({name: values.get(REBUILD_METRICS_KEY.format(name=name)) for name in names})
+    metrics["pending"] = cache.get(REBUILD_PENDING_KEY) is not None
+    metrics["in_flight"] = cache.get(REBUILD_LOCK_KEY) is not None
+    return metrics
 
-@shared_task(name="vespadb.observations.tasks.rebuild_all_prewarmed_caches")
+
+def schedule_prewarm_rebuild() -> None:
+    """
+    Ask for the pre-warmed GeoJSON caches to be regenerated, debounced and coalesced across writes.
+
+    The first write after a quiet period queues one rebuild `GEOJSON_REBUILD_DEBOUNCE_SECONDS` out;
+    every later write only moves the trailing edge forward. The rebuild runs once writes have been
+    quiet for the debounce window, or at the latest `GEOJSON_REBUILD_MAX_DELAY_SECONDS` after the
+    first write it covers, so a steady stream of updates cannot starve it.
+    """
+    now = time.time()
+    _record("requested")
+    cache.set(REBUILD_LAST_WRITE_KEY, now, timeout=None)
+    if cache.add(REBUILD_PENDING_KEY, now, timeout=settings.GEOJSON_REBUILD_MAX_DELAY_SECONDS + LOCK_EXPIRE):
+        _record("scheduled")
+        rebuild_all_prewarmed_caches.apply_async(countdown=settings.GEOJSON_REBUILD_DEBOUNCE_SECONDS)
+    else:
+        _record("coalesced")
+
+
+def _reschedule(countdown: float) -> None:
+    rebuild_all_prewarmed_caches.apply_async(countdown=max(1, round(countdown)))
+
+
+@shared_task(
+    name="vespadb.observations.tasks.rebuild_all_prewarmed_caches",
+    soft_time_limit=REBUILD_SOFT_TIME_LIMIT,
+    time_limit=REBUILD_TIME_LIMIT,
+)
 def rebuild_all_prewarmed_caches():
     """
-    Safely triggers regeneration of all pre-warmed GeoJSON caches.
-    Uses a cache lock to prevent multiple concurrent runs (thundering herd).
+    Safely regenerate all pre-warmed GeoJSON caches.
+
+    Runs as the trailing edge of `schedule_prewarm_rebuild`. Uses a cache lock to prevent multiple
+    concurrent runs (thundering herd); the lock is held until every configuration has actually been
+    regenerated, not merely queued. Writes that arrive while a rebuild is in flight schedule a new
+    trailing run.
     """
+    now = time.time()
+    first_write = cache.get(REBUILD_PENDING_KEY)
+    last_write = cache.get(REBUILD_LAST_WRITE_KEY)
+    if first_write is not None and last_write is not None:
+        quiet_for = now - last_write
+        waited_for = now - first_write
+        if (
+            quiet_for < settings.GEOJSON_REBUILD_DEBOUNCE_SECONDS
+            and waited_for < settings.GEOJSON_REBUILD_MAX_DELAY_SECONDS
+        ):
+            # Writes are still coming in: slide the trailing edge instead of rebuilding now.
+            _record("deferred")
+            _reschedule(
+                min(
+                    settings.GEOJSON_REBUILD_DEBOUNCE_SECONDS - quiet_for,
+                    settings.GEOJSON_REBUILD_MAX_DELAY_SECONDS - waited_for,
+                )
+            )
+            return
+
     # The `nx=True` argument makes this an atomic "add if not exists" operation.
     # This is the core of the locking mechanism.
-    if cache.add(REBUILD_LOCK_KEY, "locked", timeout=LOCK_EXPIRE):
-        logger.info("Acquired lock, starting GeoJSON pre-warmed cache regeneration.")
-        try:
-            # Loop through all defined configurations and schedule a generation task for each
-            for config in PREWARM_CONFIGS:
-                generate_geojson_task.delay(config['params'])
-            logger.info(f"Successfully scheduled {len(PREWARM_CONFIGS)} GeoJSON regeneration tasks.")
-        finally:
-            # Always release the lock when done
-            cache.delete(REBUILD_LOCK_KEY)
-            logger.info("Released GeoJSON regeneration lock.")
-    else:
-        logger.info("GeoJSON regeneration is already in progress. Skipping duplicate request.")
+    if not cache.add(REBUILD_LOCK_KEY, "locked", timeout=LOCK_EXPIRE):
+        logger.info("GeoJSON regeneration is already in progress. Retrying after it finishes.")
+        _record("skipped")
+        _reschedule(settings.GEOJSON_REBUILD_DEBOUNCE_SECONDS)
+        return
+
+    # Writes from here on are not covered by this run, so they must be able to queue a new one.
+    cache.delete(REBUILD_PENDING_KEY)
+    logger.info("Acquired lock, starting GeoJSON pre-warmed cache regeneration.")
+    cache.set(REBUILD_METRICS_KEY.format(name="last_started"), now, timeout=None)
+    try:
+        generate_all_geojson_task()
+        duration = time.time() - now
+        _record("completed")
+        cache.set_many(
+            {
+                REBUILD_METRICS_KEY.format(name="last_completed"): time.time(),
+                REBUILD_METRICS_KEY.format(name="last_duration"): duration,
+            },
+            timeout=None,
+        )
+        logger.info(f"Regenerated {len(PREWARM_CONFIGS)} pre-warmed GeoJSON caches in {duration:.1f}s.")
+    except Exception:
+        _record("failed")
+        logger.exception("GeoJSON pre-warmed cache regeneration failed.")
+        raise
+    finally:
+        # Always release the lock when done
+        cache.delete(REBUILD_LOCK_KEY)
+        logger.info("Released GeoJSON regeneration lock.")
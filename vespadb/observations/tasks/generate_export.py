@@ -1,19 +1,24 @@
 from typing import Iterator, List, Set, Any, Union, Protocol, Optional, Dict
 from django.core.files.storage import default_storage
 from django.db.models.query import QuerySet
-from django.db.models import Model
+from django.db.models import F, FloatField, Func, Model
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta
 import csv
-import io
 import logging
 from celery import shared_task
+from vespadb.observations.export_storage import open_text_export
+from vespadb.observations.filter_spec import FilterSpec, get_nest_status
+from vespadb.observations.helpers import format_cet_datetime
 from vespadb.observations.models import Observation, Export
+from vespadb.observations.streaming import snapshot, snapshot_time, stream_values
 from vespadb.users.models import VespaUser as User
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 S3_EXPORT_PATH = f"{settings.APP_ENV}/VESPADB/EXPORT"
+# The hourly exports hold the observations the public map shows.
+EXPORT_FILTER = FilterSpec()
 class WriterProtocol(Protocol):
     def writerow(self, row: List[str]) -> Any: ...
 
@@ -49,13 +54,7 @@ PUBLIC_FIELDS = [
 
 def get_status(observation: Observation) -> str:
     """Get observation status string."""
-    if observation.eradication_result == 'successful':
-        return "eradicated"
-    if observation.eradication_result is not None:
-        return "visited"
-    if observation.reserved_by:
-        return "reserved"
-    return "untreated"
+    return get_nest_status(observation.eradication_result, observation.reserved_by_id)
 
 def prepare_row_data(
     observation: Observation,
@@ -72,15 +71,8 @@ def prepare_row_data(
                 elif field == "longitude":
                     row_data.append(str(observation.location.x) if observation.location else "")
                 elif field in ["created_datetime", "modified_datetime", "observation_datetime"]:
-                    datetime_val = getattr(observation, field, None)
-                    if datetime_val:
-                        from vespadb.observations.helpers import parse_and_convert_to_cet
-                        datetime_val = parse_and_convert_to_cet(datetime_val)
-                        datetime_val = datetime_val.replace(microsecond=0)
-                        # Format as CET without timezone indicator
-                        row_data.append(datetime_val.strftime("%Y-%m-%dT%H:%M:%S"))
-                    else:
-                        row_data.append("")
+                    # Format as CET without timezone indicator
+                    row_data.append(format_cet_datetime(getattr(observation, field, None)) or "")
                 elif field == "province":
                     row_data.append(observation.province.name if observation.province else "")
                 elif field == "municipality":
@@ -94,29 +86,7 @@ def prepare_row_data(
                     value = getattr(observation, "eradication_result", "")
                     row_data.append(str(value) if value is not None else "")
                 elif field == "images":
-                    value = getattr(observation, "images", [])
-                    if isinstance(value, list):
-                        if not value:
-                            row_data.append("")
-                        elif len(value) == 1:
-                            row_data.append(value[0])
-                        else:
-                            joined = ",".join(value)
-                            row_data.append(joined)
-                    else:
-                        s = str(value)
-                        if s.startswith("[") and s.endswith("]"):
-                            s = s[1:-1].strip()
-                            parts = [part.strip().strip("'").strip('"') for part in s.split(",") if part.strip()]
-                            if not parts:
-                                row_data.append("")
-                            elif len(parts) == 1:
-                                row_data.append(parts[0])
-                            else:
-                                joined = ",".join(parts)
-                                row_data.append(joined)
-                        else:
-                            row_data.append(s)
+                    row_data.append(format_images(getattr(observation, "images", None)))
                 elif field == "notes":
                     value = getattr(observation, "notes", "")
                     row_data.append(str(value) if value is not None else "")
@@ -162,23 +132,119 @@ def generate_rows(
             logger.error(f"Error processing observation {observation.id}: {e}")
             continue
 
-def generate_csv_to_s3(queryset: Any, file_path: str, is_admin: bool = True, user_municipality_ids: Set[int] = set()) -> None:
+def format_images(value: Any) -> str:
+    """Render the images of an observation as a comma-separated list, None as an empty cell."""
+    if isinstance(value, list):
+        return ",".join(value)
+    if value is None:
+        return ""
+    s = str(value)
+    if s.startswith("[") and s.endswith("]"):
+        parts = [part.strip().strip("'").strip('"') for part in s[1:-1].strip().split(",") if part.strip()]
+        return ",".join(parts)
+    return s
+
+def format_value(value: Any) -> str:
+    """Render any other value as its string, None as an empty cell."""
+    return "" if value is None else str(value)
+
+def _format_datetime(value: Any) -> str:
+    return format_cet_datetime(value) or ""
+
+def _format_date(value: Any) -> str:
+    return value.strftime("%Y-%m-%d") if value else ""
+
+def _coordinate(function: str) -> Func:
+    return Func(F("location"), function=function, output_field=FloatField())
+
+# Per export column: the values_list expressions it reads and the formatter applied to them.
+# Columns not listed read the field of the same name through `format_value`.
+EXPORT_COLUMN_SOURCES: Dict[str, tuple[tuple[str, ...], Any]] = {
+    "observation_datetime": (("observation_datetime",), _format_datetime),
+    "created_datetime": (("created_datetime",), _format_datetime),
+    "modified_datetime": (("modified_datetime",), _format_datetime),
+    "latitude": (("export_latitude",), format_value),
+    "longitude": (("export_longitude",), format_value),
+    "province": (("province__name",), format_value),
+    "municipality": (("municipality__name",), format_value),
+    "nest_status": (("eradication_result", "reserved_by_id"), get_nest_status),
+    "eradication_date": (("eradication_date",), _format_date),
+    "images": (("images",), format_images),
+}
+
+def compile_export_columns(fields: List[str]) -> tuple[List[str], List[Any]]:
+    """
+    Resolve export columns once into a projection and one formatter per column.
+
+    :param fields: The export columns, in order.
+    :return: Tuple of (values_list expressions, per column a function of the fetched tuple returning the cell).
+    """
+    expressions: List[str] = []
+    positions: Dict[str, int] = {}
+    formatters: List[Any] = []
+    for field in fields:
+        sources, formatter = EXPORT_COLUMN_SOURCES.get(field, ((field,), format_value))
+        indexes = []
+        for source in sources:
+            if source not in positions:
+                positions[source] = len(expressions)
+                expressions.append(source)
+            indexes.append(positions[source])
+        if len(indexes) == 1:
+            formatters.append(lambda row, index=indexes[0], formatter=formatter: formatter(row[index]))
+        else:
+            formatters.append(
+                lambda row, indexes=tuple(indexes), formatter=formatter: formatter(*[row[i] for i in indexes])
+            )
+    return expressions, formatters
+
+def export_values(queryset: QuerySet[Model], expressions: List[str]) -> QuerySet[Any]:
+    """Project `queryset` on the export expressions, with the coordinates read in the database."""
+    return (
+        queryset.select_related(None)
+        .annotate(export_latitude=_coordinate("ST_Y"), export_longitude=_coordinate("ST_X"))
+        .values_list(*expressions)
+    )
+
+def generate_export_rows(
+    queryset: QuerySet[Model], fields: List[str] = PUBLIC_FIELDS, fetch_size: Optional[int] = None
+) -> Iterator[List[str]]:
+    """
+    Generate the header and the CSV rows of `queryset`, reading only the exported columns.
+
+    Produces the same cells as `generate_rows`, without loading model instances: the columns come
+    from `values_list` and every cell goes through a formatter compiled once per export. Rows
+    stream from a server-side cursor (`stream_values`), so call it inside a transaction, normally
+    `snapshot()`.
+
+    :param queryset: The observations to export, in export order.
+    :param fields: The export columns.
+    :param fetch_size: Rows fetched per round trip, defaults to `settings.STREAMING_FETCH_SIZE`.
+    """
+    expressions, formatters = compile_export_columns(fields)
+    yield list(fields)
+    for values in stream_values(export_values(queryset, expressions), fetch_size):
+        yield [formatter(values) for formatter in formatters]
+
+def generate_csv_to_s3(
+    queryset: Any,
+    file_path: str,
+    compress: bool = False,
+) -> None:
+    """
+    Stream the CSV export of `queryset` to storage at `file_path` in bounded memory.
+
+    Rows are written straight into an S3 multipart upload, gzipped on the fly when `compress` is set.
+    """
     logger.info(f"Generating CSV and saving to S3 at: {file_path}")
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    
     try:
-        for row in generate_rows(queryset, writer, is_admin, user_municipality_ids):
-            writer.writerow(row)
-
-        buffer.seek(0)
-        default_storage.save(file_path, io.StringIO(buffer.getvalue()))
+        with open_text_export(file_path, compress=compress) as stream:
+            writer = csv.writer(stream)
+            writer.writerows(generate_export_rows(queryset))
         logger.info(f"Successfully saved CSV to S3: {file_path}")
     except Exception as e:
         logger.error(f"Failed to save CSV to S3 at {file_path}: {str(e)}")
         raise
-    finally:
-        buffer.close() 
 
 @shared_task
 def cleanup_old_exports() -> None:
@@ -200,6 +266,60 @@ def cleanup_old_exports() -> None:
         export.delete()
         logger.info(f"Cleaned up export {export.id}")
         
+def is_hourly_export_file(name: str) -> bool:
+    """Return whether `name` is an hourly export, plain or gzipped."""
+    return name.startswith("observations_") and name.endswith((".csv", ".csv.gz"))
+
+def new_hourly_export_path(compress: bool) -> str:
+    """Return the path of a new hourly export, named after the current time so the newest sorts last."""
+    timestamp = timezone.now().strftime("%Y%m%d_%H%M%S")
+    return f"{S3_EXPORT_PATH}/observations_{timestamp}{'.csv.gz' if compress else '.csv'}"
+
+def list_hourly_exports() -> List[str]:
+    """Return the file names of the existing hourly exports."""
+    try:
+        dirs, files = default_storage.listdir(f"{S3_EXPORT_PATH}/")
+        return [f for f in files if is_hourly_export_file(f)]
+    except FileNotFoundError:
+        logger.info("Export directory doesn't exist yet, will be created")
+    except Exception as e:
+        logger.warning(f"Could not list existing files: {str(e)}")
+    return []
+
+def prune_hourly_exports(previous_files: List[str]) -> None:
+    """Delete the exports listed before a new one was written, except the 2 most recent as backup."""
+    if len(previous_files) > 2:
+        files_to_delete = sorted(previous_files)[:-2]  # Keep the 2 most recent
+        for old_file in files_to_delete:
+            old_file_path = f"{S3_EXPORT_PATH}/{old_file}"
+            try:
+                default_storage.delete(old_file_path)
+                logger.info(f"Deleted old export file: {old_file_path}")
+            except Exception as e:
+                logger.warning(f"Failed to delete old export file {old_file_path}: {str(e)}")
+
+def write_full_export() -> tuple[str, int, datetime]:
+    """
+    Export all visible observations to a new file and prune the old exports.
+
+    :return: Tuple of (file path, number of observations, time of the database snapshot the file reflects).
+    """
+    queryset = Observation.objects.filter(EXPORT_FILTER.to_q()).order_by("id")
+    compress = settings.EXPORT_GZIP
+    new_file_path = new_hourly_export_path(compress)
+    previous_files = list_hourly_exports()
+
+    # Count and stream the rows from one read-only snapshot, so the file matches the count
+    # however many observations change while it is written
+    with snapshot():
+        taken_at = snapshot_time()
+        initial_count = queryset.count()
+        logger.info(f"Total observations to export: {initial_count}")
+        generate_csv_to_s3(queryset, new_file_path, compress=compress)
+
+    prune_hourly_exports(previous_files)
+    return new_file_path, initial_count, taken_at
+
 @shared_task(
     name='vespadb.observations.tasks.generate_export.generate_hourly_export',
     max_retries=3,
@@ -209,64 +329,41 @@ def cleanup_old_exports() -> None:
     acks_late=True
 )
 def generate_hourly_export() -> Dict[str, Any]:
-    """Generate a CSV export of all observations hourly and save to S3, deleting old files."""
+    """
+    Generate a CSV export of all observations and save to S3, deleting old files.
+
+    With `EXPORT_INCREMENTAL` only the observations changed since the previous run are exported,
+    as a delta that is compacted into a full file (see `incremental_export`).
+    """
     logger.info("Starting hourly export of all observations")
     
     try:
-        # Get all observations with optimized query
-        queryset = (Observation.objects
-                   .filter(visible=True)
-                   .select_related("province", "municipality", "reserved_by")
-                   .order_by("id"))
-        
-        initial_count = queryset.count()
-        logger.info(f"Total observations to export: {initial_count}")
+        if settings.EXPORT_INCREMENTAL:
+            from vespadb.observations.tasks.incremental_export import update_incremental_export  # noqa: PLC0415
 
-        # Generate file path with timestamp
-        timestamp = timezone.now().strftime("%Y%m%d_%H%M%S")
-        new_file_path = f"{S3_EXPORT_PATH}/observations_{timestamp}.csv"
-
-        # List existing files in S3 export directory
-        try:
-            dirs, files = default_storage.listdir(f"{S3_EXPORT_PATH}/")
-            previous_files = [f for f in files if f.startswith("observations_") and f.endswith(".csv")]
-        except FileNotFoundError:
-            logger.info("Export directory doesn't exist yet, will be created")
-            previous_files = []
-        except Exception as e:
-            logger.warning(f"Could not list existing files: {str(e)}")
-            previous_files = []
-        
-        # Generate and save new CSV to S3 using batch processing for memory efficiency
-        generate_csv_to_s3(queryset, new_file_path, is_admin=True)
-
-        # Clean up old files - keep only the 2 most recent files as backup
-        if len(previous_files) > 2:
-            files_to_delete = sorted(previous_files)[:-2]  # Keep the 2 most recent
-            for old_file in files_to_delete:
-                old_file_path = f"{S3_EXPORT_PATH}/{old_file}"
-                try:
-                    default_storage.delete(old_file_path)
-                    logger.info(f"Deleted old export file: {old_file_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to delete old export file {old_file_path}: {str(e)}")
+            result = update_incremental_export()
+        else:
+            new_file_path, initial_count, _ = write_full_export()
+            result = {
+                "status": "completed",
+                "file_path": new_file_path,
+                "total_processed": initial_count
+            }
+        if result["status"] != "completed":
+            return result
 
         # Update any pending Export records that might be waiting for this file
         pending_exports = Export.objects.filter(status='pending', file_path__isnull=True)
         for export in pending_exports:
-            export.file_path = new_file_path
+            export.file_path = result["file_path"]
             export.status = 'completed'
             export.completed_at = timezone.now()
             export.progress = 100
             export.save()
             logger.info(f"Updated pending export record {export.id}")
 
-        logger.info(f"Hourly export completed successfully: {new_file_path}")
-        return {
-            "status": "completed",
-            "file_path": new_file_path,
-            "total_processed": initial_count
-        }
+        logger.info(f"Hourly export completed successfully: {result['file_path']}")
+        return result
 
     except Exception as e:
         logger.exception(f"Hourly export failed: {str(e)}")
@@ -280,11 +377,18 @@ def generate_hourly_export() -> Dict[str, Any]:
         return {"status": "failed", "error": str(e)}
 
 def get_latest_hourly_export() -> str:
-    """Get the file path of the latest hourly export."""
+    """Get the file path of the latest hourly export, the current snapshot of the incremental export if enabled."""
     try:
+        if settings.EXPORT_INCREMENTAL:
+            from vespadb.observations.tasks.incremental_export import read_manifest  # noqa: PLC0415
+
+            manifest = read_manifest()
+            if manifest is not None and default_storage.exists(manifest["snapshot"]):
+                return manifest["snapshot"]
+
         # List existing files in S3 export directory
         export_files = default_storage.listdir(f"{S3_EXPORT_PATH}/")[1]  # Get files only
-        hourly_files = [f for f in export_files if f.startswith("observations_") and f.endswith(".csv")]
+        hourly_files = [f for f in export_files if is_hourly_export_file(f)]
         
         if not hourly_files:
             logger.warning("No hourly export files found")
@@ -1,101 +1,68 @@
 from celery import shared_task
-from django.core.cache import cache
-from vespadb.observations.models import Observation
-from django.contrib.gis.db.models.functions import Transform
-import json
 import logging
+from django.http import QueryDict
+from vespadb.observations.cache import release_refresh, set_geojson_payload, set_geojson_payloads
+from vespadb.observations.cache_configs import PREWARM_CONFIGS
+from vespadb.observations.queries import normalize_filter_params, render_geojson, render_geojson_variants
 from vespadb.observations.utils import get_geojson_cache_key
-from vespadb.observations.helpers import parse_and_convert_to_cet
-from django.db.models import Q
 
 logger = logging.getLogger(__name__)
 
 @shared_task(name='vespadb.observations.tasks.generate_geojson_task')
 def generate_geojson_task(raw_params):
-    cache_key = get_geojson_cache_key(raw_params)
-    logger.info(f"Celery Task: Generating GeoJSON for key: {cache_key} with params: {raw_params}")
-    params = raw_params.copy()
-    queryset = Observation.objects.all()
-
-    if 'min_observation_datetime' in params:
-        dt_str = params.pop('min_observation_datetime')
-        if dt_str:
-            queryset = queryset.filter(observation_datetime__gte=parse_and_convert_to_cet(dt_str))
-            
-    if 'max_observation_datetime' in params:
-        dt_str = params.pop('max_observation_datetime')
-        if dt_str:
-            queryset = queryset.filter(observation_datetime__lte=parse_and_convert_to_cet(dt_str))
+    """
+    Pre-warm the dynamic-geojson cache entry for one filter configuration.
 
-    if 'visible' in params:
-        value = str(params.pop('visible')).lower()
-        if value == 'true':
-            queryset = queryset.filter(visible=True)
-        elif value == 'false':
-            queryset = queryset.filter(visible=False)
+    The payload comes from the same statement as `ObservationsViewSet.geojson`, so a prewarmed
+    entry is byte-identical to the one a live request would store under the same key.
 
-    if 'nest_type' in params:
-        nest_types = params.pop('nest_type')
-        if nest_types:
-            queryset = queryset.filter(nest_type__in=nest_types)
+    :param raw_params: Filter dictionary of a `PREWARM_CONFIGS` entry.
+    :return: The cache key that was written.
+    """
+    query_params = normalize_filter_params(raw_params)
+    cache_key = get_geojson_cache_key(query_params)
+    logger.info(f"Celery Task: Generating GeoJSON for key: {cache_key} with params: {raw_params}")
+    set_geojson_payload(cache_key, render_geojson(query_params))
+    logger.info(f"Celery Task: GeoJSON generated and cached for key: {cache_key}")
+    return cache_key
 
-    if 'anb_areas_actief' in params:
-        value = params.pop('anb_areas_actief')
-        if value is not None:
-             queryset = queryset.filter(anb=value)
 
-    if 'nest_status' in params:
-        statuses = params.pop('nest_status')
-        if statuses:
-            status_q_objects = Q()
-            if 'open' in statuses:
-                status_q_objects |= Q(reserved_by__isnull=True, eradication_result__isnull=True)
-            if 'reserved' in statuses:
-                status_q_objects |= Q(reserved_by__isnull=False, eradication_result__isnull=True)
-            if 'eradicated' in statuses:
-                status_q_objects |= Q(eradication_result='successful')
-            if 'visited' in statuses:
-                status_q_objects |= (Q(eradication_result__isnull=False) & ~Q(eradication_result='successful'))
-            
-            if status_q_objects:
-                queryset = queryset.filter(status_q_objects)
+@shared_task(name='vespadb.observations.tasks.generate_all_geojson_task')
+def generate_all_geojson_task() -> list[str]:
+    """
+    Pre-warm the dynamic-geojson cache entries of all `PREWARM_CONFIGS` from a single table scan.
 
-    if 'provinces' in params:
-        province_ids = params.pop('provinces')
-        if province_ids:
-            queryset = queryset.filter(province_id__in=province_ids)
+    All configurations are rendered by one statement (see `build_geojson_variants_query`) and
+    the payloads are written to the cache in one batch.
 
-    if 'municipalities' in params:
-        municipality_ids = params.pop('municipalities')
-        if municipality_ids:
-            queryset = queryset.filter(municipality_id__in=municipality_ids)
+    :return: The cache keys that were written.
+    """
+    variants = [normalize_filter_params(config['params']) for config in PREWARM_CONFIGS]
+    cache_keys = [get_geojson_cache_key(variant) for variant in variants]
+    payloads = render_geojson_variants(variants)
+    set_geojson_payloads(dict(zip(cache_keys, payloads, strict=True)))
+    logger.info(f"Celery Task: Generated and cached {len(cache_keys)} prewarmed GeoJSON payloads in one pass")
+    return cache_keys
 
-    if params:
-         logger.warning(f"Celery Task: Unhandled filter params: {params}")
 
-    queryset = queryset.annotate(point=Transform("location", 4326))
-    
-    features = []
-    for obs in queryset.iterator(chunk_size=1000):
-        current_status = "open"
-        if obs.eradication_result == 'successful':
-            current_status = "eradicated"
-        elif obs.eradication_result is not None:
-            current_status = "visited"
-        elif obs.reserved_by is not None:
-            current_status = "reserved"
+@shared_task(name='vespadb.observations.tasks.refresh_geojson_cache')
+def refresh_geojson_cache(cache_key: str, query_params: dict[str, list[str]], zoom: int | None = None) -> None:
+    """
+    Regenerate one stale dynamic-geojson cache entry in the background.
 
-        features.append({
-            "type": "Feature",
-            "properties": {
-                "id": obs.id,
-                "municipality_id": obs.municipality_id,
-                "status": current_status
-            },
-            "geometry": json.loads(obs.point.geojson) if obs.point else None,
-        })
+    Queued by the request that claimed the refresh lock of the entry, which is released once the
+    new payload is stored or the refresh fails.
 
-    result = {"type": "FeatureCollection", "features": features}
-    cache.set(cache_key, result, 900) # Cache for 15 minutes
-    logger.info(f"Celery Task: GeoJSON generated and cached for key: {cache_key}")
-    return result
+    :param cache_key: Cache key of the stale entry.
+    :param query_params: The normalized query parameters of the entry, as lists per parameter.
+    :param zoom: Cluster zoom level, or None for individual points.
+    """
+    params = QueryDict(mutable=True)
+    for key, values in query_params.items():
+        params.setlist(key, values)
+    try:
+        set_geojson_payload(cache_key, render_geojson(params, zoom))
+        logger.info(f"Celery Task: Refreshed stale GeoJSON cache for key: {cache_key}")
+    except Exception:
+        release_refresh(cache_key)
+        raise
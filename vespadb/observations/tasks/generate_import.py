@@ -8,6 +8,7 @@ from django.core.files.storage import default_storage
 from django.db import transaction
 from django.db.models import Q
 from django.utils.timezone import now
+from vespadb.observations.cache import invalidate_observation_caches
 from vespadb.observations.models import Import, Observation
 from vespadb.users.utils import get_import_user
 from vespadb.users.models import UserType
@@ -96,7 +97,8 @@ def process_import(import_id: int) -> Dict[str, Any]:
                             setattr(obs, field, value)
                         obs.modified_by = import_user
                         obs.modified_datetime = now()
-                        obs.save()
+                        # process_data already resolved municipality, province and ANB status
+                        obs.save(enrich_location=False)
                         updated_ids.append(obs.id)
                         logger.info(f"Updated observation {obs.id} (wn_id={wn_id})")
                     except Observation.DoesNotExist:
@@ -137,7 +139,8 @@ def process_import(import_id: int) -> Dict[str, Any]:
                     data["created_by"] = import_user
                     data["modified_by"] = import_user
                     try:
-                        obs = Observation.objects.create(**data)
+                        obs = Observation(**data)
+                        obs.save(force_insert=True, enrich_location=False)
                         created_ids.append(obs.id)
                         logger.info(f"Created observation {obs.id} (wn_id={wn_id})")
                     except Exception as e:
@@ -149,6 +152,10 @@ def process_import(import_id: int) -> Dict[str, Any]:
                 import_record.progress = int((len(created_ids) + len(updated_ids)) / len(processed_data) * 100)
                 import_record.save()
 
+        # The records saved before an error are committed as well.
+        if created_ids or updated_ids:
+            invalidate_observation_caches()
+
         # Handle errors
         if errors:
             logger.error(f"Import {import_id} failed due to validation errors: {errors}")
@@ -0,0 +1,272 @@
+"""
+Incremental hourly export: delta files of the observations changed since the last run, compacted into full exports.
+
+State lives in a JSON manifest next to the delta files:
+
+- snapshot: path of the full export the deltas apply to, an ordinary hourly export file
+- rebuilt_at: when that chain of snapshots started from a full export of the database
+- watermark: database time up to which changes are covered
+- fields: the export columns the files were written with
+- deltas: per delta file its path, the covered time range and the number of upserted and deleted rows
+
+A delta file is a CSV with a `change` column in front of the `PUBLIC_FIELDS`: `upsert` rows carry
+the full row of a visible observation, `delete` rows only the id of an observation that was deleted
+or hidden. Compaction merges the deltas into the snapshot by id, streaming both, and writes a new
+hourly export file, which is what `export` and `download_export` serve.
+"""
+
+import csv
+import json
+import logging
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from typing import Any
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from vespadb.observations.export_storage import open_binary_export, open_text_export, read_text_export
+from vespadb.observations.models import Observation, ObservationTombstone
+from vespadb.observations.streaming import snapshot, snapshot_time
+from vespadb.observations.tasks.generate_export import (
+    EXPORT_FILTER,
+    PUBLIC_FIELDS,
+    S3_EXPORT_PATH,
+    generate_export_rows,
+    list_hourly_exports,
+    new_hourly_export_path,
+    prune_hourly_exports,
+    write_full_export,
+)
+
+logger = logging.getLogger(__name__)
+
+INCREMENTAL_EXPORT_PATH = f"{S3_EXPORT_PATH}/incremental"
+MANIFEST_PATH = f"{INCREMENTAL_EXPORT_PATH}/manifest.json"
+
+CHANGE_COLUMN = "change"
+UPSERT = "upsert"
+DELETE = "delete"
+
+# Held while the manifest is being updated; as long as the task's hard time limit.
+LOCK_KEY = "vespadb::incremental_export_lock"
+LOCK_EXPIRE = 60 * 60 * 3
+
+
+def read_manifest() -> dict[str, Any] | None:
+    """Return the manifest of the incremental export, None if there is none yet."""
+    if not default_storage.exists(MANIFEST_PATH):
+        return None
+    with default_storage.open(MANIFEST_PATH, "rb") as manifest_file:
+        return json.load(manifest_file)
+
+
+def write_manifest(manifest: dict[str, Any]) -> None:
+    """Replace the manifest of the incremental export."""
+    with open_binary_export(MANIFEST_PATH, "application/json", overwrite=True) as manifest_file:
+        manifest_file.write(json.dumps(manifest, indent=2).encode("utf-8"))
+
+
+def _needs_full_export(manifest: dict[str, Any] | None) -> str | None:
+    """Return why the deltas cannot continue from `manifest`, None when they can."""
+    if manifest is None:
+        return "no manifest"
+    if manifest["fields"] != PUBLIC_FIELDS:
+        return "the export columns changed"
+    now = timezone.now()
+    if datetime.fromisoformat(manifest["rebuilt_at"]) < now - timedelta(days=settings.EXPORT_FULL_REBUILD_DAYS):
+        # Changes that do not touch modified_datetime, such as a renamed municipality, only show up here.
+        return f"the last full export is older than {settings.EXPORT_FULL_REBUILD_DAYS} days"
+    if datetime.fromisoformat(manifest["watermark"]) < now - timedelta(days=settings.GEOJSON_CHANGES_RETENTION_DAYS):
+        return "tombstones of deletions since the watermark may have been cleaned up"
+    if not default_storage.exists(manifest["snapshot"]):
+        return "the snapshot file is missing"
+    return None
+
+
+def start_from_full_export() -> tuple[dict[str, Any], int]:
+    """Write a full export and a manifest without deltas on top of it; return the manifest and the row count."""
+    file_path, count, taken_at = write_full_export()
+    manifest = {
+        "snapshot": file_path,
+        "rebuilt_at": taken_at.isoformat(),
+        "watermark": taken_at.isoformat(),
+        "fields": PUBLIC_FIELDS,
+        "deltas": [],
+    }
+    write_manifest(manifest)
+    logger.info(f"Started incremental export from full export {file_path} with {count} observations")
+    return manifest, count
+
+
+def write_delta(manifest: dict[str, Any]) -> dict[str, Any] | None:
+    """
+    Export the observations changed since the watermark of `manifest` to a delta file.
+
+    The delta starts `GEOJSON_CHANGES_OVERLAP_SECONDS` before the watermark, like the geojson
+    changes feed, so a write that committed after a timestamp it took earlier is not missed;
+    rows repeated by the overlap are upserted again, which is harmless.
+
+    :param manifest: The current manifest; its watermark is advanced.
+    :return: The manifest entry of the new delta file, None when nothing changed.
+    """
+    since = datetime.fromisoformat(manifest["watermark"]) - timedelta(seconds=settings.GEOJSON_CHANGES_OVERLAP_SECONDS)
+    changed = Observation.objects.filter(modified_datetime__gte=since)
+    upserts = changed.filter(EXPORT_FILTER.to_q()).order_by("id")
+
+    with snapshot():
+        watermark = snapshot_time()
+        upserted = upserts.count()
+        deleted_ids = sorted(
+            set(changed.exclude(EXPORT_FILTER.to_q()).values_list("id", flat=True))
+            | set(
+                ObservationTombstone.objects.filter(deleted_datetime__gte=since).values_list(
+                    "observation_id", flat=True
+                )
+            )
+        )
+        entry = None
+        if upserted or deleted_ids:
+            timestamp = timezone.now().strftime("%Y%m%d_%H%M%S")
+            file_path = f"{INCREMENTAL_EXPORT_PATH}/delta_{timestamp}.csv"
+            with open_text_export(file_path) as stream:
+                writer = csv.writer(stream)
+                rows = generate_export_rows(upserts)
+                writer.writerow([CHANGE_COLUMN, *next(rows)])
+                writer.writerows([UPSERT, *row] for row in rows)
+                padding = [""] * (len(PUBLIC_FIELDS) - 1)
+                writer.writerows([DELETE, observation_id, *padding] for observation_id in deleted_ids)
+            entry = {
+                "path": file_path,
+                "since": since.isoformat(),
+                "watermark": watermark.isoformat(),
+                "upserts": upserted,
+                "deletes": len(deleted_ids),
+            }
+            manifest["deltas"].append(entry)
+            logger.info(f"Wrote delta {file_path}: {upserted} upserts, {len(deleted_ids)} deletes")
+
+    manifest["watermark"] = watermark.isoformat()
+    return entry
+
+
+def _load_changes(deltas: list[dict[str, Any]]) -> dict[int, list[str] | None]:
+    """Read delta files in order into the final row per observation id, None for a removed observation."""
+    changes: dict[int, list[str] | None] = {}
+    for delta in deltas:
+        with read_text_export(delta["path"]) as stream:
+            reader = csv.reader(stream)
+            next(reader)
+            for change, *row in reader:
+                changes[int(row[0])] = row if change == UPSERT else None
+    return changes
+
+
+def _merge(snapshot_rows: Iterator[list[str]], changes: dict[int, list[str] | None]) -> Iterator[list[str]]:
+    """Apply `changes` to the id-ordered rows of a snapshot, keeping the id order."""
+    pending = sorted(changes)
+    position = 0
+    for row in snapshot_rows:
+        observation_id = int(row[0])
+        while position < len(pending) and pending[position] < observation_id:
+            new_row = changes[pending[position]]
+            if new_row is not None:
+                yield new_row
+            position += 1
+        if position < len(pending) and pending[position] == observation_id:
+            new_row = changes[observation_id]
+            if new_row is not None:
+                yield new_row
+            position += 1
+        else:
+            yield row
+    for observation_id in pending[position:]:
+        new_row = changes[observation_id]
+        if new_row is not None:
+            yield new_row
+
+
+def compact(manifest: dict[str, Any]) -> int:
+    """
+    Merge the deltas of `manifest` into a new full export file and drop them from the manifest.
+
+    Only the deltas are held in memory; the old snapshot is streamed from storage into the new one.
+
+    :param manifest: The current manifest; it is updated to the new snapshot.
+    :return: Number of observations in the new snapshot.
+    """
+    changes = _load_changes(manifest["deltas"])
+    previous_files = list_hourly_exports()
+    new_file_path = new_hourly_export_path(settings.EXPORT_GZIP)
+    count = 0
+    with read_text_export(manifest["snapshot"]) as source, open_text_export(
+        new_file_path, compress=settings.EXPORT_GZIP
+    ) as target:
+        reader = csv.reader(source)
+        writer = csv.writer(target)
+        writer.writerow(next(reader))
+        for row in _merge(reader, changes):
+            writer.writerow(row)
+            count += 1
+
+    delta_paths = [delta["path"] for delta in manifest["deltas"]]
+    manifest["snapshot"] = new_file_path
+    manifest["deltas"] = []
+    write_manifest(manifest)
+    # Only once the manifest no longer refers to them.
+    prune_hourly_exports(previous_files)
+    for path in delta_paths:
+        default_storage.delete(path)
+    logger.info(
+        f"Compacted {len(delta_paths)} deltas with {len(changes)} changed observations into {new_file_path}"
+    )
+    return count
+
+
+def update_incremental_export() -> dict[str, Any]:
+    """
+    Bring the incremental export up to date: write a delta and compact once enough deltas piled up.
+
+    Falls back to a full export when the deltas cannot continue from the manifest.
+
+    :return: Result in the shape of `generate_hourly_export`, with the file path of the latest full export.
+    """
+    if not cache.add(LOCK_KEY, "locked", timeout=LOCK_EXPIRE):
+        logger.info("Incremental export is already running, skipping this run")
+        return {"status": "skipped"}
+    try:
+        manifest = read_manifest()
+        reason = _needs_full_export(manifest)
+        if reason is not None:
+            logger.info(f"Writing a full export: {reason}")
+            manifest, count = start_from_full_export()
+            return {"status": "completed", "file_path": manifest["snapshot"], "mode": "full", "total_processed": count}
+
+        entry = write_delta(manifest)
+        write_manifest(manifest)
+        processed = entry["upserts"] + entry["deletes"] if entry else 0
+        if manifest["deltas"] and len(manifest["deltas"]) >= settings.EXPORT_COMPACTION_DELTAS:
+            compact(manifest)
+        return {"status": "completed", "file_path": manifest["snapshot"], "mode": "delta", "total_processed": processed}
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+@shared_task(name="vespadb.observations.tasks.incremental_export.compact_incremental_export")
+def compact_incremental_export() -> dict[str, Any]:
+    """Compact the pending deltas of the incremental export into a new full export file right away."""
+    if not cache.add(LOCK_KEY, "locked", timeout=LOCK_EXPIRE):
+        logger.info("Incremental export is already running, skipping compaction")
+        return {"status": "skipped"}
+    try:
+        manifest = read_manifest()
+        if manifest is None:
+            logger.info("No incremental export to compact")
+            return {"status": "skipped"}
+        count = compact(manifest) if manifest["deltas"] else 0
+        return {"status": "completed", "file_path": manifest["snapshot"], "total_processed": count}
+    finally:
+        cache.delete(LOCK_KEY)
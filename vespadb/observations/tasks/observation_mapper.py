@@ -21,7 +21,7 @@ from vespadb.observations.models import (
     Observation,
     ValidationStatusEnum,
 )
-from vespadb.observations.utils import check_if_point_in_anb_area, get_municipality_from_coordinates
+from vespadb.observations.enrichment import resolve_locations
 
 logger = logging.getLogger("vespadb.observations.tasks")
 
@@ -211,11 +211,15 @@ def parse_datetime_with_timezone(
     return datetime_obj
 
 
-def map_external_data_to_observation_model(external_data: dict[str, Any]) -> dict[str, Any] | None:  # noqa: C901
+def map_external_data_to_observation_model(  # noqa: C901
+    external_data: dict[str, Any], enrich_location: bool = True
+) -> dict[str, Any] | None:
     """
     Map external API data to a Django observation model fields, returning None if the data is incomplete or improperly formatted.
 
     :param external_data: A dictionary of external API data.
+    :param enrich_location: Resolve municipality, province and ANB here; pass False to leave them to
+        `enrich_mapped_observations` for a whole page at once.
     :return: A dictionary suitable for creating or updating an Observation model instance, or None if an error occurs.
     """
     required_fields = ["id", "date", "point", "created", "modified"]
@@ -242,9 +246,6 @@ def map_external_data_to_observation_model(external_data: dict[str, Any]) -> dic
         return None
 
     location = Point(external_data["point"]["coordinates"], srid=4326)
-    long, lat = location.x, location.y
-    anb = check_if_point_in_anb_area(long, lat)
-    municipality = get_municipality_from_coordinates(long, lat)
 
     mapped_enums = map_attributes_to_enums(external_data.get("attributes", []))
     validation_status = map_validation_status_to_enum(external_data.get("validation_status", "O"))
@@ -258,15 +259,14 @@ def map_external_data_to_observation_model(external_data: dict[str, Any]) -> dic
         "observation_datetime": observation_datetime_cet,
         "wn_created_datetime": created_datetime,
         "wn_modified_datetime": modified_datetime,
-        "anb": anb,
-        "municipality": municipality,
-        "province": municipality.province if municipality else None,
         "wn_validation_status": validation_status,
         "wn_cluster_id": cluster_id,
         "images": external_data.get("photos", []),
         "source": "Waarnemingen.be",
         **mapped_enums,
     }
+    if enrich_location:
+        enrich_mapped_observations([mapped_data])
 
     user_data = external_data.get("user", {})
     if user_data:
@@ -298,6 +298,18 @@ def map_external_data_to_observation_model(external_data: dict[str, Any]) -> dic
 
     return mapped_data
 
+def enrich_mapped_observations(mapped_observations: list[dict[str, Any]]) -> None:
+    """
+    Set anb, municipality_id and province_id on mapped observations, resolving all locations at once.
+
+    :param mapped_observations: Results of `map_external_data_to_observation_model`, updated in place.
+    """
+    points = [(mapped["location"].x, mapped["location"].y) for mapped in mapped_observations]
+    for mapped, (municipality_id, province_id, anb) in zip(mapped_observations, resolve_locations(points)):
+        mapped["anb"] = anb
+        mapped["municipality_id"] = municipality_id
+        mapped["province_id"] = province_id
+
 def check_existing_eradication_date(wn_id: str) -> bool:
     """
     Check if the eradication_date is already set for the given wn_id.
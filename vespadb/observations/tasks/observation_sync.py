@@ -11,8 +11,12 @@ from django.db import DatabaseError, models, transaction
 from django.utils.timezone import now
 from dotenv import load_dotenv
 
-from vespadb.observations.models import Municipality, Observation, Province
-from vespadb.observations.tasks.observation_mapper import map_external_data_to_observation_model
+from vespadb.observations.cache import invalidate_observation_caches
+from vespadb.observations.models import Observation
+from vespadb.observations.tasks.observation_mapper import (
+    enrich_mapped_observations,
+    map_external_data_to_observation_model,
+)
 from vespadb.permissions import SYSTEM_USER_OBSERVATION_FIELDS_TO_UPDATE as FIELDS_TO_UPDATE
 from vespadb.users.models import UserType
 from vespadb.users.utils import get_system_user
@@ -98,7 +102,7 @@ def create_observations(observations_to_create: list[Observation]) -> None:
         # Handle individual saves OUTSIDE of any transaction block
         for observation in observations_to_create:
             try:
-                observation.save()  # Save each observation individually
+                observation.save(enrich_location=False)  # Save each observation individually, already enriched per page
                 successful_creations += 1
             except Exception as e:
                 # Log error and the input data without stopping the sync
@@ -118,31 +122,31 @@ def update_observations(observations_to_update: list[Observation], wn_ids_to_upd
         update_needed = False
         for field in FIELDS_TO_UPDATE:
             if hasattr(observation, field):
-                new_value = getattr(updated_observation, field)
                 field_type = getattr(Observation, field).field
-
-                if isinstance(field_type, models.ForeignKey):
-                    if isinstance(field_type.related_model, Municipality):
-                        new_value = updated_observation.municipality_id
-                    elif isinstance(field_type.related_model, Province):
-                        new_value = updated_observation.province_id
-
-                current_value = getattr(observation, field)
+                # Compare foreign keys by id: the mapper only sets municipality_id and province_id.
+                attname = field_type.attname if isinstance(field_type, models.ForeignKey) else field
+                new_value = getattr(updated_observation, attname)
+                current_value = getattr(observation, attname)
                 if current_value != new_value:
-                    setattr(observation, field, new_value)
+                    setattr(observation, attname, new_value)
                     update_needed = True
         return update_needed
 
+    # bulk_update bypasses auto_now, so stamp modified_datetime for the changes feed explicitly
+    modified_datetime = now()
     for observation in existing_observations_to_update:
         updated_observation = observations_update_dict[observation.wn_id]
         if needs_update(observation, updated_observation):
+            observation.modified_datetime = modified_datetime
             observations_to_bulk_update.append(observation)
 
     # Attempt to perform a bulk update
     if observations_to_bulk_update:
         try:
             logger.info("Attempting to bulk update %s observations", len(observations_to_bulk_update))
-            Observation.objects.bulk_update(observations_to_bulk_update, FIELDS_TO_UPDATE, batch_size=BATCH_SIZE)
+            Observation.objects.bulk_update(
+                observations_to_bulk_update, [*FIELDS_TO_UPDATE, "modified_datetime"], batch_size=BATCH_SIZE
+            )
             logger.info("Successfully bulk updated %s observations", len(observations_to_bulk_update))
         except Exception as bulk_error:
             logger.exception("Bulk update failed: %s", bulk_error)
@@ -152,7 +156,7 @@ def update_observations(observations_to_update: list[Observation], wn_ids_to_upd
             # Fall back to individual updates in case of failure
             for observation in observations_to_bulk_update:
                 try:
-                    observation.save(update_fields=FIELDS_TO_UPDATE)
+                    observation.save(update_fields=[*FIELDS_TO_UPDATE, "modified_datetime"])
                     successful_updates += 1
                 except Exception as e:
                     # Log error and the input data without stopping the sync
@@ -181,9 +185,13 @@ def fetch_nest_observations(token: str, cluster_id: int) -> list[int]:
 
 def update_observation_visibility(observations: list[Observation], observation_ids_to_hide: set[int]) -> None:
     """Update visibility of observations based on their registration dates."""
+    modified_datetime = now()
     for observation in observations:
-        observation.visible = observation.id not in observation_ids_to_hide
-    Observation.objects.bulk_update(observations, ["visible"], batch_size=BATCH_SIZE)
+        visible = observation.id not in observation_ids_to_hide
+        if observation.visible != visible:
+            observation.visible = visible
+            observation.modified_datetime = modified_datetime
+    Observation.objects.bulk_update(observations, ["visible", "modified_datetime"], batch_size=BATCH_SIZE)
 
 
 def fetch_clusters(token: str, limit: int = 100) -> list[dict[str, Any]]:
@@ -239,6 +247,8 @@ def manage_observations_visibility(token: str) -> None:
             )
         )
 
+        previously_visible = {obs.id: obs.visible for obs in observations}
+
         # Set all to invisible by default
         for obs in observations:
             obs.visible = False
@@ -255,7 +265,11 @@ def manage_observations_visibility(token: str) -> None:
         if not visible_set and observations_sorted:
             observations_sorted[0].visible = True
 
-        Observation.objects.bulk_update(observations, ["visible"], batch_size=BATCH_SIZE)
+        modified_datetime = now()
+        for obs in observations:
+            if obs.visible != previously_visible[obs.id]:
+                obs.modified_datetime = modified_datetime
+        Observation.objects.bulk_update(observations, ["visible", "modified_datetime"], batch_size=BATCH_SIZE)
 
         logger.info(
             f"Cluster {cluster['id']}: visibility updated "
@@ -322,13 +336,18 @@ def fetch_and_update_observations(self: Task, since_week: int | None = None, dat
             observations_to_update = []
             observations_to_create = []
             wn_ids_to_update = []
-            for external_data in data["results"]:
-                mapped_data = map_external_data_to_observation_model(external_data)
+            page = [
+                mapped
+                for mapped in (
+                    map_external_data_to_observation_model(external_data, enrich_location=False)
+                    for external_data in data["results"]
+                )
+                if mapped is not None
+            ]
+            enrich_mapped_observations(page)
+            for mapped_data in page:
                 current_time = now()
 
-                if mapped_data is None:
-                    continue
-
                 wn_id = mapped_data.pop("wn_id")
 
                 if wn_id in existing_wn_ids:
@@ -367,3 +386,4 @@ def fetch_and_update_observations(self: Task, since_week: int | None = None, dat
     logger.info("Finished processing observations")
     manage_observations_visibility(token)
     logger.info("Finished managing observations visibility")
+    invalidate_observation_caches()
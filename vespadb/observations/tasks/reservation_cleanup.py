@@ -6,11 +6,13 @@ from typing import Any
 
 from celery import shared_task
 from django.conf import settings
-from django.db.models import Count, Q
+from django.db import connection, transaction
 from django.utils import timezone
 from dotenv import load_dotenv
 
+from vespadb.observations.cache import invalidate_observation_caches
 from vespadb.observations.models import Observation
+from vespadb.observations.reservations import get_reservation_count_drift, reconcile_reservation_counts
 from vespadb.users.models import VespaUser
 
 load_dotenv()
@@ -18,6 +20,61 @@ load_dotenv()
 logger = logging.getLogger("vespadb.observations.tasks")
 
 
+# Frees expired reservations, repairs half-set ones and releases the freed open reservations from
+# the counters, all in one statement. Rows locked by a concurrent edit are skipped until the next run.
+CLEANUP_RESERVATIONS_SQL = """
+    WITH candidates AS (
+        SELECT id, reserved_by_id, eradication_date, reserved_datetime IS NULL AS missing_datetime
+        FROM {observations}
+        WHERE reserved_by_id IS NOT NULL AND (reserved_datetime IS NULL OR reserved_datetime <= %(cutoff)s)
+        FOR UPDATE SKIP LOCKED
+    ),
+    freed AS (
+        UPDATE {observations} AS obs
+        SET reserved_by_id = NULL, reserved_datetime = NULL, modified_datetime = now()
+        FROM candidates
+        WHERE obs.id = candidates.id
+        RETURNING candidates.reserved_by_id, candidates.eradication_date, candidates.missing_datetime
+    ),
+    released AS (
+        SELECT reserved_by_id, count(*) AS open_reservations
+        FROM freed
+        WHERE eradication_date IS NULL
+        GROUP BY reserved_by_id
+    ),
+    adjusted AS (
+        UPDATE {users} AS u
+        SET reservation_count = u.reservation_count - released.open_reservations
+        FROM released
+        WHERE u.id = released.reserved_by_id
+        RETURNING u.id
+    ),
+    orphan_candidates AS (
+        SELECT id
+        FROM {observations}
+        WHERE reserved_by_id IS NULL AND reserved_datetime IS NOT NULL
+        FOR UPDATE SKIP LOCKED
+    ),
+    orphaned AS (
+        UPDATE {observations} AS obs
+        SET reserved_datetime = NULL, modified_datetime = now()
+        FROM orphan_candidates
+        WHERE obs.id = orphan_candidates.id
+        RETURNING obs.id
+    )
+    SELECT
+        (SELECT count(*) FROM freed WHERE NOT missing_datetime),
+        (SELECT count(*) FROM freed WHERE missing_datetime) + (SELECT count(*) FROM orphaned),
+        (SELECT COALESCE(sum(open_reservations), 0) FROM released),
+        (SELECT count(*) FROM adjusted)
+"""
+
+# freed: expired reservations released; repaired: reservations with only one of reserved_by and
+# reserved_datetime set, cleared; released: open reservations taken off the counters;
+# adjusted_users: users whose counter changed.
+CLEANUP_SUMMARY_FIELDS = ("freed", "repaired", "released", "adjusted_users")
+
+
 @shared_task
 def free_expired_reservations_and_audit_reservation_count(*args: Any, **kwargs: Any) -> None:
     """Free expired reservations and audit the reservation count for each observation."""
@@ -28,79 +85,53 @@ def free_expired_reservations_and_audit_reservation_count(*args: Any, **kwargs:
     logger.info("finished freeing expired reservations and auditing reservation count")
 
 
-def cleanup_expired_reservations() -> None:
+@shared_task
+def free_expired_reservations(*args: Any, **kwargs: Any) -> dict[str, int]:
+    """Free expired reservations; cheap enough to run every few minutes."""
+    return cleanup_expired_reservations()
+
+
+def cleanup_expired_reservations() -> dict[str, int]:
     """
-    Cleanup reservations that are older than 5 days.
+    Cleanup reservations that are older than `RESERVATION_DURATION_DAYS` days.
 
-    Check for all observations If the reserved datetime is older than 5 days.
-    It will set both reserved_by and reserved_datetime to null.
-    If an observation has reserved_datetime but no reserved_by, or vice versa, it will also set reserved_datetime/reserved_by to null.
+    Sets both reserved_by and reserved_datetime to null on expired reservations. If an observation has
+    reserved_datetime but no reserved_by, or vice versa, both are set to null as well. The reservation
+    counters of the users are adjusted in the same statement and the changed observations are stamped
+    for the dynamic-geojson changes feed.
 
     This task is intended to be run as a cron job to regularly clean up outdated reservation data.
+
+    :return: Counts keyed by `CLEANUP_SUMMARY_FIELDS`.
     """
     from vespadb.observations.helpers import parse_and_convert_to_cet
     five_days_ago = (timezone.now() - timedelta(days=settings.RESERVATION_DURATION_DAYS))
     five_days_ago = parse_and_convert_to_cet(five_days_ago)
     five_days_ago = five_days_ago.replace(hour=0, minute=0, second=0, microsecond=0)
-    
-    observations_to_update = Observation.objects.filter(
-        Q(reserved_datetime__lte=five_days_ago, reserved_by__isnull=False)
-        | Q(reserved_datetime__isnull=False, reserved_by__isnull=True)
-        | Q(reserved_datetime__isnull=True, reserved_by__isnull=False)
-    )
-
-    for observation in observations_to_update:
-        if observation.reserved_datetime and observation.reserved_by:
-            # reservation is expired if reserved_datetime is older than 5 days
-            if observation.reserved_datetime <= five_days_ago:
-                observation.reserved_by = None
-                observation.reserved_datetime = None
-        elif observation.reserved_datetime and not observation.reserved_by:
-            # safety check: if reserved_datetime is set but reserved_by is not, set both to None
-            observation.reserved_datetime = None
-        elif not observation.reserved_datetime and observation.reserved_by:
-            # safety check: if reserved_by is set but reserved_datetime is not, set both to None
-            observation.reserved_by = None
 
-        observation.save()
+    tables = {
+        "observations": connection.ops.quote_name(Observation._meta.db_table),
+        "users": connection.ops.quote_name(VespaUser._meta.db_table),
+    }
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(CLEANUP_RESERVATIONS_SQL.format(**tables), {"cutoff": five_days_ago})
+        summary = dict(zip(CLEANUP_SUMMARY_FIELDS, cursor.fetchone()))
 
-    logger.info("Cleaned up reservation data for %s observations", len(observations_to_update))
+    if summary["freed"] or summary["repaired"]:
+        invalidate_observation_caches()
+    logger.info(f"Cleaned up reservation data: {summary}")
+    return summary
 
 
 def audit_user_reservations() -> None:
     """
     Audit task to verify if the reservation counts of users match the actual reservations in the database.
 
-    This task counts the number of observations reserved by each user, excluding those where eradication has occurred,
-    and updates the reservation count if discrepancies are found.
+    The counters are maintained on every write (see `vespadb.observations.reservations`), so this only
+    repairs drift, with a single UPDATE over all users, including those without open reservations.
     """
     logger.info("Starting audit of user reservations")
-
-    # Get all users with their actual reservation count from Observation table,
-    # excluding observations where eradication_date is set
-    actual_counts = (
-        Observation.objects.filter(
-            eradication_date__isnull=True  # Only include active reservations
-        )
-        .values("reserved_by")
-        .annotate(actual_count=Count("id"))
-        .order_by()
-    )
-
-    # Update users where the actual reservation count does not match the recorded count
-    for count_data in actual_counts:
-        user_id = count_data["reserved_by"]
-        if user_id is None:
-            continue  # Skip entries where reserved_by is None
-        actual_count = count_data["actual_count"]
-        user = VespaUser.objects.get(id=user_id)  # Retrieve user by ID
-
-        # Check if the current stored reservation count matches the actual count
-        if user.reservation_count != actual_count:
-            logger.info(
-                f"Updating reservation count for user {user.username}: {user.reservation_count} -> {actual_count}"
-            )
-            user.reservation_count = actual_count
-            user.save()
-
-    logger.info("Audit of user reservations completed")
+    drift = get_reservation_count_drift()
+    logger.info(f"Reservation count drift before the audit: {drift}")
+    corrected = reconcile_reservation_counts()
+    logger.info(f"Audit of user reservations completed: {corrected} counters corrected")
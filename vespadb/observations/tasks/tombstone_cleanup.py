@@ -0,0 +1,28 @@
+"""Clean up tombstones of deleted observations."""
+
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from vespadb.observations.models import ObservationTombstone
+
+logger = logging.getLogger("vespadb.observations.tasks")
+
+
+@shared_task
+def cleanup_observation_tombstones() -> int:
+    """
+    Delete tombstones older than the changes feed retention.
+
+    Changes tokens older than `GEOJSON_CHANGES_RETENTION_DAYS` are rejected by the feed, so their
+    tombstones are no longer needed.
+
+    :return: The number of deleted tombstones.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.GEOJSON_CHANGES_RETENTION_DAYS)
+    deleted, _ = ObservationTombstone.objects.filter(deleted_datetime__lt=cutoff).delete()
+    logger.info("Deleted %s observation tombstones older than %s", deleted, cutoff)
+    return deleted
@@ -15,6 +15,11 @@ router.register(r"provinces", ProvinceViewSet)
 
 # The API URLs are now determined automatically by the router.
 urlpatterns = [
+    path(
+        "observations/tiles/<int:z>/<int:x>/<int:y>.mvt",
+        ObservationsViewSet.as_view({"get": "tiles"}),
+        name="observation-tiles",
+    ),
     path("", include(router.urls)),
     path("search-address/", search_address, name="search_address"),
 ]
@@ -1,20 +1,29 @@
 """Utility functions for the observations app."""
 
 from django.contrib.gis.geos import Point
+import hashlib
+import math
 import time
+from datetime import UTC, datetime, timedelta
 import logging
 from functools import wraps
 from django.db import connection, OperationalError
 from typing import Callable, TypeVar, Any, cast, Generator, List
-from vespadb.observations.helpers import parse_and_convert_to_cet
+from vespadb.observations.cache import GEOJSON_CACHE_FAMILY, OBSERVATIONS_LIST_CACHE_FAMILY, get_cache_generation
 
 logger = logging.getLogger(__name__)
 F = TypeVar("F", bound=Callable[..., Any])
 
 def get_municipality_from_coordinates(longitude: float, latitude: float):  # type: ignore[no-untyped-def]
     """Get the municipality for a given long and lat."""
+    from django.conf import settings  # noqa: PLC0415
+
     from vespadb.observations.models import Municipality  # noqa: PLC0415
 
+    if settings.BOUNDARY_INDEX_ENABLED:
+        municipality_id, _, _ = resolve_location(longitude, latitude)
+        return Municipality.objects.filter(pk=municipality_id).first() if municipality_id else None
+
     point_to_check = Point(longitude, latitude, srid=4326)
     point_to_check.transform(31370)
 
@@ -25,9 +34,12 @@ def get_municipality_from_coordinates(longitude: float, latitude: float):  # typ
 
 def check_if_point_in_anb_area(longitude: float, latitude: float) -> bool:
     """Check if a given point is in an ANB area."""
-    from django.contrib.gis.geos import Point
+    from django.conf import settings  # noqa: PLC0415
     from .models import ANB  # Import here to avoid circular imports
-    
+
+    if settings.BOUNDARY_INDEX_ENABLED:
+        return resolve_location(longitude, latitude)[2]
+
     point = Point(longitude, latitude, srid=4326)
     
     # Transform to the same SRID as ANB polygons (31370)
@@ -37,6 +49,24 @@ def check_if_point_in_anb_area(longitude: float, latitude: float) -> bool:
     is_within_anb = ANB.objects.filter(polygon__contains=transformed_point).exists()    
     return is_within_anb
 
+
+def resolve_location(longitude: float, latitude: float) -> tuple[int | None, int | None, bool]:
+    """
+    Resolve a location to its municipality id, province id and ANB flag in one go.
+
+    Uses the in-memory boundary index, or one spatial join when `BOUNDARY_INDEX_ENABLED` is off.
+
+    Args:
+        longitude (float): Longitude in EPSG:4326.
+        latitude (float): Latitude in EPSG:4326.
+
+    Returns:
+        tuple: (municipality_id, province_id, anb).
+    """
+    from vespadb.observations.enrichment import resolve_locations  # noqa: PLC0415
+
+    return resolve_locations([(longitude, latitude)])[0]
+
 def db_retry(retries: int = 3, delay: int = 5) -> Callable[[F], F]:
     """
     Decorator to retry a database operation in case of an OperationalError.
@@ -79,21 +109,105 @@ def retry_query(queryset: Generator[Any, None, None], retries: int = 3, delay: i
     # This return is added to satisfy type checkers, though it should never reach here.
     return []
 
+BBOX_LENGTH = 4
+
+
+def current_change_token() -> str:
+    """
+    Return an opaque token marking "now" for the dynamic-geojson changes feed.
+
+    The token lags the clock by `GEOJSON_CHANGES_OVERLAP_SECONDS`, so writes that commit
+    slightly after their `modified_datetime` are not missed. Clients treat features as upserts,
+    so receiving a change twice is harmless.
+    """
+    from django.conf import settings  # noqa: PLC0415
+    from django.utils import timezone  # noqa: PLC0415
+
+    moment = timezone.now() - timedelta(seconds=settings.GEOJSON_CHANGES_OVERLAP_SECONDS)
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_change_token(token: str) -> datetime:
+    """
+    Convert a changes feed token back into the moment it marks.
+
+    :raises ValueError: If the token is malformed.
+    """
+    try:
+        return datetime.fromtimestamp(int(token) / 1_000_000, tz=UTC)
+    except (OverflowError, OSError) as e:
+        raise ValueError(f"Invalid change token: {token}") from e
+
+
+def quantize_bbox(bbox: str, quantum: float | None = None) -> str:
+    """
+    Parse a `xmin,ymin,xmax,ymax` bounding box and snap it outwards to a fixed grid.
+
+    Nearby viewports snap to the same box, so they share one cache entry. The snapped box
+    always contains the requested one.
+
+    :param bbox: Comma-separated bounding box in EPSG:4326.
+    :param quantum: Grid step in degrees, defaults to `settings.GEOJSON_BBOX_QUANTUM`.
+    :return: The snapped bounding box in the same format.
+    :raises ValueError: If the bounding box is malformed.
+    """
+    from django.conf import settings  # noqa: PLC0415
+
+    step = quantum or settings.GEOJSON_BBOX_QUANTUM
+    parts = [float(part) for part in str(bbox).split(",")]
+    if len(parts) != BBOX_LENGTH or not all(math.isfinite(part) for part in parts):
+        raise ValueError(f"Invalid bbox: {bbox}")
+    xmin, ymin, xmax, ymax = parts
+    if xmin > xmax or ymin > ymax:
+        raise ValueError(f"Invalid bbox: {bbox}")
+    # Rounding the cell index first keeps already snapped boxes where they are (0.15 / 0.05 is 2.9999...).
+    snapped = (
+        math.floor(round(xmin / step, 6)) * step,
+        math.floor(round(ymin / step, 6)) * step,
+        math.ceil(round(xmax / step, 6)) * step,
+        math.ceil(round(ymax / step, 6)) * step,
+    )
+    return ",".join(f"{value:.4f}" for value in snapped)
+
+def _normalize_cache_params(params: dict[str, Any]) -> str:
+    """
+    Return the canonical cache key fragment of a filter set, see `FilterSpec.cache_key`.
+
+    All values of multi-valued filters count, and the `zoom` of clustered responses is kept.
+    """
+    from vespadb.observations.filter_spec import FilterSpec  # noqa: PLC0415
+
+    fragment = FilterSpec.from_params(params).cache_key()
+    if params.get("zoom") is not None:
+        fragment += f"&zoom={params['zoom']}"
+    return fragment
+
 def get_geojson_cache_key(params: dict[str, Any]) -> str:
-    normalized = {}
-    for key, value in params.items():
-        # If value is a list or tuple, take the first element.
-        if isinstance(value, (list, tuple)):
-            value = value[0]
-        lower_key = key.lower()
-        # For datetime filters, convert and ISO‑format
-        if lower_key in ['min_observation_datetime', 'max_observation_datetime']:
-            try:
-                dt = parse_and_convert_to_cet(value)
-                normalized[lower_key] = dt.isoformat()
-            except Exception:
-                normalized[lower_key] = str(value).lower()
-        else:
-            normalized[lower_key] = str(value).lower()
-    sorted_params = "&".join(sorted(f"{k}={v}" for k, v in normalized.items()))
-    return f"vespadb:geojson:{sorted_params}"
+    """Return the cache key of the GeoJSON document for the given filter set, in the current generation."""
+    generation = get_cache_generation(GEOJSON_CACHE_FAMILY)
+    return f"vespadb:geojson:g{generation}:{_normalize_cache_params(params)}"
+
+def get_tile_cache_key(params: dict[str, Any], z: int, x: int, y: int) -> str:
+    """Return the cache key of one vector tile for the given filter set, in the current GeoJSON generation."""
+    generation = get_cache_generation(GEOJSON_CACHE_FAMILY)
+    return f"vespadb:tiles:g{generation}:{z}/{x}/{y}:{_normalize_cache_params(params)}"
+
+def get_observations_list_cache_key(query_params: Any, permission_scope: str) -> str:
+    """
+    Return a cache key for one observation list page that is identical across processes.
+
+    Parameter names are sorted, every value of a repeated parameter counts and the digest is
+    SHA-256 instead of the per-process salted `hash()`. The key embeds the observation list
+    generation, so `invalidate_observation_caches` drops all pages at once.
+
+    :param query_params: The request query parameters, including the pagination cursor.
+    :param permission_scope: `ObservationPermissionContext.cache_scope()` of the requesting user.
+    :return: The cache key.
+    """
+    canonical = "&".join(
+        f"{key}={','.join(query_params.getlist(key))}" for key in sorted(query_params)
+    )
+    digest = hashlib.sha256(f"{permission_scope}|{canonical}".encode()).hexdigest()[:32]
+    generation = get_cache_generation(OBSERVATIONS_LIST_CACHE_FAMILY)
+    tier = permission_scope.split(":", 1)[0]
+    return f"vespadb:observations_list:g{generation}:{tier}:{digest}"
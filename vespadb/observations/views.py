@@ -28,6 +28,7 @@ from django.db.models.functions import Coalesce
 from django.db.utils import IntegrityError
 from django.http import HttpResponse, JsonResponse, HttpRequest
 from django.db import connection
+from django.utils.cache import patch_vary_headers
 from django.utils.decorators import method_decorator
 from django.utils.timezone import now
 from django.views.decorators.http import require_GET
@@ -57,13 +58,42 @@ from drf_yasg import openapi
 from vespadb.observations.constants import MIN_OBSERVATION_DATETIME
 from django.conf import settings
 
-from vespadb.observations.cache import invalidate_geojson_cache, invalidate_observation_cache
+from vespadb.observations.cache import (
+    MUNICIPALITIES_CACHE_FAMILY,
+    OBSERVATIONS_LIST_CACHE_FAMILY,
+    claim_refresh,
+    compute_once,
+    get_cache_generation,
+    get_geojson_payload,
+    get_stale_while_revalidate,
+    invalidate_observation_caches,
+    release_refresh,
+    set_geojson_payload,
+    set_stale_while_revalidate,
+)
 from vespadb.observations.filters import ObservationFilter
 from vespadb.observations.helpers import parse_and_convert_to_cet
-from vespadb.observations.models import Municipality, Observation, Province, Export
+from vespadb.observations.models import Municipality, Observation, Province, Export, get_location_enrichment_metrics
+from vespadb.observations.reservations import get_reservation_count_drift
+from vespadb.observations.tasks.cache_rebuild import get_rebuild_metrics
+from vespadb.observations.tasks.generate_geojson_task import refresh_geojson_cache
 from vespadb.observations.tasks.generate_export import generate_rows
 from vespadb.observations.serializers import ObservationSerializer, MunicipalitySerializer, ProvinceSerializer
-from vespadb.observations.utils import check_if_point_in_anb_area, get_municipality_from_coordinates, get_geojson_cache_key
+from vespadb.observations.queries import (
+    build_changes_query,
+    build_tile_query,
+    normalize_filter_params,
+    render_geojson,
+    resolve_cluster_zoom,
+)
+from vespadb.permissions import ObservationPermissionContext
+from vespadb.observations.enrichment import resolve_locations
+from vespadb.observations.utils import (
+    decode_change_token,
+    get_geojson_cache_key,
+    get_observations_list_cache_key,
+    get_tile_cache_key,
+)
 from django.utils.decorators import method_decorator
 from django_ratelimit.decorators import ratelimit
 from rest_framework.decorators import action
@@ -90,10 +120,55 @@ class Echo:
         return value
 
 
-BBOX_LENGTH = 4
 GEOJSON_REDIS_CACHE_EXPIRATION = 900  # 15 minutes
 GET_REDIS_CACHE_EXPIRATION = 86400  # 1 day
 BATCH_SIZE = 150
+MAX_TILE_ZOOM = 22
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Return whether an Accept-Encoding header value allows a gzip-compressed response.
+
+    An explicit `gzip` (or `x-gzip`) entry decides, otherwise `*` does; a q-value of 0 refuses the coding.
+
+    :param accept_encoding: The raw header value.
+    :return: True when the highest matching q-value is above 0.
+    """
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    explicit = [qualities[coding] for coding in ("gzip", "x-gzip") if coding in qualities]
+    if explicit:
+        return max(explicit) > 0
+    return qualities.get("*", 0.0) > 0
+
+
+def geojson_http_response(payload: bytes, gzipped: bool) -> HttpResponse:
+    """
+    Wrap pre-serialized GeoJSON bytes in an HTTP response without re-encoding them.
+
+    :param payload: UTF-8 JSON bytes, optionally gzip-compressed.
+    :param gzipped: Whether the payload is gzip-compressed.
+    :return: The HTTP response.
+    """
+    response = HttpResponse(payload, content_type="application/json")
+    if gzipped:
+        # GZipMiddleware leaves responses that already carry a Content-Encoding alone.
+        response["Content-Encoding"] = "gzip"
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
 
 class ObservationCursorPagination(CursorPagination):
     page_size = 50
@@ -144,14 +219,21 @@ class ObservationsViewSet(ModelViewSet):  # noqa: PLR0904
         return None
     def get_serializer_context(self) -> dict[str, Any]:
         """
-        Add the request to the serializer context.
+        Add the request and the user's permission context to the serializer context.
 
-        :return: Context dictionary with the request included.
+        :return: Context dictionary with the request and permission context included.
         """
         context: dict[str, Any] = super().get_serializer_context()
         context["request"] = self.request
+        context["permission_context"] = self.get_permission_context()
         return context
 
+    def get_permission_context(self) -> ObservationPermissionContext:
+        """Resolve the requesting user's observation field visibility once per request."""
+        if not hasattr(self, "_permission_context"):
+            self._permission_context = ObservationPermissionContext.for_user(self.request.user)
+        return self._permission_context
+
     def get_serializer_class(self) -> BaseSerializer:
         """
         Return the class to use for the serializer. Defaults to using self.serializer_class.
@@ -182,7 +264,13 @@ class ObservationsViewSet(ModelViewSet):  # noqa: PLR0904
                 permission_classes = [IsAuthenticated()]
         elif self.action == "destroy":
             permission_classes = [IsAdminUser()]
-        elif self.action in {"debug_s3_files", "debug_exports"}:
+        elif self.action in {
+            "debug_s3_files",
+            "debug_exports",
+            "cache_rebuild_status",
+            "location_enrichment_status",
+            "reservation_count_status",
+        }:
             permission_classes = [IsAdminUser()]
         else:
             permission_classes = [AllowAny()]
@@ -241,8 +329,7 @@ class ObservationsViewSet(ModelViewSet):  # noqa: PLR0904
                 raise PermissionDenied("You do not have permission to reserve nests in this municipality.")
 
         instance = serializer.save(modified_by=user, modified_datetime=now())
-        invalidate_observation_cache(instance.id)
-        invalidate_geojson_cache()
+        invalidate_observation_caches(instance.id)
 
     @swagger_auto_schema(
         operation_description="Partially update an existing observation.",
@@ -294,6 +381,7 @@ class ObservationsViewSet(ModelViewSet):  # noqa: PLR0904
         serializer.save(
             created_by=self.request.user, modified_by=self.request.user, created_datetime=now(), modified_datetime=now()
         )
+        invalidate_observation_caches()
 
     @swagger_auto_schema(
         operation_description="Create a new observation.",
@@ -316,7 +404,9 @@ class ObservationsViewSet(ModelViewSet):  # noqa: PLR0904
     @swagger_auto_schema(operation_description="Delete an observation by ID.", responses={204: "No Content"})
     def destroy(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         """
-        Override the destroy method to update the reservation count when an observation is deleted.
+        Override the destroy method to invalidate the caches when an observation is deleted.
+
+        The reservation count of the reserving user is released by the post_delete signal.
 
         Parameters
         ----------
@@ -329,16 +419,11 @@ class ObservationsViewSet(ModelViewSet):  # noqa: PLR0904
         - Response: The HTTP response indicating the result of the delete operation.
         """
         observation = self.get_object()
-        reserved_by = observation.reserved_by
 
         try:
             response = super().destroy(request, *args, **kwargs)
-            if reserved_by:
-                reserved_by.reservation_count -= 1
-                reserved_by.save(update_fields=["reservation_count"])
             # Invalidate the caches
-            invalidate_observation_cache(observation.id)
-            invalidate_geojson_cache()
+            invalidate_observation_caches(observation.id)
             return response
         except Exception as e:
             logger.exception("Error during delete operation")
@@ -353,28 +438,53 @@ class ObservationsViewSet(ModelViewSet):  # noqa: PLR0904
         """
         Handle requests for the list of observations with pagination and caching.
         """
-        query_params = request.GET.copy()
-        cursor = query_params.get('cursor', '')
-        cache_key = f"observations_list:{hash(str(query_params))}:cursor_{cursor}"
+        # The page depends on the user's permissions, so users with different scopes never share entries.
+        cache_key = get_observations_list_cache_key(request.GET, self.get_permission_context().cache_scope())
 
-        # Check cache
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
+        # Check cache. A stale page is still served to everyone except the single request that
+        # claims the refresh; the page depends on the requesting user, so it is rebuilt inline.
+        cached = get_stale_while_revalidate(cache_key)
+        if cached and (not cached[1] or not claim_refresh(cache_key)):
+            return Response(cached[0])
+        if cached:
+            return Response(self._render_list_page(cache_key))
 
-        queryset = self.filter_queryset(self.get_queryset())
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            response = self.get_paginated_response(serializer.data)
-            cache.set(cache_key, response.data, timeout=3600)  # Cache for 1 hour
-            return response
+        def fetch() -> Any:
+            cached = get_stale_while_revalidate(cache_key)
+            return cached[0] if cached else None
+
+        # On a miss, e.g. right after a write moved the list generation, a single request renders the page.
+        return Response(compute_once(cache_key, fetch, lambda: self._render_list_page(cache_key)))
+
+    def _render_list_page(self, cache_key: str) -> Any:
+        """
+        Render the requested observation list page and store it in the cache.
 
-        # In case pagination is disabled (should not happen)
-        serializer = self.get_serializer(queryset, many=True)
-        response_data = {"results": serializer.data}
-        cache.set(cache_key, response_data, timeout=3600)
-        return Response(response_data)
+        Parameters
+        ----------
+        cache_key: str
+            The cache key of the page; its refresh lock is released when rendering fails.
+
+        Returns
+        -------
+        Any
+            The page data.
+        """
+        try:
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                response_data = self.get_paginated_response(serializer.data).data
+            else:
+                # In case pagination is disabled (should not happen)
+                serializer = self.get_serializer(queryset, many=True)
+                response_data = {"results": serializer.data}
+            set_stale_while_revalidate(cache_key, {cache_key: response_data}, OBSERVATIONS_LIST_CACHE_FAMILY)
+            return response_data
+        except Exception:
+            release_refresh(cache_key)
+            raise
     
     @swagger_auto_schema(
         operation_description="Retrieve GeoJSON data for observations within a bounding box (bbox).",
@@ -382,9 +492,18 @@ class ObservationsViewSet(ModelViewSet):  # noqa: PLR0904
             openapi.Parameter(
                 "bbox",
                 openapi.IN_QUERY,
-                description="Bounding box for filtering observations. Format: xmin,ymin,xmax,ymax",
+                description=(
+                    "Bounding box for filtering observations in EPSG:4326. Format: xmin,ymin,xmax,ymax. "
+                    "The box is snapped outwards to a grid so nearby viewports share a cache entry."
+                ),
                 type=openapi.TYPE_STRING,
-            )
+            ),
+            openapi.Parameter(
+                "zoom",
+                openapi.IN_QUERY,
+                description="Map zoom level. Below the clustering threshold, grid clusters with counts are returned.",
+                type=openapi.TYPE_INTEGER,
+            ),
         ],
         responses={
             200: openapi.Response(
@@ -406,122 +525,164 @@ class ObservationsViewSet(ModelViewSet):  # noqa: PLR0904
     def geojson(self, request: Request) -> HttpResponse:
         """
         Generate GeoJSON data for the observations using a highly optimized raw SQL query.
+
+        Below `GEOJSON_CLUSTER_MAX_ZOOM` a `zoom` parameter switches the response to grid clusters
+        with counts per nest status instead of individual points.
         """
         try:
-            query_params = request.GET.copy()
-            if 'visible' not in query_params:
-                query_params['visible'] = 'true'
-            if 'min_observation_datetime' in query_params:
-                try:
-                    dt_obj = parse_and_convert_to_cet(query_params['min_observation_datetime'])
-                    query_params['min_observation_datetime'] = dt_obj.isoformat()
-                except (ValueError, TypeError):
-                    logger.warning(
-                        f"Could not parse min_observation_datetime: {query_params['min_observation_datetime']}"
-                    )
-            if 'max_observation_datetime' in query_params:
-                try:
-                    dt_obj = parse_and_convert_to_cet(query_params['max_observation_datetime'])
-                    query_params['max_observation_datetime'] = dt_obj.isoformat()
-                except (ValueError, TypeError):
-                    logger.warning(
-                        f"Could not parse max_observation_datetime: {query_params['max_observation_datetime']}"
-                    )
+            try:
+                query_params = normalize_filter_params(request.GET)
+            except ValueError as e:
+                return HttpResponseBadRequest(str(e))
+            cluster_zoom = resolve_cluster_zoom(query_params)
             cache_key = get_geojson_cache_key(query_params)
-            cached_data = cache.get(cache_key)
-            if cached_data:
-                return JsonResponse(cached_data, safe=False)
+            accept_gzip = accepts_gzip(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+            cached = get_geojson_payload(cache_key, accept_gzip)
+            if cached:
+                payload, gzipped, is_stale = cached
+                if is_stale and claim_refresh(cache_key):
+                    refresh_geojson_cache.delay(cache_key, dict(query_params.lists()), cluster_zoom)
+                return geojson_http_response(payload, gzipped)
 
             logger.info(f"Cache MISS for key: {cache_key}")
-            # Base query
-            base_query = """
-            SELECT json_build_object(
-                'type', 'FeatureCollection',
-                'features', json_agg(
-                    json_build_object(
-                        'type', 'Feature',
-                        'id', obs.id,
-                        'geometry', ST_AsGeoJSON(obs.location, 6, 0)::json,
-                        'properties', json_build_object(
-                            'id', obs.id,
-                            'municipality_id', obs.municipality_id,
-                            'status',
-                            CASE
-                                WHEN obs.eradication_result = 'successful' THEN 'eradicated'
-                                WHEN obs.eradication_result IS NOT NULL THEN 'visited'
-                                WHEN obs.reserved_by_id IS NOT NULL THEN 'reserved'
-                                ELSE 'untreated'
-                            END
-                        )
-                    )
-                )
-            )
-            FROM "observations_observation" AS obs
-            """
 
-            # Build WHERE clauses from filter parameters
-            filters = []
-            params = {}
+            def fetch() -> tuple[bytes, bool] | None:
+                cached = get_geojson_payload(cache_key, accept_gzip)
+                return cached[:2] if cached else None
 
-            # Handle all filters from your ObservationFilter class
-            if 'visible' in query_params and query_params.get('visible').lower() != 'all':
-                filters.append("obs.visible = %(visible)s")
-                params['visible'] = query_params.get('visible').lower() == 'true'
+            def render() -> tuple[bytes, bool]:
+                logger.info(f"Generating GeoJSON in view with cache_key {cache_key}")
+                payload = render_geojson(query_params, cluster_zoom)
+                set_geojson_payload(cache_key, payload)
+                return payload, False
 
-            if 'min_observation_datetime' in query_params:
-                filters.append("obs.observation_datetime >= %(min_observation_datetime)s")
-                params['min_observation_datetime'] = query_params['min_observation_datetime']
+            # Requests missing the same key at once, e.g. right after an invalidation, render it once.
+            payload, gzipped = compute_once(cache_key, fetch, render)
+            return geojson_http_response(payload, gzipped)
 
-            if 'max_observation_datetime' in query_params:
-                filters.append("obs.observation_datetime <= %(max_observation_datetime)s")
-                params['max_observation_datetime'] = query_params['max_observation_datetime']
+        except Exception as e:
+            logger.exception("GeoJSON generation failed")
+            return HttpResponse("Error generating GeoJSON", status=500)
 
-            if 'municipality_id' in query_params:
-                filters.append("obs.municipality_id IN %(municipality_id)s")
-                params['municipality_id'] = tuple(query_params.getlist('municipality_id'))
-            
-            if 'province_id' in query_params:
-                filters.append("obs.province_id IN %(province_id)s")
-                params['province_id'] = tuple(query_params.getlist('province_id'))
-            
-            if 'nest_type' in query_params:
-                filters.append("obs.nest_type IN %(nest_type)s")
-                params['nest_type'] = tuple(query_params.getlist('nest_type'))
-
-            if 'anb' in query_params:
-                filters.append("obs.anb = %(anb)s")
-                params['anb'] = query_params.get('anb').lower() == 'true'
-
-            if 'nest_status' in query_params:
-                status_filters = []
-                status_values = query_params.getlist('nest_status')
-                if 'eradicated' in status_values:
-                    status_filters.append("obs.eradication_result = 'successful'")
-                if 'visited' in status_values:
-                    status_filters.append("(obs.eradication_result IS NOT NULL AND obs.eradication_result != 'successful')")
-                if 'reserved' in status_values:
-                    status_filters.append("obs.reserved_by_id IS NOT NULL")
-                if 'open' in status_values:
-                    status_filters.append("(obs.reserved_by_id IS NULL AND obs.eradication_result IS NULL)")
-                
-                if status_filters:
-                    filters.append(f"({' OR '.join(status_filters)})")
+    @swagger_auto_schema(
+        operation_description=(
+            "Retrieve the observation changes since a changes token, as a GeoJSON delta. "
+            "Accepts the same filters as dynamic-geojson."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "since",
+                openapi.IN_QUERY,
+                description="The changes_token of a previous dynamic-geojson or changes response.",
+                type=openapi.TYPE_STRING,
+                required=True,
+            ),
+        ],
+        responses={
+            200: "FeatureCollection with changed features, removed observation ids and a new changes_token",
+            400: "Missing or invalid token",
+            410: "Token too old, reload dynamic-geojson",
+        },
+    )
+    @method_decorator(ratelimit(key="ip", rate="60/m", method="GET", block=True))
+    @action(detail=False, methods=["get"], url_path="dynamic-geojson/changes")
+    def geojson_changes(self, request: Request) -> HttpResponse:
+        """
+        Return only the observations changed since the given token.
 
-            if filters:
-                base_query += " WHERE " + " AND ".join(filters)
+        Changed observations matching the filters are returned as features, and deleted, hidden
+        or no longer matching observations as ids under `removed`. Map clients apply the delta to
+        their copy of dynamic-geojson instead of reloading the whole FeatureCollection.
+        """
+        since_token = request.GET.get("since")
+        if not since_token:
+            return HttpResponseBadRequest("The since parameter is required")
+        try:
+            since = decode_change_token(since_token)
+            query_params = normalize_filter_params(request.GET)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+
+        retention = datetime.timedelta(days=settings.GEOJSON_CHANGES_RETENTION_DAYS)
+        if since < timezone.now() - retention:
+            return JsonResponse(
+                {"error": "The changes token has expired. Reload dynamic-geojson to get a new one."},
+                status=status.HTTP_410_GONE,
+            )
 
+        try:
+            query_params.pop("since", None)
+            sql, params = build_changes_query(query_params, since)
             with connection.cursor() as cursor:
-                cursor.execute(base_query, params)
+                cursor.execute(sql, params)
                 row = cursor.fetchone()
-                geojson_response = row[0] if row else {"type": "FeatureCollection", "features": []}
+            return geojson_http_response(row[0].encode("utf-8"), gzipped=False)
+        except Exception:
+            logger.exception("GeoJSON changes generation failed")
+            return HttpResponse("Error generating GeoJSON changes", status=500)
 
-            cache.set(cache_key, geojson_response, GEOJSON_REDIS_CACHE_EXPIRATION)
-            logger.info(f"Generating GeoJSON in view with cache_key {cache_key}")
-            return JsonResponse(geojson_response, safe=False)
+    @swagger_auto_schema(
+        operation_description="Report the counters and state of the debounced GeoJSON cache rebuild scheduler.",
+        responses={200: "Rebuild scheduler metrics"},
+    )
+    @action(detail=False, methods=["get"], url_path="cache-rebuild-status")
+    def cache_rebuild_status(self, request: Request) -> JsonResponse:
+        """Return the skipped, coalesced and completed rebuild counters and whether a rebuild is pending."""
+        return JsonResponse(get_rebuild_metrics())
 
-        except Exception as e:
-            logger.exception("GeoJSON generation failed")
-            return HttpResponse("Error generating GeoJSON", status=500)
+    @swagger_auto_schema(
+        operation_description="Report how often saving an observation ran or skipped the spatial enrichment of its location.",
+        responses={200: "Location enrichment counters"},
+    )
+    @action(detail=False, methods=["get"], url_path="location-enrichment-status")
+    def location_enrichment_status(self, request: Request) -> JsonResponse:
+        """Return the executed and skipped location enrichment counters."""
+        return JsonResponse(get_location_enrichment_metrics())
+
+    @swagger_auto_schema(
+        operation_description="Report how many users have a reservation count that differs from their open reservations.",
+        responses={200: "Reservation count drift"},
+    )
+    @action(detail=False, methods=["get"], url_path="reservation-count-status")
+    def reservation_count_status(self, request: Request) -> JsonResponse:
+        """Return the number of drifted reservation counters and the summed drift."""
+        return JsonResponse(get_reservation_count_drift())
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Retrieve a Mapbox vector tile with the observations in tile z/x/y. "
+            "Accepts the same filters as the observation list."
+        ),
+        responses={200: "Mapbox vector tile (application/vnd.mapbox-vector-tile)", 400: "Invalid tile coordinates"},
+    )
+    @method_decorator(ratelimit(key="ip", rate="600/m", method="GET", block=True))
+    def tiles(self, request: Request, z: int, x: int, y: int) -> HttpResponse:
+        """
+        Render one vector tile of observations with PostGIS `ST_AsMVT`.
+
+        The map only loads the tiles in its viewport. Tiles are cached per tile and filter set.
+        """
+        if not 0 <= z <= MAX_TILE_ZOOM or not (0 <= x < 2**z and 0 <= y < 2**z):
+            return HttpResponseBadRequest("Invalid tile coordinates")
+
+        try:
+            try:
+                query_params = normalize_filter_params(request.GET)
+            except ValueError as e:
+                return HttpResponseBadRequest(str(e))
+            cache_key = get_tile_cache_key(query_params, z, x, y)
+            tile = cache.get(cache_key)
+            if tile is None:
+                sql, params = build_tile_query(query_params, z=z, x=x, y=y)
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    row = cursor.fetchone()
+                tile = bytes(row[0]) if row and row[0] is not None else b""
+                cache.set(cache_key, tile, GEOJSON_REDIS_CACHE_EXPIRATION)
+            return HttpResponse(tile, content_type="application/vnd.mapbox-vector-tile")
+        except Exception:
+            logger.exception(f"Vector tile generation failed for {z}/{x}/{y}")
+            return HttpResponse("Error generating vector tile", status=500)
                 
     @method_decorator(ratelimit(key="ip", rate="60/m", method="GET", block=True))
     @action(detail=False, methods=["post"], permission_classes=[IsAdminUser])
@@ -716,6 +877,14 @@ class ObservationsViewSet(ModelViewSet):  # noqa: PLR0904
             else:
                 logger.warning(f"Unexpected None result for record {idx}")
                 errors.append({"record": idx, "error": "Unexpected None result"})                
+
+        # Resolve the locations of all records in one batch instead of two spatial queries per record
+        located = [item for item in valid_observations if isinstance(item, dict) and item.get('location')]
+        points = [(item['location'].x, item['location'].y) for item in located]
+        for item, (municipality_id, province_id, anb) in zip(located, resolve_locations(points)):
+            item['municipality_id'] = municipality_id
+            item['province_id'] = province_id
+            item['anb'] = anb
         return valid_observations, errors
         
     def process_update_item(self, data_item: dict[str, Any], idx: int, current_time: datetime.datetime) -> Any:
@@ -772,15 +941,8 @@ class ObservationsViewSet(ModelViewSet):  # noqa: PLR0904
             try:
                 long_val = float(data_item.pop('longitude'))
                 lat_val = float(data_item.pop('latitude'))
+                # Municipality, province and ANB status are resolved for all records at once in process_data
                 data_item['location'] = Point(long_val, lat_val, srid=4326)
-                municipality = get_municipality_from_coordinates(long_val, lat_val)
-                if municipality:
-                    data_item['municipality'] = municipality
-                    if municipality.province:
-                        data_item['province'] = municipality.province
-                
-                # Always explicitly update ANB status when coordinates change
-                data_item['anb'] = check_if_point_in_anb_area(long_val, lat_val)
             except (ValueError, TypeError) as e:
                 logger.error(f"Invalid coordinates for record {idx}: {str(e)}")
                 return {"error": f"Invalid coordinates: {str(e)}"}
@@ -891,15 +1053,7 @@ class ObservationsViewSet(ModelViewSet):  # noqa: PLR0904
             lat_val = float(data_item.pop('latitude'))
             data_item['location'] = Point(long_val, lat_val, srid=4326)
             logger.info(f"Created point from coordinates for record {idx}: {long_val}, {lat_val}")
-            
-            municipality = get_municipality_from_coordinates(long_val, lat_val)
-            if municipality:
-                data_item['municipality'] = municipality
-                if municipality.province:
-                    data_item['province'] = municipality.province
-            
-            # Always explicitly set ANB status
-            data_item['anb'] = check_if_point_in_anb_area(long_val, lat_val)            
+            # Municipality, province and ANB status are resolved for all records at once in process_data
             return data_item  # Return the processed dictionary
         except (ValueError, TypeError) as e:
             logger.error(f"Error processing coordinates for record {idx}: {str(e)}")
@@ -967,20 +1121,23 @@ class ObservationsViewSet(ModelViewSet):  # noqa: PLR0904
                             obs = Observation.objects.get(id=observation_id)
                             for field, value in data.items():
                                 setattr(obs, field, value)
-                            obs.save()
+                            # process_data already resolved municipality, province and ANB status
+                            obs.save(enrich_location=False)
                             updated_ids.append(obs.id)
                             logger.info(f"Updated observation #{obs.id}")
                         except Observation.DoesNotExist:
                             data['id'] = observation_id
-                            obs = Observation.objects.create(**data)
+                            obs = Observation(**data)
+                            obs.save(force_insert=True, enrich_location=False)
                             created_ids.append(obs.id)
                             logger.info(f"Created new observation #{obs.id}")
                     else:
-                        obs = Observation.objects.create(**data)
+                        obs = Observation(**data)
+                        obs.save(force_insert=True, enrich_location=False)
                         created_ids.append(obs.id)
                         logger.info(f"Created new observation #{obs.id}")
 
-            invalidate_geojson_cache()
+            invalidate_observation_caches()
 
             parts: list[str] = []
             if created_ids:
@@ -1075,12 +1232,12 @@ class ObservationsViewSet(ModelViewSet):  # noqa: PLR0904
                 
                 # Extract filename from file_path or create a default one
                 filename = export.file_path.split('/')[-1]
-                if not filename.endswith('.csv'):
+                if not filename.endswith(('.csv', '.csv.gz')):
                     timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
                     filename = f'observations_export_{timestamp}.csv'
                 
                 response['Content-Disposition'] = f'attachment; filename="{filename}"'
-                response['Content-Type'] = 'text/csv'
+                response['Content-Type'] = 'application/gzip' if filename.endswith('.gz') else 'text/csv'
                 
                 # Add CORS headers if needed
                 response["Access-Control-Allow-Origin"] = request.META.get('HTTP_ORIGIN', '*')
@@ -1498,7 +1655,8 @@ class MunicipalityViewSet(ReadOnlyModelViewSet):
     def by_provinces(self, request: Request) -> Response:
         """Return municipalities filtered by province IDs."""
         province_ids = request.query_params.get("province_ids")
-        cache_key = f"vespadb::municipalities_by_province::{province_ids}"
+        generation = get_cache_generation(MUNICIPALITIES_CACHE_FAMILY)
+        cache_key = f"vespadb::municipalities_by_province::g{generation}::{province_ids}"
         cached_data = cache.get(cache_key)
         if cached_data:
             return Response(cached_data)
@@ -1516,7 +1674,8 @@ class MunicipalityViewSet(ReadOnlyModelViewSet):
     @method_decorator(ratelimit(key="ip", rate="60/m", method="GET", block=True))
     def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         """Override the list method to add caching."""
-        cache_key = "vespadb::municipalities::list"
+        generation = get_cache_generation(MUNICIPALITIES_CACHE_FAMILY)
+        cache_key = f"vespadb::municipalities::g{generation}::list"
         cached_data = cache.get(cache_key)
         if cached_data:
             return Response(cached_data)
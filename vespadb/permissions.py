@@ -1,5 +1,7 @@
 """Permissies voor de observationen API."""
 
+from typing import Any
+
 from rest_framework import permissions
 from rest_framework.request import Request
 from rest_framework.views import View
@@ -15,6 +17,49 @@ class IsAdminOrSelf(permissions.BasePermission):
         return bool(obj == request.user or request.user.is_superuser)
 
 
+class ObservationPermissionContext:
+    """
+    The observation field visibility of one user, resolved once per request.
+
+    Resolving the user's municipalities up front replaces a `user.municipalities` query per
+    serialized observation.
+    """
+
+    PUBLIC = "public"
+    LOGGED_IN = "logged_in"
+    ADMIN = "admin"
+
+    def __init__(self, is_admin: bool, municipality_ids: frozenset[int]) -> None:
+        """Initialize the context from the resolved user properties."""
+        self.is_admin = is_admin
+        self.municipality_ids = municipality_ids
+
+    @classmethod
+    def for_user(cls, user: Any) -> "ObservationPermissionContext":
+        """Resolve the context of a (possibly anonymous) user with at most one query."""
+        if not user or not user.is_authenticated:
+            return cls(is_admin=False, municipality_ids=frozenset())
+        if user.is_superuser:
+            return cls(is_admin=True, municipality_ids=frozenset())
+        return cls(is_admin=False, municipality_ids=frozenset(user.municipalities.values_list("id", flat=True)))
+
+    def cache_scope(self) -> str:
+        """Return a string identifying everything this user may see, for use in cache keys."""
+        if self.is_admin:
+            return self.ADMIN
+        if not self.municipality_ids:
+            return self.PUBLIC
+        return "municipalities:" + ",".join(str(municipality_id) for municipality_id in sorted(self.municipality_ids))
+
+    def tier_for(self, municipality_id: int | None) -> str:
+        """Return the visibility tier of an observation in the given municipality for this user."""
+        if self.is_admin:
+            return self.ADMIN
+        if municipality_id is not None and municipality_id in self.municipality_ids:
+            return self.LOGGED_IN
+        return self.PUBLIC
+
+
 SYSTEM_USER_OBSERVATION_FIELDS_TO_UPDATE = [
     "location",
     "notes",
@@ -15,7 +15,7 @@ from pathlib import Path
 
 from celery.schedules import crontab
 from dotenv import load_dotenv
-from vespadb.observations.cache_configs import PREWARM_CONFIGS
+from vespadb.observations.cache_configs import PREWARM_SCHEDULE
 
 load_dotenv()
 secrets = {
@@ -46,6 +46,29 @@ DEBUG = secrets["DJANGO_DEBUG"] == "True"
 MAX_RESERVATIONS = 50
 RESERVATION_DURATION_DAYS = 10
 ERADICATION_KEYWORD_LIST = ["BESTREDEN"]
+# dynamic-geojson returns grid clusters instead of individual points below this zoom level
+GEOJSON_CLUSTER_MAX_ZOOM = int(os.getenv("GEOJSON_CLUSTER_MAX_ZOOM", "12"))
+GEOJSON_CLUSTER_GRID_DIVISIONS = 4  # grid cells per tile width
+GEOJSON_BBOX_QUANTUM = float(os.getenv("GEOJSON_BBOX_QUANTUM", "0.05"))  # bbox snapping grid in degrees
+# resolve municipality, province and ANB membership from an in-memory index of the boundaries instead of PostGIS
+BOUNDARY_INDEX_ENABLED = os.getenv("BOUNDARY_INDEX_ENABLED", "True") == "True"
+# dynamic-geojson changes feed: tokens lag the clock by the overlap, tombstones are kept for the retention
+GEOJSON_CHANGES_OVERLAP_SECONDS = 5
+GEOJSON_CHANGES_RETENTION_DAYS = 30
+# pre-warmed GeoJSON caches are rebuilt once writes are quiet for the debounce window, at most max delay after the first write
+GEOJSON_REBUILD_DEBOUNCE_SECONDS = int(os.getenv("GEOJSON_REBUILD_DEBOUNCE_SECONDS", "30"))
+GEOJSON_REBUILD_MAX_DELAY_SECONDS = int(os.getenv("GEOJSON_REBUILD_MAX_DELAY_SECONDS", "300"))
+# per cache family: entries are served fresh until the soft TTL, then stale while one worker refreshes them until the hard TTL
+CACHE_TTLS = {
+    "geojson": {
+        "soft": int(os.getenv("GEOJSON_CACHE_SOFT_TTL", "900")),
+        "hard": int(os.getenv("GEOJSON_CACHE_HARD_TTL", "3600")),
+    },
+    "observations_list": {
+        "soft": int(os.getenv("OBSERVATIONS_LIST_CACHE_SOFT_TTL", "300")),
+        "hard": int(os.getenv("OBSERVATIONS_LIST_CACHE_HARD_TTL", "3600")),
+    },
+}
 
 
 # Application definition and middleware
@@ -125,11 +148,10 @@ CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "Europe/Brussels"
 MIN_OBSERVATION_DATETIME = "2025-04-01T00:00:00+02:00"
 prewarm_schedule = {
-    f"prewarm-geojson-{config['name']}": {
-        'task': 'vespadb.observations.tasks.generate_geojson_task',
-        'schedule': config['schedule'],
-        'args': (config['params'],)
-    } for config in PREWARM_CONFIGS
+    "prewarm-geojson": {
+        'task': 'vespadb.observations.tasks.generate_all_geojson_task',
+        'schedule': PREWARM_SCHEDULE,
+    }
 }
 # Configure schedules based on environment
 # UAT servers are only available between 9am-8pm Belgium time
@@ -143,6 +165,10 @@ if APP_ENV == 'UAT':
             "task": "vespadb.observations.tasks.reservation_cleanup.free_expired_reservations_and_audit_reservation_count",
             "schedule": crontab(hour=11, minute=30),  # 11:30 AM Belgium time
         },
+        "free-expired-reservations": {
+            "task": "vespadb.observations.tasks.reservation_cleanup.free_expired_reservations",
+            "schedule": crontab(minute="*/15", hour="9-19"),  # every 15 minutes while UAT is up
+        },
         "generate-hourly-export": {
             "task": "vespadb.observations.tasks.generate_export.generate_hourly_export",
             "schedule": crontab(hour=14, minute=0),  # 2:00 PM Belgium time
@@ -155,6 +181,10 @@ if APP_ENV == 'UAT':
             "task": "vespadb.observations.tasks.generate_import.cleanup_old_imports",
             "schedule": crontab(hour=17, minute=0),  # 5:00 PM Belgium time (daily instead of every 6 hours)
         },
+        "cleanup-observation-tombstones": {
+            "task": "vespadb.observations.tasks.tombstone_cleanup.cleanup_observation_tombstones",
+            "schedule": crontab(hour=17, minute=30),  # 5:30 PM Belgium time
+        },
     }
 else:
     # Production and other environments use nighttime schedules
@@ -167,6 +197,10 @@ else:
             "task": "vespadb.observations.tasks.reservation_cleanup.free_expired_reservations_and_audit_reservation_count",
             "schedule": crontab(hour=1, minute=30),
         },
+        "free-expired-reservations": {
+            "task": "vespadb.observations.tasks.reservation_cleanup.free_expired_reservations",
+            "schedule": crontab(minute="*/15"),
+        },
         "generate-hourly-export": {
             "task": "vespadb.observations.tasks.generate_export.generate_hourly_export",
             "schedule": crontab(hour=3, minute=0),
@@ -179,6 +213,10 @@ else:
             "task": "vespadb.observations.tasks.generate_import.cleanup_old_imports",
             "schedule": crontab(minute=0, hour="*/6"),
         },
+        "cleanup-observation-tombstones": {
+            "task": "vespadb.observations.tasks.tombstone_cleanup.cleanup_observation_tombstones",
+            "schedule": crontab(hour=4, minute=30),
+        },
     }
 CELERY_BEAT_SCHEDULE.update(prewarm_schedule)
 
@@ -326,6 +364,18 @@ AWS_S3_REGION_NAME = os.getenv("AWS_S3_REGION_NAME", "eu-west-1")
 AWS_DEFAULT_ACL = None
 AWS_S3_FILE_OVERWRITE = False
 DEFAULT_FILE_STORAGE = "storages.backends.s3boto3.S3Boto3Storage"
+# Hourly exports stream into S3 multipart uploads of this many bytes per part (at least 5 MiB).
+EXPORT_UPLOAD_PART_SIZE = int(os.getenv("EXPORT_UPLOAD_PART_SIZE", str(8 * 1024 * 1024)))
+EXPORT_GZIP = os.getenv("EXPORT_GZIP", "False") == "True"
+# Export only the observations changed since the previous run and compact the deltas into a full file
+# once EXPORT_COMPACTION_DELTAS of them piled up; a full export runs every EXPORT_FULL_REBUILD_DAYS.
+# The default of 24 rewrites the full file once a day with the hourly schedule, so the file served by
+# export and download_export can lag up to a day behind the deltas; set it to 1 to compact every run.
+EXPORT_INCREMENTAL = os.getenv("EXPORT_INCREMENTAL", "False") == "True"
+EXPORT_COMPACTION_DELTAS = int(os.getenv("EXPORT_COMPACTION_DELTAS", "24"))
+EXPORT_FULL_REBUILD_DAYS = int(os.getenv("EXPORT_FULL_REBUILD_DAYS", "7"))
+# Rows per round trip of the server-side cursors of bulk jobs such as the hourly export.
+STREAMING_FETCH_SIZE = int(os.getenv("STREAMING_FETCH_SIZE", "10000"))
 
 # Use LocalStack for local development
 if os.getenv("DEBUG", "False").lower() == "true":